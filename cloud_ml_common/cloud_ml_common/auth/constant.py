@@ -22,3 +22,11 @@ class Constant(object):
   TIMESTAMP = "X-Xiaomi-Timestamp"
   CONTENT_MD5 = "X-Xiaomi-Content-MD5"
   AUTHORIZATION_PREFIX = "Galaxy V3 "
+
+  # The lowercase headers of the Galaxy-V2 signature
+  V2_AUTHORIZATION = "authorization"
+  V2_CONTENT_MD5 = "content-md5"
+  V2_CONTENT_TYPE = "content-type"
+  V2_DATE = "date"
+  V2_XIAOMI_HEADER_PREFIX = "x-xiaomi-"
+  V2_AUTHORIZATION_PREFIX = "Galaxy-V2 "
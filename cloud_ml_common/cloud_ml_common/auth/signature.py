@@ -15,68 +15,248 @@
 import base64
 import hashlib
 from hashlib import sha1
-import hmac
+import io
 import sys
+import tempfile
 import time
 try:
-  from urllib.parse import urlparse
+  from urllib.parse import urlparse, urlsplit
 except ImportError:
-  from urlparse import urlparse
+  from urlparse import urlparse, urlsplit
 from requests.auth import AuthBase
 
 from .constant import Constant
 
+try:
+  text_type = unicode
+except NameError:
+  text_type = str
+
+# The md5 of the empty body
+EMPTY_MD5 = hashlib.md5(b"").hexdigest()
+
+# The bytes to read from the file body at a time
+CHUNK_SIZE = 64 * 1024
+
+# The max bytes to buffer the body which can be read only once in memory, and
+# the larger body is buffered in a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# The tables to xor the key with the outer and inner paddings of HMAC
+_TRANS_5C = bytes(bytearray(x ^ 0x5C for x in range(256)))
+_TRANS_36 = bytes(bytearray(x ^ 0x36 for x in range(256)))
+
+
+class HmacSha1(object):
+  """The HMAC-SHA1 of a key, which is keyed once.
+
+  The inner and outer hashes of the padded key are computed once, and copied
+  to digest each message. It's the same as `hmac.new(key, message, sha1)`
+  without hashing the key again.
+  """
+
+  def __init__(self, key):
+    block_size = sha1().block_size
+    if len(key) > block_size:
+      key = sha1(key).digest()
+    key = key.ljust(block_size, b"\0")
+    self._inner = sha1(key.translate(_TRANS_36))
+    self._outer = sha1(key.translate(_TRANS_5C))
+
+  def digest(self, message):
+    inner = self._inner.copy()
+    inner.update(message)
+    outer = self._outer.copy()
+    outer.update(inner.digest())
+    return outer.digest()
+
+
+def is_stream(body):
+  """Whether the body is a file-like object or an iterable of chunks.
+
+  The strings, and the dictionaries, lists and tuples which are encoded as
+  form data by `requests`, are not streams.
+  """
+  if body is None or isinstance(
+      body, (bytes, bytearray, memoryview, text_type, dict, list, tuple)):
+    return False
+  return hasattr(body, "read") or hasattr(body, "__iter__")
+
+
+def tell(body):
+  """Get the position of the file body, or None if it can't be rewound."""
+  try:
+    position = body.tell()
+    body.seek(position)
+    return position
+  except (AttributeError, IOError, OSError, ValueError):
+    return None
+
+
+def iter_chunks(body):
+  """Iterate the bytes chunks of the file or iterable body.
+
+  The file is read by `CHUNK_SIZE` bytes, and the string chunks are encoded as
+  utf-8.
+  """
+  if hasattr(body, "read"):
+    # The file is read until the empty chunk
+    chunks = iter(lambda: body.read(CHUNK_SIZE) or None, None)
+  else:
+    chunks = iter(body)
+  for chunk in chunks:
+    if isinstance(chunk, text_type):
+      chunk = chunk.encode("utf-8")
+    yield chunk
+
 
 class Signer(AuthBase):
-  """The signer class used to sign the request."""
+  """The signer class used to sign the request.
+
+  The HMAC is keyed with the secret once, and its hash states are copied
+  for each request, so the signer can be shared by the threads.
+  """
 
   def __init__(self, app_key, app_secret):
     self._app_key = str(app_key)
     self._app_secret = str(app_secret)
+    self._hmac = self._new_hmac(self._app_secret)
 
-  def __call__(self, request):
-    path = urlparse(request.url).path
-    if not request.body:
-      request.body = ""
-    timestamp = request.headers.get(Constant.TIMESTAMP, str(int(time.time())))
+  def _new_hmac(self, app_secret):
     if sys.version_info > (3, 0):
-      content_md5 = request.headers.get(
-          Constant.CONTENT_MD5,
-          hashlib.md5(request.body.encode("utf-8")).hexdigest())
-    else:
-      content_md5 = request.headers.get(Constant.CONTENT_MD5,
-                                        hashlib.md5(request.body).hexdigest())
-
-    request.headers[Constant.TIMESTAMP] = timestamp
-    request.headers[Constant.CONTENT_MD5] = content_md5
-    request.headers[
-        Constant.
-        AUTHORIZATION] = Constant.AUTHORIZATION_PREFIX + self._sign_to_base64(
-            path, timestamp, content_md5, self._app_secret)
-    request.headers[Constant.SECRET_KEY_ID] = self._app_key
+      app_secret = app_secret.encode("utf-8")
+    return HmacSha1(app_secret)
+
+  def __call__(self, request):
+    # The empty body is not set to "", which is sent as chunked by Python 2
+    if is_stream(request.body) and \
+        not request.headers.get(Constant.CONTENT_MD5):
+      content_md5, body = self.hash_stream(request.body)
+      request.headers[Constant.CONTENT_MD5] = content_md5
+      if body is not request.body:
+        # Send the buffered body with its length instead of chunked
+        body.seek(0, io.SEEK_END)
+        request.headers["Content-Length"] = str(body.tell())
+        request.headers.pop("Transfer-Encoding", None)
+        body.seek(0)
+        request.body = body
+    request.headers.update(
+        self.sign_headers(request.url, request.body, request.headers))
     return request
 
+  def sign_headers(self, url, body, headers=None):
+    """Get the signature headers of the request.
+
+    Args:
+      url: The url of the request.
+      body: The body of the request. The content md5 is computed over the
+            bytes, bytearray or memoryview without copying, and the string
+            body is encoded as utf-8. The file body is hashed in chunks and
+            rewound, see `content_md5`.
+      headers: The headers of the request, whose timestamp and content md5
+               are reused if given, so the body isn't hashed again.
+
+    Returns:
+      The dictionary of headers to add to the request.
+    """
+    headers = headers or {}
+    path = urlsplit(url).path
+    if ";" in path:
+      # The parameters of the last segment are not signed
+      path = urlparse(url).path
+    timestamp = headers.get(Constant.TIMESTAMP) or str(int(time.time()))
+    content_md5 = headers.get(Constant.CONTENT_MD5)
+    if not content_md5:
+      content_md5 = self.content_md5(body)
+
+    return {
+        Constant.TIMESTAMP: timestamp,
+        Constant.CONTENT_MD5: content_md5,
+        Constant.AUTHORIZATION: Constant.AUTHORIZATION_PREFIX +
+        self._sign_to_base64(path, timestamp, content_md5, self._app_secret),
+        Constant.SECRET_KEY_ID: self._app_key
+    }
+
+  @staticmethod
+  def content_md5(body):
+    """Get the hex md5 of the body like `sign_headers`.
+
+    Args:
+      body: The bytes or string body, or the file body which can be rewound.
+
+    Returns:
+      The hex md5 of the body.
+
+    Raises:
+      ValueError: If the body is a stream which can be read only once, which
+                  should be buffered by `hash_stream`.
+    """
+    if is_stream(body):
+      if not hasattr(body, "read") or tell(body) is None:
+        raise ValueError(
+            "The body can be read only once, buffer it with hash_stream")
+      return Signer.hash_stream(body)[0]
+    if not body:
+      return EMPTY_MD5
+    if not isinstance(body, (bytes, bytearray, memoryview)):
+      body = body.encode("utf-8")
+    return hashlib.md5(body).hexdigest()
+
+  @staticmethod
+  def hash_stream(body):
+    """Get the hex md5 of the file or iterable body in chunks.
+
+    The file which can be rewound is read from its position and rewound. The
+    other files and the iterables can be read only once, so they're buffered
+    while they're hashed, in memory up to `SPOOL_MAX_SIZE` bytes and in a
+    temporary file if larger.
+
+    Args:
+      body: The file-like object, or the iterable of bytes or string chunks.
+
+    Returns:
+      The tuple of the hex md5, and the body to send, which is a new file at
+      the start of the buffered content if the body can't be rewound.
+    """
+    md5 = hashlib.md5()
+    position = tell(body) if hasattr(body, "read") else None
+    if position is not None:
+      for chunk in iter_chunks(body):
+        md5.update(chunk)
+      body.seek(position)
+      return md5.hexdigest(), body
+
+    spool = io.BytesIO()
+    for chunk in iter_chunks(body):
+      md5.update(chunk)
+      spool.write(chunk)
+      if isinstance(spool, io.BytesIO) and spool.tell() > SPOOL_MAX_SIZE:
+        spool_file = tempfile.TemporaryFile()
+        spool_file.write(spool.getvalue())
+        spool = spool_file
+    spool.seek(0)
+    return md5.hexdigest(), spool
+
   def _sign(self, path, timestamp, content_md5, app_secret):
     """Sign the specified http request."""
 
     string_to_sign = "{}\n{}\n{}\n".format(path, timestamp, content_md5)
-    if sys.version_info > (3, 0):
-      digest = hmac.new(
-          app_secret.encode("utf-8"),
-          string_to_sign.encode("utf-8"),
-          digestmod=sha1)
+    if app_secret == self._app_secret:
+      signer_hmac = self._hmac
     else:
-      digest = hmac.new(app_secret, string_to_sign, digestmod=sha1)
-    return digest.digest()
+      signer_hmac = self._new_hmac(app_secret)
+    if sys.version_info > (3, 0):
+      string_to_sign = string_to_sign.encode("utf-8")
+    return signer_hmac.digest(string_to_sign)
 
   def _sign_to_base64(self, path, timestamp, content_md5, app_secret):
     """Sign the specified request to base64 encoded result."""
 
     signature = self._sign(path, timestamp, content_md5, app_secret)
     if sys.version_info > (3, 0):
-      return base64.encodestring(signature).strip().decode("utf-8")
+      return base64.b64encode(signature).decode("utf-8")
     else:
-      return base64.encodestring(signature).strip()
+      return base64.b64encode(signature)
 
   def _get_header_value(self, http_headers, name):
     if http_headers is not None and name in http_headers:
@@ -86,3 +266,101 @@ class Signer(AuthBase):
       else:
         return value
     return ""
+
+
+class GalaxyV2Signer(object):
+  """The signer of the Galaxy-V2 scheme, which is used by cloud-vision.
+
+  The string to sign has the method, content md5, content type and date, the
+  canonical x-xiaomi- headers and the canonical resource. The HMAC is keyed
+  once like `Signer`, and the canonical resources of the urls are cached, so
+  the requests of the fixed endpoints like `/v1/image:detect` don't parse
+  the url again.
+  """
+
+  # The max number of the cached canonical resources
+  MAX_CACHED_RESOURCES = 1024
+
+  def __init__(self, access_key, secret_key, subresources=()):
+    """Create a new GalaxyV2Signer.
+
+    Args:
+      access_key: The access key.
+      secret_key: The secret key.
+      subresources: The query arguments which are signed in the canonical
+                    resource. No query argument is signed by default.
+    """
+    self._access_key = access_key
+    if isinstance(secret_key, text_type):
+      secret_key = secret_key.encode("utf-8")
+    self._hmac = HmacSha1(secret_key)
+    self._subresources = frozenset(subresources)
+    self._resources = {}
+
+  def auth_headers(self, method, uri, headers):
+    """Get the copy of the headers with the authorization.
+
+    Args:
+      method: The http method, such as "POST".
+      uri: The url of the request.
+      headers: The dictionary of the lowercase headers, which has the content
+               md5, content type and date.
+
+    Returns:
+      The new dictionary of headers.
+    """
+    signed_headers = dict(headers)
+    signed_headers[Constant.V2_AUTHORIZATION] = "{}{}:{}".format(
+        Constant.V2_AUTHORIZATION_PREFIX, self._access_key,
+        self.sign(method, uri, headers))
+    return signed_headers
+
+  def sign(self, method, uri, headers):
+    """Get the base64 signature of the request."""
+    string_to_sign = "{}\n{}\n{}\n{}\n{}{}".format(
+        method, headers.get(Constant.V2_CONTENT_MD5, ""),
+        headers.get(Constant.V2_CONTENT_TYPE, ""),
+        headers.get(Constant.V2_DATE, ""),
+        self.canonicalize_headers(headers), self.canonicalize_resource(uri))
+    if isinstance(string_to_sign, text_type):
+      string_to_sign = string_to_sign.encode("utf-8")
+    signature = base64.b64encode(self._hmac.digest(string_to_sign))
+    if sys.version_info > (3, 0):
+      return signature.decode("utf-8")
+    return signature
+
+  @staticmethod
+  def canonicalize_headers(headers):
+    """Get the sorted lines of the non-empty x-xiaomi- headers.
+
+    The values of the list headers are joined with ",".
+    """
+    canonical_headers = {}
+    for key, value in headers.items():
+      key = key.lower()
+      if value and key.startswith(Constant.V2_XIAOMI_HEADER_PREFIX):
+        if isinstance(value, (bytes, text_type)):
+          canonical_headers[key] = value.strip()
+        else:
+          canonical_headers[key] = ",".join(v.strip() for v in value)
+    return "".join("{}:{}\n".format(key, canonical_headers[key])
+                   for key in sorted(canonical_headers))
+
+  def canonicalize_resource(self, uri):
+    """Get the path and the signed query arguments of the url, which are
+    cached for each url."""
+    resource = self._resources.get(uri)
+    if resource is None:
+      parsed_url = urlparse(uri)
+      queries = []
+      for query in sorted(parsed_url.query.split("&")):
+        key_value = query.split("=")
+        if key_value[0] in self._subresources:
+          queries.append("=".join(key_value[:2]))
+      resource = parsed_url.path
+      if queries:
+        resource += "?" + "&".join(queries)
+      if len(self._resources) >= self.MAX_CACHED_RESOURCES:
+        self._resources.clear()
+      self._resources[uri] = resource
+    return resource
@@ -0,0 +1,145 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure the signatures per second of Signer for the bodies of each size,
+and of GalaxyV2Signer for the requests of cloud-vision.
+
+  python -m cloud_ml_common.auth.signature_benchmark -s 1
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import time
+try:
+  from urllib.parse import urlparse
+except ImportError:
+  from urlparse import urlparse
+
+from .signature import GalaxyV2Signer, Signer
+
+URL = "https://cnbj3-cloud-ml.api.xiaomi.net/cloud_ml/v1/train"
+
+VISION_URL = "http://cnbj2.vision.api.xiaomi.com/v1/image:detect"
+
+VISION_HEADERS = {
+    "content-type": "application/json; charset=UTF-8",
+    "date": "Tue, 18 Oct 2016 06:24:20 GMT",
+    "x-xiaomi-request-id": "3f8b6a2e_42",
+    "content-md5": ""
+}
+
+BODY_SIZES = [("empty", 0), ("1 KB", 1024), ("10 MB", 10 * 1024 * 1024)]
+
+
+def legacy_sign_headers(app_secret, url, body):
+  """Sign like the previous Signer, which encodes the string body and the
+  secret, and creates the HMAC for each request."""
+  headers = {}
+  path = urlparse(url).path
+  timestamp = str(int(time.time()))
+  content_md5 = hashlib.md5(body.encode("utf-8")).hexdigest()
+  string_to_sign = "{}\n{}\n{}\n".format(path, timestamp, content_md5)
+  digest = hmac.new(app_secret.encode("utf-8"),
+                    string_to_sign.encode("utf-8"), hashlib.sha1)
+  headers["X-Xiaomi-Timestamp"] = timestamp
+  headers["X-Xiaomi-Content-MD5"] = content_md5
+  headers["Authorization"] = "Galaxy V3 " + base64.b64encode(
+      digest.digest()).decode("utf-8")
+  return headers
+
+
+def legacy_v2_auth_headers(access_key, secret_key, method, uri, headers):
+  """Sign like the previous Galaxy-V2 function of cloud-vision, which builds
+  the canonical headers and resource with string concatenation, and creates
+  the HMAC for each request."""
+  canonical_headers = {}
+  for key in headers:
+    lower_key = key.lower()
+    if headers[key] and lower_key.startswith("x-xiaomi-"):
+      canonical_headers[lower_key] = headers[key].strip()
+  string_to_sign = "%s\n" % method
+  string_to_sign += "%s\n" % headers["content-md5"]
+  string_to_sign += "%s\n" % headers["content-type"]
+  string_to_sign += "%s\n" % headers["date"]
+  for key in sorted(canonical_headers.keys()):
+    string_to_sign += "%s:%s\n" % (key, canonical_headers[key])
+  parsed_url = urlparse(uri)
+  string_to_sign += parsed_url.path
+  for query in sorted(parsed_url.query.split("&")):
+    query.split("=")
+  digest = hmac.new(secret_key.encode("utf-8"),
+                    string_to_sign.encode("utf-8"), hashlib.sha1)
+  new_headers = dict(headers)
+  new_headers["authorization"] = "Galaxy-V2 %s:%s" % (
+      access_key, base64.b64encode(digest.digest()).strip().decode("utf-8"))
+  return new_headers
+
+
+def measure(func, seconds):
+  """Call the function repeatedly for the seconds.
+
+  Returns:
+    The number of calls per second.
+  """
+  count = 0
+  start = time.time()
+  deadline = start + seconds
+  while True:
+    func()
+    count += 1
+    now = time.time()
+    if now >= deadline:
+      return count / (now - start)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-s", "--seconds", type=float, default=1.0,
+                      help="The seconds to measure each case")
+  args = parser.parse_args()
+
+  signer = Signer("ak", "sk")
+  print("{:8} {:28} {:>14}".format("BODY", "CASE", "SIGNATURES/S"))
+  for name, size in BODY_SIZES:
+    text = u"x" * size
+    data = b"x" * size
+    content_md5 = hashlib.md5(data).hexdigest()
+    cases = [
+        ("legacy", lambda: legacy_sign_headers("sk", URL, text)),
+        ("string body", lambda: signer.sign_headers(URL, text)),
+        ("bytes body", lambda: signer.sign_headers(URL, data)),
+        ("memoryview body",
+         lambda: signer.sign_headers(URL, memoryview(data))),
+        ("given content md5", lambda: signer.sign_headers(
+            URL, data, {"X-Xiaomi-Content-MD5": content_md5})),
+    ]
+    for case, func in cases:
+      print("{:8} {:28} {:>14.0f}".format(name, case,
+                                          measure(func, args.seconds)))
+
+  v2_signer = GalaxyV2Signer("ak", "sk")
+  cases = [
+      ("legacy galaxy-v2", lambda: legacy_v2_auth_headers(
+          "ak", "sk", "POST", VISION_URL, VISION_HEADERS)),
+      ("galaxy-v2", lambda: v2_signer.auth_headers(
+          "POST", VISION_URL, VISION_HEADERS)),
+  ]
+  for case, func in cases:
+    print("{:8} {:28} {:>14.0f}".format("vision", case,
+                                        measure(func, args.seconds)))
+
+
+if __name__ == "__main__":
+  main()
@@ -12,9 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from signature import Signer
+import hashlib
+import hmac
+import io
 import unittest
 
+import requests
+
+from cloud_ml_common.auth import signature
+from cloud_ml_common.auth.signature import GalaxyV2Signer, HmacSha1, Signer
+
 
 class SignerTest(unittest.TestCase):
 
@@ -34,7 +41,7 @@ class SignerTest(unittest.TestCase):
 
     self.assertEqual(
         self.signer._sign(path, timestamp, content_md5, app_secret),
-        "\xd9\x18\x83\x1c`Z\t\x82{\x9d2V\x90\x11,\xa8\xe0E\xd9\xc6")
+        b"\xd9\x18\x83\x1c`Z\t\x82{\x9d2V\x90\x11,\xa8\xe0E\xd9\xc6")
 
   def test_sign_to_base64(self):
     path = "/cloud_ml//v1/train"
@@ -46,6 +53,152 @@ class SignerTest(unittest.TestCase):
         self.signer._sign_to_base64(path, timestamp, content_md5, app_secret),
         "2RiDHGBaCYJ7nTJWkBEsqOBF2cY=")
 
+  def test_content_md5(self):
+    md5 = "900150983cd24fb0d6963f7d28e17f72"
+    self.assertEqual(md5, Signer.content_md5(b"abc"))
+    self.assertEqual(md5, Signer.content_md5(u"abc"))
+    self.assertEqual(md5, Signer.content_md5(bytearray(b"abc")))
+    self.assertEqual(md5, Signer.content_md5(memoryview(b"abc")))
+    self.assertEqual("d41d8cd98f00b204e9800998ecf8427e",
+                     Signer.content_md5(None))
+
+  def test_sign_headers(self):
+    headers = self.signer.sign_headers(
+        "http://cloud-ml/cloud_ml//v1/train?org_id=1", b"",
+        {"X-Xiaomi-Timestamp": "1474203860"})
+    self.assertEqual("1474203860", headers["X-Xiaomi-Timestamp"])
+    self.assertEqual("d41d8cd98f00b204e9800998ecf8427e",
+                     headers["X-Xiaomi-Content-MD5"])
+    self.assertEqual("Galaxy V3 2RiDHGBaCYJ7nTJWkBEsqOBF2cY=",
+                     headers["Authorization"])
+    self.assertEqual("ak", headers["X-Xiaomi-Secret-Key-Id"])
+
+  def test_sign_headers_with_content_md5(self):
+    # The body is not hashed if the content md5 is given
+    headers = self.signer.sign_headers(
+        "http://cloud-ml/cloud_ml//v1/train", object(), {
+            "X-Xiaomi-Timestamp": "1474203860",
+            "X-Xiaomi-Content-MD5": "d41d8cd98f00b204e9800998ecf8427e"
+        })
+    self.assertEqual("Galaxy V3 2RiDHGBaCYJ7nTJWkBEsqOBF2cY=",
+                     headers["Authorization"])
+
+  def test_sign_with_other_secret(self):
+    signer = Signer("ak", "other")
+    self.assertEqual(
+        signer._sign("/a", "1", "2", "sk"),
+        self.signer._sign("/a", "1", "2", "sk"))
+    self.assertNotEqual(
+        signer._sign("/a", "1", "2", "other"),
+        self.signer._sign("/a", "1", "2", "sk"))
+
+  def test_hmac_sha1(self):
+    message = b"/cloud_ml/v1/train\n1474203860\n"
+    for key in [b"", b"sk", b"k" * 64, b"k" * 100]:
+      hmac_sha1 = HmacSha1(key)
+      for _ in range(2):
+        self.assertEqual(
+            hmac.new(key, message, hashlib.sha1).digest(),
+            hmac_sha1.digest(message))
+
+
+class StreamingBodyTest(unittest.TestCase):
+
+  signer = Signer("ak", "sk")
+  data = b"0123456789" * 10000
+
+  def chunks(self):
+    for i in range(0, len(self.data), 1000):
+      yield self.data[i:i + 1000]
+
+  def test_file_body(self):
+    body = io.BytesIO(b"header" + self.data)
+    body.read(6)
+    self.assertEqual(
+        hashlib.md5(self.data).hexdigest(), self.signer.content_md5(body))
+    content_md5, sent_body = self.signer.hash_stream(body)
+    self.assertEqual(hashlib.md5(self.data).hexdigest(), content_md5)
+    self.assertIs(body, sent_body)
+    self.assertEqual(self.data, body.read())
+
+  def test_iterable_body(self):
+    self.assertRaises(ValueError, self.signer.content_md5, self.chunks())
+    content_md5, body = self.signer.hash_stream(self.chunks())
+    self.assertEqual(hashlib.md5(self.data).hexdigest(), content_md5)
+    self.assertIsInstance(body, io.BytesIO)
+    self.assertEqual(self.data, body.read())
+
+  def test_spooled_body(self):
+    spool_max_size = signature.SPOOL_MAX_SIZE
+    signature.SPOOL_MAX_SIZE = 4096
+    try:
+      content_md5, body = self.signer.hash_stream(
+          [u"x" * 3000, u"y" * 3000, u"z" * 3000])
+    finally:
+      signature.SPOOL_MAX_SIZE = spool_max_size
+    data = b"x" * 3000 + b"y" * 3000 + b"z" * 3000
+    self.assertEqual(hashlib.md5(data).hexdigest(), content_md5)
+    self.assertNotIsInstance(body, io.BytesIO)
+    self.assertEqual(data, body.read())
+    body.close()
+
+  def test_sign_request(self):
+    request = requests.Request(
+        "POST", "http://cloud-ml/cloud_ml/v1/train", data=self.chunks(),
+        auth=self.signer).prepare()
+    self.assertNotIn("Transfer-Encoding", request.headers)
+    self.assertEqual(str(len(self.data)), request.headers["Content-Length"])
+    self.assertEqual(hashlib.md5(self.data).hexdigest(),
+                     request.headers["X-Xiaomi-Content-MD5"])
+    self.assertEqual(self.data, request.body.read())
+
+  def test_sign_request_with_content_md5(self):
+    chunks = self.chunks()
+    request = requests.Request(
+        "POST", "http://cloud-ml/cloud_ml/v1/train", data=chunks,
+        headers={"X-Xiaomi-Content-MD5": hashlib.md5(self.data).hexdigest()},
+        auth=self.signer).prepare()
+    self.assertIs(chunks, request.body)
+    self.assertEqual("chunked", request.headers["Transfer-Encoding"])
+
+
+class GalaxyV2SignerTest(unittest.TestCase):
+
+  signer = GalaxyV2Signer("AKVISION", "vision-secret")
+  uri = "http://cnbj2.vision.api.xiaomi.com/v1/image:detect"
+  headers = {
+      "content-type": "application/json; charset=UTF-8",
+      "date": "Tue, 18 Oct 2016 06:24:20 GMT",
+      "x-xiaomi-request-id": "3f8b6a2e_42",
+      "content-md5": ""
+  }
+
+  def test_auth_headers(self):
+    headers = self.signer.auth_headers("POST", self.uri, self.headers)
+    self.assertEqual("Galaxy-V2 AKVISION:etbs+RmeQsHSJafZopqMHdNQSTA=",
+                     headers["authorization"])
+    self.assertNotIn("authorization", self.headers)
+    self.assertEqual(self.headers["date"], headers["date"])
+
+  def test_auth_headers_with_list_header(self):
+    headers = dict(self.headers)
+    headers["X-Xiaomi-Meta"] = [" a ", "b"]
+    headers["x-xiaomi-empty"] = ""
+    headers["content-md5"] = "0123456789abcdef"
+    self.assertEqual(
+        "x-xiaomi-meta:a,b\nx-xiaomi-request-id:3f8b6a2e_42\n",
+        self.signer.canonicalize_headers(headers))
+    headers = self.signer.auth_headers("GET", self.uri + "?b=2&a=1", headers)
+    self.assertEqual("Galaxy-V2 AKVISION:jiCJi7s6kZtmHkBEHdpLAcQR/oM=",
+                     headers["authorization"])
+
+  def test_canonicalize_resource(self):
+    self.assertEqual("/v1/image:detect",
+                     self.signer.canonicalize_resource(self.uri + "?a=1"))
+    signer = GalaxyV2Signer("AKVISION", "vision-secret", ["acl", "b"])
+    self.assertEqual("/v1/image:detect?acl&b=2",
+                     signer.canonicalize_resource(self.uri + "?b=2&acl&a=1"))
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -18,7 +18,7 @@ except ImportError:
   from distutils.core import setup
 
 setup(name="cloud_ml_common",
-      version="0.2.2",
+      version="0.2.3",
       author="Xiaomi",
       license="Apache License",
       description="Xiaomi Cloud-ml Common",
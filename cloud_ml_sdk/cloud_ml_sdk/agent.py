@@ -0,0 +1,237 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The local agent which keeps the clients warm for the `cloudml` commands.
+
+The agent listens on a unix socket, and keeps a CloudMlClient for each
+credentials with the keep-alive connections, the response cache and the
+single-flight requests. Each line of the socket is a json request of a
+client method, which is answered by a json line of its result. The items of
+the `iter_*` methods are streamed as a json line each, and end with
+`{"end": true}`.
+
+  cloudml agent start -d
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import types
+
+try:
+  import socketserver
+except ImportError:
+  import SocketServer as socketserver
+
+from . import agent_client
+from .cache import ResponseCache
+from .client import CloudMlClient
+from .errors import ErrorResponse
+
+
+# The endpoint groups which are changed by the other clients, so they're
+# revalidated by each request instead of being cached for the default ttls
+AGENT_CACHE_TTLS = {"model": 0, "quota": 0}
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    for line in iter(self.rfile.readline, b""):
+      try:
+        response = self.server.agent.handle(json.loads(line.decode("utf-8")))
+      except Exception as e:
+        logging.exception("Failed to handle the agent request")
+        response = {"error": agent_client.encode_error(e)}
+      try:
+        if "items" in response:
+          self._write_items(response["items"])
+        else:
+          self._write(response)
+      except socket.error:
+        # The command exited without reading all the items
+        return
+
+  def _write(self, response):
+    data = json.dumps(response, default=agent_client.encode_value)
+    self.wfile.write(data.encode("utf-8") + b"\n")
+    self.wfile.flush()
+
+  def _write_items(self, items):
+    """Write each item as it's decoded, so the memory of the agent is bounded
+    and the command prints the first items right away."""
+    while True:
+      try:
+        item = next(items)
+      except StopIteration:
+        break
+      except Exception as e:
+        self._write({"error": agent_client.encode_error(e)})
+        return
+      self._write({"item": item})
+    self._write({"end": True})
+
+
+class _AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+
+class Agent(object):
+  """The agent which runs the client methods of the commands."""
+
+  def __init__(self, path=None, cache_ttls=None):
+    """Create a new Agent and listen on the socket.
+
+    Args:
+      path: The path of the unix socket, `DEFAULT_SOCKET_PATH` by default.
+      cache_ttls: The dictionary of endpoint group and the seconds to cache
+                  its responses, which overrides `AGENT_CACHE_TTLS` and the
+                  default ttls of `ResponseCache`.
+
+    Raises:
+      AgentError: If another agent is running on the socket.
+    """
+    self._path = agent_client.socket_path(path)
+    self._cache_ttls = dict(AGENT_CACHE_TTLS, **(cache_ttls or {}))
+    self._clients = {}
+    self._requests = 0
+    self._started = time.time()
+    self._lock = threading.Lock()
+
+    connection = agent_client.open_connection(self._path)
+    if connection is not None:
+      connection.close()
+      raise agent_client.AgentError(
+          "The agent is already running on {}".format(self._path))
+    if os.path.exists(self._path):
+      # The socket of the agent which didn't stop cleanly
+      os.remove(self._path)
+    directory = os.path.dirname(self._path)
+    if directory and not os.path.exists(directory):
+      os.makedirs(directory, 0o700)
+
+    # Only the user can connect to the socket
+    umask = os.umask(0o177)
+    try:
+      self._server = _AgentServer(self._path, _AgentHandler)
+    finally:
+      os.umask(umask)
+    self._server.agent = self
+
+  @property
+  def path(self):
+    return self._path
+
+  def _client(self, credentials):
+    key = json.dumps(credentials)
+    with self._lock:
+      if key not in self._clients:
+        access_key, secret_key, endpoint = credentials
+        self._clients[key] = CloudMlClient(
+            access_key,
+            secret_key,
+            endpoint,
+            cache=ResponseCache(ttls=self._cache_ttls),
+            single_flight=True)
+      return self._clients[key]
+
+  def handle(self, request):
+    """Run the request of a client method.
+
+    Returns:
+      The dictionary with the "result", the "items" generator of the
+      `iter_*` methods, the "error_response" if the method returns an
+      `ErrorResponse`, or the "error" if it raises an exception.
+    """
+    method = request["method"]
+    with self._lock:
+      self._requests += 1
+    if method == "status":
+      return {"result": self.status()}
+    if method == "stop":
+      threading.Thread(target=self._server.shutdown).start()
+      return {"result": None}
+    if agent_client.is_local_attribute(method) or not hasattr(
+        CloudMlClient, method):
+      raise AttributeError("The agent can't run {}".format(method))
+
+    client = self._client(request["credentials"])
+    try:
+      result = getattr(client, method)(*request["args"], **request["kwargs"])
+    except Exception as e:
+      return {"error": agent_client.encode_error(e)}
+
+    if isinstance(result, types.GeneratorType):
+      return {"items": result}
+    if isinstance(result, ErrorResponse):
+      content = result.content
+      if isinstance(content, bytes):
+        content = content.decode("utf-8", "replace")
+      return {
+          "error_response": {
+              "status_code": result.status_code,
+              "content": content,
+              "reason": result.reason,
+              "method": result.method,
+              "url": result.url,
+              "request_id": result.request_id,
+              "retries": result.retries
+          }
+      }
+    return {"result": result}
+
+  def status(self):
+    """Get the counters of the agent.
+
+    Returns:
+      The dictionary with the socket path, the seconds since it started, the
+      number of requests and clients, and the cache and single-flight
+      counters of each client endpoint.
+    """
+    with self._lock:
+      clients = list(self._clients.values())
+      status = {
+          "path": self._path,
+          "pid": os.getpid(),
+          "uptime": time.time() - self._started,
+          "requests": self._requests,
+          "clients": len(clients)
+      }
+    status["endpoints"] = [{
+        "endpoint": client.endpoint,
+        "cache": client.cache.stats(),
+        "single_flight": client.single_flight.stats()
+    } for client in clients]
+    return status
+
+  def serve_forever(self):
+    """Serve the requests until the agent is stopped or interrupted."""
+    try:
+      self._server.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      self.close()
+
+  def close(self):
+    self._server.server_close()
+    if os.path.exists(self._path):
+      os.remove(self._path)
+    with self._lock:
+      clients = list(self._clients.values())
+      self._clients.clear()
+    for client in clients:
+      client.close()
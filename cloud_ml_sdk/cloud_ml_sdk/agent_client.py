@@ -0,0 +1,376 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Send the requests of the commands to the local `cloudml agent`.
+
+The agent keeps the clients, connections and caches warm between the
+commands. This module only uses the standard library, so a command which
+talks to the agent doesn't import requests.
+
+Example:
+
+  client = connect() or CloudMlClient()
+  client.list_train_jobs()
+"""
+
+import datetime
+import itertools
+import json
+import os
+import socket
+import threading
+
+from . import config
+from .pagination import TIME_FORMAT
+
+AGENT_SOCKET_ENV = "XIAOMI_CLOUDML_AGENT_SOCKET"
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache/xiaomi/cloud_ml/agent.sock")
+
+# The attributes of the client in the calling process, because they read or
+# write the local files, stream for a long time or belong to the local client
+LOCAL_ATTRIBUTES = frozenset([
+    "close", "request_options", "hooks", "add_hook", "remove_hook", "cache",
+    "single_flight", "rate_limiter", "endpoint", "endpoint_selector",
+    "do_predict_server"
+])
+LOCAL_PREFIXES = ("follow_", "download_")
+
+# The methods which only read, so they're run again by the local client if
+# the connection to the agent fails after sending them
+READ_ONLY_PREFIXES = ("describe_", "list_", "get_", "iter_")
+
+
+class AgentError(RuntimeError):
+  """The agent failed to run the request."""
+  pass
+
+
+class AgentConnectionError(AgentError):
+  """The connection to the agent failed.
+
+  Attributes:
+    sent: Whether the request was sent, so the agent may have run it.
+  """
+
+  def __init__(self, message, sent=False):
+    super(AgentConnectionError, self).__init__(message)
+    self.sent = sent
+
+
+def socket_path(path=None):
+  """Get the path of the agent socket, which can be set by the environment."""
+  return path or os.environ.get(AGENT_SOCKET_ENV) or DEFAULT_SOCKET_PATH
+
+
+def is_local_attribute(name):
+  return name.startswith("_") or name in LOCAL_ATTRIBUTES or \
+      name.startswith(LOCAL_PREFIXES)
+
+
+def encode_value(value):
+  """Encode the value which json doesn't support, like the `since` time."""
+  if isinstance(value, datetime.datetime):
+    return value.strftime(TIME_FORMAT)
+  raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def encode_error(e):
+  """Encode the exception of the request for the agent response."""
+  error = {"type": type(e).__name__, "message": str(e)}
+  response = getattr(e, "response", None)
+  if response is not None:
+    error["status_code"] = response.status_code
+    error["content"] = response.content.decode("utf-8", "replace")
+  return error
+
+
+def raise_error(error):
+  """Raise the exception of the agent response.
+
+  The exceptions of requests are raised with the same types, so they're
+  handled like the ones of CloudMlClient.
+  """
+  import requests
+  from . import errors
+
+  error_type = getattr(requests.exceptions, error["type"], None) or getattr(
+      errors, error["type"], None)
+  if not isinstance(error_type, type) or not issubclass(
+      error_type, requests.RequestException):
+    raise AgentError("{}: {}".format(error["type"], error["message"]))
+  response = None
+  if "status_code" in error:
+    response = requests.Response()
+    response.status_code = error["status_code"]
+    response._content = error["content"].encode("utf-8")
+  raise error_type(error["message"], response=response)
+
+
+def decode_error_response(data):
+  """Decode the `ErrorResponse` of the agent response."""
+  from .errors import ErrorResponse
+
+  headers = {}
+  if data.get("request_id"):
+    headers["X-Request-Id"] = data["request_id"]
+  response = ErrorResponse(data["status_code"],
+                           data["content"].encode("utf-8"),
+                           reason=data.get("reason"),
+                           method=data.get("method"),
+                           url=data.get("url"),
+                           headers=headers)
+  response.retries = data.get("retries", 0)
+  return response
+
+
+class AgentConnection(object):
+  """The connection to the agent, which sends one request at a time."""
+
+  def __init__(self, sock):
+    self._socket = sock
+    self._file = sock.makefile("rb")
+    # Whether the items of the last stream are not read to the end
+    self._pending = False
+    self._lock = threading.Lock()
+
+  def _send(self, method, credentials, args, kwargs):
+    """Send the request and read the first line of its response."""
+    request = json.dumps({
+        "method": method,
+        "credentials": credentials,
+        "args": list(args),
+        "kwargs": kwargs or {}
+    }, default=encode_value)
+    if self._pending:
+      # The unread items would be taken as the response of this request
+      self.close()
+      raise AgentConnectionError("The last stream of the agent is not read")
+    try:
+      self._socket.sendall(request.encode("utf-8") + b"\n")
+    except (socket.error, ValueError) as e:
+      raise AgentConnectionError("Failed to talk to the agent: {}".format(e))
+    return self._read()
+
+  def _read(self):
+    """Read a line of the response, and raise the error of the agent."""
+    try:
+      line = self._file.readline()
+    except (socket.error, ValueError) as e:
+      raise AgentConnectionError(
+          "Failed to talk to the agent: {}".format(e), sent=True)
+    if not line:
+      raise AgentConnectionError("The agent closed the connection", sent=True)
+    response = json.loads(line.decode("utf-8"))
+    if "error" in response:
+      self._pending = False
+      raise_error(response["error"])
+    return response
+
+  def call(self, method, credentials=None, args=(), kwargs=None):
+    """Run the method of the client of the credentials in the agent.
+
+    Args:
+      method: The name of the method of CloudMlClient, or "status" and
+              "stop" of the agent.
+      credentials: The list of access key, secret key and endpoint.
+      args: The positional arguments of the method.
+      kwargs: The keyword arguments of the method.
+
+    Returns:
+      The result of the method.
+
+    Raises:
+      TypeError: If the arguments can't be sent to the agent.
+      AgentConnectionError: If the connection to the agent fails.
+      AgentError: If the agent fails to run the method.
+    """
+    with self._lock:
+      response = self._send(method, credentials, args, kwargs)
+    if "error_response" in response:
+      return decode_error_response(response["error_response"])
+    return response.get("result")
+
+  def stream(self, method, credentials=None, args=(), kwargs=None):
+    """Run the `iter_*` method in the agent and read its items as they come.
+
+    The request is sent before returning, so its errors are raised by this
+    method. The connection can't send the other requests until the items
+    are read to the end.
+
+    Returns:
+      The generator of the items.
+
+    Raises:
+      TypeError: If the arguments can't be sent to the agent.
+      AgentConnectionError: If the connection to the agent fails.
+      AgentError: If the agent fails to run the method.
+    """
+    with self._lock:
+      response = self._send(method, credentials, args, kwargs)
+      self._pending = "item" in response
+    if "item" not in response:
+      return iter(response.get("result") or [])
+
+    def generate(response):
+      while "end" not in response:
+        yield response["item"]
+        with self._lock:
+          response = self._read()
+          if "end" in response:
+            self._pending = False
+
+    return generate(response)
+
+  def close(self):
+    self._pending = False
+    self._file.close()
+    self._socket.close()
+
+
+def open_connection(path=None):
+  """Connect to the agent.
+
+  Returns:
+    The `AgentConnection`, or None if the agent isn't running.
+  """
+  path = socket_path(path)
+  if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+    return None
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(path)
+  except socket.error:
+    sock.close()
+    return None
+  return AgentConnection(sock)
+
+
+class AgentClient(object):
+  """The client which runs the methods of CloudMlClient in the agent.
+
+  The methods which use the local files or streams, and the arguments which
+  can't be sent to the agent, like the model objects, are run by a local
+  CloudMlClient instead.
+  """
+
+  def __init__(self, connection, access_key, secret_key, endpoint):
+    self._connection = connection
+    self._credentials = [access_key, secret_key, endpoint]
+    self._local_client = None
+    self._lock = threading.Lock()
+
+  def _local(self):
+    with self._lock:
+      if self._local_client is None:
+        from .client import CloudMlClient
+        self._local_client = CloudMlClient(*self._credentials)
+      return self._local_client
+
+  def _disconnect(self, connection):
+    """Stop using the failed connection, and run the requests locally."""
+    with self._lock:
+      if self._connection is connection:
+        self._connection = None
+    connection.close()
+
+  def __getattr__(self, name):
+    if is_local_attribute(name):
+      return getattr(self._local(), name)
+
+    def call(*args, **kwargs):
+      connection = self._connection
+      if connection is None:
+        return getattr(self._local(), name)(*args, **kwargs)
+      try:
+        if name.startswith("iter_"):
+          return self._stream(connection, name, args, kwargs)
+        return connection.call(name, self._credentials, args, kwargs)
+      except TypeError:
+        return getattr(self._local(), name)(*args, **kwargs)
+      except AgentConnectionError as e:
+        self._disconnect(connection)
+        if e.sent and not name.startswith(READ_ONLY_PREFIXES):
+          # The agent may have run it, so it's not sent again
+          raise
+        return getattr(self._local(), name)(*args, **kwargs)
+
+    return call
+
+  def _stream(self, connection, name, args, kwargs):
+    """Stream the items from the agent, and from the local client after the
+    items already read if the connection fails."""
+    items = connection.stream(name, self._credentials, args, kwargs)
+
+    def generate():
+      count = 0
+      try:
+        for item in items:
+          yield item
+          count += 1
+      except AgentConnectionError:
+        self._disconnect(connection)
+        local_items = getattr(self._local(), name)(*args, **kwargs)
+        for item in itertools.islice(local_items, count, None):
+          yield item
+
+    return generate()
+
+  def do_predict(self, model_name, model_version, data_file, timeout=10.0):
+    """Request the model service whose address is cached by the agent."""
+    model_service = self.describe_model_service(model_name, model_version)
+    if type(model_service) is dict:
+      return self.do_predict_server(model_service["address"], model_name,
+                                    data_file, timeout)
+    return json.dumps({
+        "error": True,
+        "message": "Fail to get information of model service"
+    })
+
+  def close(self):
+    if self._connection is not None:
+      self._connection.close()
+    if self._local_client is not None:
+      self._local_client.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+
+def connect(access_key=None, secret_key=None, endpoint=None, profile=None,
+            path=None):
+  """Get the client of the agent, if it's running.
+
+  Args:
+    access_key: Access key for authentic.
+    secret_key: Secret key for authentic.
+    endpoint: The endpoint of cloud-ml service.
+    profile: The named profile of the credentials in the configuration file.
+    path: The path of the agent socket.
+
+  Returns:
+    The `AgentClient`, or None if the agent isn't running.
+
+  Raises:
+    ValueError: If the credentials can't be found.
+  """
+  credentials = config.resolve_credentials(access_key, secret_key, endpoint,
+                                           profile)
+  connection = open_connection(path)
+  if connection is None:
+    return None
+  return AgentClient(connection, *credentials)
@@ -0,0 +1,102 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from cloud_ml_sdk import agent_client
+from cloud_ml_sdk.agent import Agent
+from cloud_ml_sdk.client_test import (ACCESS_KEY, FAKE_TRAIN_JOBS, SECRET_KEY,
+                                      SigningHandler)
+from cloud_ml_sdk.stand_in_server import start_server
+
+
+@unittest.skipIf(not hasattr(socket, "AF_UNIX"), "requires unix sockets")
+class AgentTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(SigningHandler, unavailable=0)
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, "agent.sock")
+    self.agent = Agent(self.path)
+    self.thread = threading.Thread(target=self.agent.serve_forever)
+    self.thread.daemon = True
+    self.thread.start()
+    self.client = agent_client.connect(ACCESS_KEY, SECRET_KEY,
+                                       self.server.endpoint, path=self.path)
+
+  def tearDown(self):
+    self.client.close()
+    self.agent._server.shutdown()
+    self.thread.join()
+    self.server.stop()
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+  def test_stream_items(self):
+    self.assertEqual(FAKE_TRAIN_JOBS, list(self.client.iter_train_jobs()))
+    self.assertEqual(FAKE_TRAIN_JOBS, self.client.list_train_jobs())
+    self.assertIsNotNone(self.client._connection)
+
+    # Each item is a line of the response
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(self.path)
+    sock.sendall(json.dumps({
+        "method": "iter_train_jobs",
+        "credentials": [ACCESS_KEY, SECRET_KEY, self.server.endpoint],
+        "args": [],
+        "kwargs": {}
+    }).encode("utf-8") + b"\n")
+    with sock.makefile("rb") as f:
+      lines = [json.loads(f.readline().decode("utf-8"))
+               for _ in range(len(FAKE_TRAIN_JOBS) + 1)]
+    sock.close()
+    self.assertEqual([{"item": job} for job in FAKE_TRAIN_JOBS] +
+                     [{"end": True}], lines)
+
+  def test_unread_stream(self):
+    items = self.client.iter_train_jobs()
+    self.assertEqual(FAKE_TRAIN_JOBS[0], next(items))
+    # The connection with the unread items is not used again
+    self.assertEqual(FAKE_TRAIN_JOBS, self.client.list_train_jobs())
+    self.assertIsNone(self.client._connection)
+    self.assertEqual(FAKE_TRAIN_JOBS[1:], list(items))
+
+  def test_revalidate_quota(self):
+    for _ in range(2):
+      self.assertEqual(FAKE_TRAIN_JOBS, self.client.get_quota())
+    self.assertEqual(2, len(self.server.requests))
+
+  def test_fall_back_to_local_client(self):
+    self.client._connection._socket.shutdown(socket.SHUT_RDWR)
+    self.assertEqual(FAKE_TRAIN_JOBS, self.client.list_train_jobs())
+    self.assertIsNone(self.client._connection)
+    self.assertEqual(FAKE_TRAIN_JOBS, list(self.client.iter_train_jobs()))
+
+  def test_fall_back_while_streaming(self):
+    items = self.client.iter_train_jobs()
+    self.assertEqual(FAKE_TRAIN_JOBS[:2], [next(items), next(items)])
+    # The rest of the items may be buffered already, so the reader fails
+    # instead of the socket
+    self.client._connection._file.close()
+    self.assertEqual(FAKE_TRAIN_JOBS[2:], list(items))
+    self.assertIsNone(self.client._connection)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The asyncio client of cloud-ml, which requires Python 3.5.3+ and aiohttp.
+
+Example:
+
+  async with AsyncCloudMlClient(max_concurrency=64) as client:
+    train_jobs = await asyncio.gather(
+        *[client.describe_train_job(name) for name in job_names])
+"""
+
+import asyncio
+import json
+import time
+
+try:
+  from urllib.parse import urlencode
+except ImportError:
+  from urllib import urlencode
+
+try:
+  import aiohttp
+except ImportError:
+  raise ImportError("AsyncCloudMlClient requires aiohttp, please run "
+                    "`pip install cloud-ml-sdk[async]`")
+
+from . import compression
+from . import config
+from . import logs as log_util
+from .client import load_credentials
+from .endpoints import EndpointSelector, split_endpoints
+from .errors import ErrorResponse
+from .pagination import ListQuery
+from .retry import DEFAULT_TIMEOUT, RetryPolicy
+
+
+def client_timeout(timeout):
+  """Get the `aiohttp.ClientTimeout` of the timeout of `CloudMlClient`.
+
+  Args:
+    timeout: The seconds to wait for the server, a float or a tuple of
+             connect and read timeouts. None means to wait forever.
+  """
+  if timeout is None:
+    return aiohttp.ClientTimeout(total=None)
+  if isinstance(timeout, tuple):
+    connect, read = timeout
+  else:
+    connect = read = timeout
+  return aiohttp.ClientTimeout(total=None, sock_connect=connect,
+                               sock_read=read)
+
+
+class AsyncCloudMlClient(object):
+  """The asyncio client to auth and operate to cloud-ml.
+
+  It provides the coroutine version of the methods of `CloudMlClient`, with
+  the same arguments and return values. At most `max_concurrency` requests
+  of each event loop are in flight at the same time, the others wait for a
+  free slot.
+
+  The client can be used by multiple event loops, such as the successive
+  `asyncio.run` calls. Each loop has its own connections, which are closed
+  by `close` in that loop.
+  """
+
+  def __init__(self,
+               access_key=None,
+               secret_key=None,
+               endpoint=None,
+               max_concurrency=32,
+               compress_threshold=None,
+               timeout=DEFAULT_TIMEOUT):
+    """Create a new AsyncCloudMlClient with given definition.
+
+    Args:
+      access_key: Access key for authentic.
+      secret_key: Secret key for authentic.
+      endpoint: The endpoint of cloud-ml service, or the list of endpoints
+                which can also be a comma-separated string. The requests
+                are sent to the fastest healthy one of the multiple
+                endpoints, and fail over to the others.
+      max_concurrency: The max number of concurrent requests.
+      compress_threshold: The min number of bytes to compress the request
+                          body with gzip. None means not to compress.
+      timeout: The seconds to wait for the server, a float or a tuple of
+               connect and read timeouts. None means to wait forever.
+    """
+    access_key, secret_key, endpoint = load_credentials(
+        access_key, secret_key, endpoint)
+    endpoints = split_endpoints(endpoint)
+    self._endpoint = endpoints[0]
+    self._endpoint_selector = None
+    if len(endpoints) > 1:
+      # The latencies are measured by the requests, without probing
+      self._endpoint_selector = EndpointSelector(endpoints)
+    self._auth = config.get_signer(access_key, secret_key)
+    self._max_concurrency = max_concurrency
+    self._compress_threshold = compress_threshold
+    self._timeout = client_timeout(timeout)
+    # The idempotent methods which fail over on any failure
+    self._failover_methods = RetryPolicy().methods
+    # The session and semaphore of each event loop, which are bound to the
+    # loop and created by its first request
+    self._loops = {}
+    self._train_url = self._endpoint + "/cloud_ml/v1/train"
+    self._model_url = self._endpoint + "/cloud_ml/v1/model"
+    self._dev_url = self._endpoint + "/cloud_ml/v1/dev"
+    self._tensorboard_url = self._endpoint + "/cloud_ml/v1/tensorboard"
+    self._quota_url = self._endpoint + "/cloud_ml/v1/quota"
+    self._framework_url = self._endpoint + "/cloud_ml/v1/framework"
+    self._authentication_url = self._endpoint + "/cloud_ml/v1/authentication"
+    self._org_id_url = self._endpoint + "/cloud_ml/v1/org_ids"
+    self._dev_server_url = self._endpoint + "/dev_server/v1/dev_servers"
+
+  @property
+  def endpoint(self):
+    return self._endpoint
+
+  @property
+  def endpoint_selector(self):
+    return self._endpoint_selector
+
+  def _loop_state(self):
+    """Get the session and semaphore of the running event loop."""
+    loop = asyncio.get_event_loop()
+    state = self._loops.get(loop)
+    if state is None:
+      for closed in [other for other in self._loops if other.is_closed()]:
+        # The loop is gone with the connections of its session
+        del self._loops[closed]
+      state = (aiohttp.ClientSession(
+          connector=aiohttp.TCPConnector(limit=self._max_concurrency),
+          timeout=self._timeout), asyncio.Semaphore(self._max_concurrency))
+      self._loops[loop] = state
+    return state
+
+  async def close(self):
+    """Close the connections of this client in the running event loop."""
+    state = self._loops.pop(asyncio.get_event_loop(), None)
+    if state is not None:
+      await state[0].close()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.close()
+
+  def _url(self, base_url, *names, **kwargs):
+    """Construct the url of the resource.
+
+    Args:
+      base_url: The url of the resource type.
+      names: The path segments after `base_url`.
+      org_id: The org_id to operate, which is optional.
+    """
+    url = "/".join((base_url, ) + names)
+    org_id = kwargs.get("org_id")
+    if org_id:
+      url += "?org_id=" + org_id
+    return url
+
+  def _route(self, url, exclude):
+    """Get the endpoint and the url to send the request of the url to, like
+    `CloudMlClient._route`."""
+    if self._endpoint_selector is None or not url.startswith(self._endpoint):
+      return None, url
+    endpoint = self._endpoint_selector.select(exclude)
+    return endpoint, endpoint + url[len(self._endpoint):]
+
+  def _fail_over(self, method, endpoint, failed_endpoints, connected=True):
+    """Record the failure of the endpoint, and check whether to send the
+    request to another endpoint."""
+    if endpoint is None:
+      return False
+    self._endpoint_selector.record(endpoint, failed=True)
+    failed_endpoints.append(endpoint)
+    if connected and method not in self._failover_methods:
+      # The server may have run the request
+      return False
+    return len(failed_endpoints) < len(self._endpoint_selector.endpoints)
+
+  async def _request(self, method, url, data=None, key=None, auth=True):
+    """Send the signed http request and decode the response.
+
+    With multiple endpoints, the request is sent to the fastest healthy
+    endpoint. It's sent to the next endpoint if the connection can't be
+    established, and also on the other connection errors, timeouts and 5xx
+    responses if the method is idempotent.
+
+    Args:
+      method: The http method, such as "GET" or "POST".
+      url: The url to request.
+      data: The string or dictionary body of the request.
+      key: The key of the json response to return, which is optional.
+      auth: Whether to sign the request or not.
+
+    Returns:
+      The decoded json data if the request succeeds, otherwise the
+      `errors.ErrorResponse`.
+
+    Raises:
+      aiohttp.ClientError: If the connection fails.
+      asyncio.TimeoutError: If the server doesn't respond in the timeout.
+    """
+    headers = {}
+    if isinstance(data, dict):
+      # Encode as form data like `requests` does for dictionaries
+      data = urlencode(data, doseq=True)
+      headers["Content-Type"] = "application/x-www-form-urlencoded"
+    body, encoding_headers = compression.encode_body(
+        data or "", self._compress_threshold)
+    headers.update(encoding_headers)
+    if auth:
+      headers.update(self._auth.sign_headers(url, body))
+
+    session, semaphore = self._loop_state()
+    failed_endpoints = []
+    while True:
+      endpoint, endpoint_url = self._route(url, failed_endpoints)
+      start = time.time()
+      try:
+        async with semaphore:
+          async with session.request(
+              method, endpoint_url, data=body, headers=headers) as response:
+            content = await response.read()
+      except aiohttp.ClientConnectorError:
+        if self._fail_over(method, endpoint, failed_endpoints,
+                           connected=False):
+          continue
+        raise
+      except (aiohttp.ClientError, asyncio.TimeoutError):
+        if self._fail_over(method, endpoint, failed_endpoints):
+          continue
+        raise
+      if response.status >= 500 and \
+          self._fail_over(method, endpoint, failed_endpoints):
+        continue
+      if endpoint is not None and response.status < 500:
+        self._endpoint_selector.record(endpoint, time.time() - start)
+      if response.status >= 400:
+        return ErrorResponse(response.status, content,
+                             reason=response.reason, method=method,
+                             url=endpoint_url, headers=response.headers)
+      break
+
+    result = json.loads(content.decode("utf-8"))
+    return result[key] if key else result
+
+  async def _list(self, query, base_url, org_id, name_key):
+    """Request the list with the paging and filtering query."""
+    result = await self._request(
+        "GET", query.list_url(base_url, org_id), key="data")
+    if isinstance(result, ErrorResponse):
+      return result
+    return query.filter(result, name_key)
+
+  async def _logs(self, url, org_id, offset, line_offset):
+    """Request the logs after the byte or line offset."""
+    result = await self._request(
+        "GET", log_util.logs_url(url, org_id, offset, line_offset))
+    if isinstance(result, ErrorResponse):
+      return result
+    return log_util.slice_logs(result, offset, line_offset)
+
+  async def submit_train_job(self, json_data):
+    """Submit a train_job to run."""
+    return await self._request("POST", self._train_url, data=json_data)
+
+  async def list_train_jobs(self,
+                            org_id=None,
+                            limit=None,
+                            offset=None,
+                            page_token=None,
+                            state=None,
+                            created_after=None,
+                            name_prefix=None):
+    """List train jobs."""
+    query = ListQuery(limit=limit, offset=offset, page_token=page_token,
+                      state=state, created_after=created_after,
+                      name_prefix=name_prefix)
+    return await self._list(query, self._train_url, org_id, "job_name")
+
+  async def describe_train_job(self, job_name, org_id=None):
+    """Describe and get information of the train job."""
+    return await self._request(
+        "GET", self._url(self._train_url, job_name, org_id=org_id))
+
+  async def get_train_job_logs(self,
+                               job_name,
+                               org_id=None,
+                               offset=None,
+                               line_offset=None):
+    """Get logs of the train job after the byte or line offset."""
+    return await self._logs(
+        self._url(self._train_url, job_name, "logs"), org_id, offset,
+        line_offset)
+
+  async def get_train_job_metrics(self, job_name, org_id=None):
+    """Get the metrics of the train job."""
+    return await self._request(
+        "GET", self._url(self._train_url, job_name, "metrics", org_id=org_id))
+
+  async def get_train_job_hyperparameters_data(self, job_name):
+    """Get hyperparameters data of the train job."""
+    return await self._request(
+        "GET", self._url(self._train_url, job_name, "hyperparameters"))
+
+  async def delete_train_job(self, job_name):
+    """Delete the train job."""
+    return await self._request("DELETE", self._url(self._train_url, job_name))
+
+  async def get_train_job_events(self, job_name, org_id=None):
+    """Get events of the train job."""
+    return await self._request(
+        "GET", self._url(self._train_url, job_name, "events", org_id=org_id))
+
+  async def create_model_service(self, model_service):
+    """Create the model service."""
+    return await self._request(
+        "POST", self._model_url, data=model_service.get_json_data())
+
+  async def list_model_services(self,
+                                org_id=None,
+                                limit=None,
+                                offset=None,
+                                page_token=None,
+                                state=None,
+                                created_after=None,
+                                name_prefix=None):
+    """List model services."""
+    query = ListQuery(limit=limit, offset=offset, page_token=page_token,
+                      state=state, created_after=created_after,
+                      name_prefix=name_prefix)
+    return await self._list(query, self._model_url, org_id, "model_name")
+
+  async def describe_model_service(self, model_name, model_version,
+                                   org_id=None):
+    """Describe and get information of the model service."""
+    return await self._request("GET", self._url(
+        self._model_url, model_name, model_version, org_id=org_id))
+
+  async def update_model_service(self, model_name, model_version, update_json,
+                                 org_id=None):
+    """Update the model service."""
+    return await self._request("PUT", self._url(
+        self._model_url, model_name, model_version, org_id=org_id),
+                               data=update_json)
+
+  async def get_model_service_logs(self,
+                                   model_name,
+                                   model_version,
+                                   org_id=None,
+                                   offset=None,
+                                   line_offset=None):
+    """Get logs of the model service after the byte or line offset."""
+    return await self._logs(
+        self._url(self._model_url, model_name, model_version, "logs"), org_id,
+        offset, line_offset)
+
+  async def get_model_service_metrics(self, model_name, model_version,
+                                      org_id=None):
+    """Get the metrics of the model service."""
+    return await self._request("GET", self._url(
+        self._model_url, model_name, model_version, "metrics", org_id=org_id))
+
+  async def delete_model_service(self, model_name, model_version):
+    """Delete the model service."""
+    return await self._request(
+        "DELETE", self._url(self._model_url, model_name, model_version))
+
+  async def get_model_service_events(self, model_name, model_version,
+                                     org_id=None):
+    """Get events of the model service."""
+    return await self._request("GET", self._url(
+        self._model_url, model_name, model_version, "events", org_id=org_id))
+
+  async def create_dev_env(self, dev_env):
+    """Create the dev env."""
+    return await self._request(
+        "POST", self._dev_url, data=dev_env.get_json_data())
+
+  async def list_dev_envs(self,
+                          org_id=None,
+                          limit=None,
+                          offset=None,
+                          page_token=None,
+                          state=None,
+                          created_after=None,
+                          name_prefix=None):
+    """List the dev environments."""
+    query = ListQuery(limit=limit, offset=offset, page_token=page_token,
+                      state=state, created_after=created_after,
+                      name_prefix=name_prefix)
+    return await self._list(query, self._dev_url, org_id, "dev_name")
+
+  async def describe_dev_env(self, dev_name, org_id=None):
+    """Describe and get information of the dev environment."""
+    return await self._request(
+        "GET", self._url(self._dev_url, dev_name, org_id=org_id))
+
+  async def delete_dev_env(self, dev_name):
+    """Delete the dev environment."""
+    return await self._request("DELETE", self._url(self._dev_url, dev_name))
+
+  async def get_dev_env_events(self, dev_name):
+    """Get events of the dev env."""
+    return await self._request(
+        "GET", self._url(self._dev_url, dev_name, "events"))
+
+  async def get_dev_env_metrics(self, dev_name):
+    """Get the metrics of the dev env."""
+    return await self._request(
+        "GET", self._url(self._dev_url, dev_name, "metrics"))
+
+  async def create_dev_server(self, dev_server):
+    """Create the dev server."""
+    return await self._request(
+        "POST", self._dev_server_url, data=dev_server.get_json_data())
+
+  async def list_dev_servers(self,
+                             org_id=None,
+                             limit=None,
+                             offset=None,
+                             page_token=None,
+                             state=None,
+                             created_after=None,
+                             name_prefix=None):
+    """List the dev servers."""
+    query = ListQuery(limit=limit, offset=offset, page_token=page_token,
+                      state=state, created_after=created_after,
+                      name_prefix=name_prefix)
+    return await self._list(query, self._dev_server_url, org_id, "dev_name")
+
+  async def describe_dev_server(self, dev_name, org_id=None):
+    """Describe and get information of the dev server."""
+    return await self._request(
+        "GET", self._url(self._dev_server_url, dev_name, org_id=org_id))
+
+  async def delete_dev_server(self, dev_name):
+    """Delete the dev server."""
+    return await self._request(
+        "DELETE", self._url(self._dev_server_url, dev_name))
+
+  async def get_dev_server_events(self, dev_name):
+    """Get events of the dev server."""
+    return await self._request(
+        "GET", self._url(self._dev_server_url, dev_name, "events"))
+
+  async def create_tensorboard_service(self, tensorboard_service):
+    """Create the tensorboard_service."""
+    return await self._request(
+        "POST", self._tensorboard_url,
+        data=tensorboard_service.get_json_data())
+
+  async def list_tensorboard_services(self,
+                                      org_id=None,
+                                      limit=None,
+                                      offset=None,
+                                      page_token=None,
+                                      state=None,
+                                      created_after=None,
+                                      name_prefix=None):
+    """List tensorboard_services."""
+    query = ListQuery(limit=limit, offset=offset, page_token=page_token,
+                      state=state, created_after=created_after,
+                      name_prefix=name_prefix)
+    return await self._list(
+        query, self._tensorboard_url, org_id, "tensorboard_name")
+
+  async def describe_tensorboard_service(self, tensorboard_name, org_id=None):
+    """Describe and get information of the tensorboard_service."""
+    return await self._request("GET", self._url(
+        self._tensorboard_url, tensorboard_name, org_id=org_id))
+
+  async def delete_tensorboard_service(self, tensorboard_name):
+    """Delete the tensorboard_service."""
+    return await self._request(
+        "DELETE", self._url(self._tensorboard_url, tensorboard_name))
+
+  async def get_tensorboard_service_events(self, tensorboard_name):
+    """Get events of the tensorboard service."""
+    return await self._request(
+        "GET", self._url(self._tensorboard_url, tensorboard_name, "events"))
+
+  async def get_quota(self, org_id=None):
+    """Get quota."""
+    return await self._request(
+        "GET", self._url(self._quota_url, org_id=org_id), key="data")
+
+  async def update_quota(self, quota):
+    """Update quota by admin."""
+    return await self._request("PUT", self._url(self._quota_url, quota.org_id),
+                               data=quota.get_json_data())
+
+  async def get_frameworks(self):
+    return await self._request("GET", self._framework_url, auth=False)
+
+  async def authentication(self):
+    return await self._request("GET", self._authentication_url)
+
+  async def get_org_id(self):
+    return await self._request("GET", self._org_id_url)
@@ -0,0 +1,97 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare AsyncCloudMlClient with CloudMlClient against a local server.
+
+The local server answers every request with a fake train job after the given
+latency, which stands in for the network and the cloud-ml service.
+
+  python -m cloud_ml_sdk.async_client_benchmark -n 500 -c 50 -l 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from cloud_ml_sdk.async_client import AsyncCloudMlClient
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+FAKE_TRAIN_JOB = json.dumps({
+    "job_name": "benchmark",
+    "state": "running",
+    "create_time": "2017-01-01 00:00:00",
+    "update_time": "2017-01-01 00:00:00"
+}).encode("utf-8")
+
+
+def create_handler(latency):
+
+  class LatencyHandler(StandInHandler):
+
+    def handle_request(self, body):
+      time.sleep(latency)
+      self.reply(200, FAKE_TRAIN_JOB)
+
+  return LatencyHandler
+
+
+def benchmark_sync(endpoint, requests_count):
+  with CloudMlClient("ak", "sk", endpoint) as client:
+    start = time.time()
+    for i in range(requests_count):
+      client.describe_train_job("job-{}".format(i))
+    return time.time() - start
+
+
+def benchmark_async(endpoint, requests_count, concurrency):
+
+  async def run():
+    async with AsyncCloudMlClient(
+        "ak", "sk", endpoint, max_concurrency=concurrency) as client:
+      start = time.time()
+      await asyncio.gather(*[
+          client.describe_train_job("job-{}".format(i))
+          for i in range(requests_count)
+      ])
+      return time.time() - start
+
+  return asyncio.get_event_loop().run_until_complete(run())
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", "--requests", type=int, default=200,
+                      help="The number of requests")
+  parser.add_argument("-c", "--concurrency", type=int, default=32,
+                      help="The max concurrency of the async client")
+  parser.add_argument("-l", "--latency", type=float, default=0.02,
+                      help="The latency in seconds of the local server")
+  args = parser.parse_args()
+
+  server = start_server(create_handler(args.latency))
+  endpoint = server.endpoint
+
+  print("{:24} {:>12} {:>12}".format("CLIENT", "SECONDS", "REQUESTS/S"))
+  sync_seconds = benchmark_sync(endpoint, args.requests)
+  print("{:24} {:>12.3f} {:>12.1f}".format(
+      "CloudMlClient", sync_seconds, args.requests / sync_seconds))
+  async_seconds = benchmark_async(endpoint, args.requests, args.concurrency)
+  print("{:24} {:>12.3f} {:>12.1f}".format(
+      "AsyncCloudMlClient", async_seconds, args.requests / async_seconds))
+  server.stop()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,160 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+import unittest
+import warnings
+
+try:
+  import aiohttp
+  from cloud_ml_sdk.async_client import AsyncCloudMlClient, client_timeout
+except ImportError:
+  AsyncCloudMlClient = None
+
+from cloud_ml_sdk.client_test import (ACCESS_KEY, FAKE_TRAIN_JOBS, SECRET_KEY,
+                                      SigningHandler)
+from cloud_ml_sdk.retry import DEFAULT_TIMEOUT
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+
+class StalledHandler(StandInHandler):
+  """The server which doesn't respond in time."""
+
+  def handle_request(self, body):
+    time.sleep(1)
+    self.reply(200, {"data": []})
+
+
+def run(coroutine):
+  """Run the coroutine in a new event loop, like `asyncio.run`."""
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
+
+@unittest.skipIf(AsyncCloudMlClient is None, "aiohttp is not installed")
+class AsyncCloudMlClientTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servers = [start_server(SigningHandler, unavailable=0)
+                    for _ in range(2)]
+
+  def tearDown(self):
+    for server in self.servers:
+      server.stop()
+
+  def test_multiple_endpoints(self):
+    endpoint = ",".join(server.endpoint for server in self.servers)
+
+    async def list_train_jobs():
+      async with AsyncCloudMlClient(ACCESS_KEY, SECRET_KEY,
+                                    endpoint) as client:
+        self.assertEqual(self.servers[0].endpoint, client.endpoint)
+        return await client.list_train_jobs()
+
+    self.assertEqual(FAKE_TRAIN_JOBS, run(list_train_jobs()))
+    self.assertEqual(1, len(self.servers[0].requests))
+
+  def test_fail_over_refused_connection(self):
+    refused = start_server(SigningHandler)
+    refused.stop()
+    endpoints = [refused.endpoint, self.servers[0].endpoint]
+
+    async def requests():
+      async with AsyncCloudMlClient(ACCESS_KEY, SECRET_KEY,
+                                    endpoints) as client:
+        jobs = await client.list_train_jobs()
+        # Nothing is sent, so POST fails over too
+        job = await client.submit_train_job('{"job_name": "linear"}')
+        return jobs, job, client.endpoint_selector.status()
+
+    jobs, job, status = run(requests())
+    self.assertEqual(FAKE_TRAIN_JOBS, jobs)
+    self.assertEqual({"job_name": "linear"}, job)
+    self.assertEqual(["GET", "POST"],
+                     [r["method"] for r in self.servers[0].requests])
+    self.assertIsNone(status[0]["latency"])
+    self.assertIsNotNone(status[1]["latency"])
+
+  def test_fail_over_unavailable(self):
+    self.servers[0].unavailable = 2
+    endpoints = [server.endpoint for server in self.servers]
+
+    async def requests():
+      async with AsyncCloudMlClient(ACCESS_KEY, SECRET_KEY,
+                                    endpoints) as client:
+        jobs = await client.list_train_jobs()
+        # The server may have run POST, so it's not sent again
+        error = await client.submit_train_job('{"job_name": "linear"}')
+        return jobs, error
+
+    jobs, error = run(requests())
+    self.assertEqual(FAKE_TRAIN_JOBS, jobs)
+    self.assertEqual(503, error.status_code)
+    self.assertEqual(0, self.servers[0].unavailable)
+    self.assertEqual(["GET"], [r["method"] for r in self.servers[1].requests])
+
+  def test_timeout(self):
+    timeout = client_timeout(DEFAULT_TIMEOUT)
+    self.assertEqual((DEFAULT_TIMEOUT[0], DEFAULT_TIMEOUT[1]),
+                     (timeout.sock_connect, timeout.sock_read))
+    self.assertIsNone(client_timeout(None).sock_read)
+
+    server = start_server(StalledHandler)
+    self.addCleanup(server.stop)
+
+    async def list_train_jobs():
+      async with AsyncCloudMlClient(ACCESS_KEY, SECRET_KEY, server.endpoint,
+                                    timeout=0.2) as client:
+        return await client.list_train_jobs()
+
+    start = time.time()
+    self.assertRaises(asyncio.TimeoutError, run, list_train_jobs())
+    self.assertLess(time.time() - start, 1)
+
+  def test_event_loops(self):
+    client = AsyncCloudMlClient(ACCESS_KEY, SECRET_KEY,
+                                self.servers[0].endpoint)
+
+    async def list_train_jobs(close):
+      try:
+        return await client.list_train_jobs()
+      finally:
+        if close:
+          await client.close()
+
+    # Each loop has its own session, even if the previous one isn't closed
+    with warnings.catch_warnings():
+      warnings.simplefilter("ignore", ResourceWarning)
+      self.assertEqual(FAKE_TRAIN_JOBS, run(list_train_jobs(close=False)))
+      self.assertEqual(FAKE_TRAIN_JOBS, run(list_train_jobs(close=True)))
+    self.assertEqual({}, client._loops)
+
+    async def both():
+      jobs = await client.list_train_jobs()
+      session = client._loop_state()[0]
+      await client.close()
+      return jobs, session
+
+    jobs, session = run(both())
+    self.assertEqual(FAKE_TRAIN_JOBS, jobs)
+    self.assertTrue(session.closed)
+    self.assertEqual(3, len(self.servers[0].requests))
+
+
+if __name__ == "__main__":
+  unittest.main()
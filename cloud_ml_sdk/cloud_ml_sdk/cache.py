@@ -0,0 +1,224 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import requests
+import shutil
+import tempfile
+import threading
+import time
+
+# The default seconds to cache the responses of each endpoint group
+DEFAULT_TTLS = {
+    "framework": 3600,
+    "org_id": 3600,
+    "authentication": 600,
+    "quota": 60,
+    "model": 30
+}
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache/xiaomi/cloud_ml")
+
+
+class MemoryCache(object):
+  """The cache backend which keeps the entries in memory."""
+
+  def __init__(self):
+    self._groups = {}
+    self._lock = threading.Lock()
+
+  def get(self, group, key):
+    with self._lock:
+      return self._groups.get(group, {}).get(key)
+
+  def set(self, group, key, entry):
+    with self._lock:
+      self._groups.setdefault(group, {})[key] = entry
+
+  def clear(self, group):
+    with self._lock:
+      self._groups.pop(group, None)
+
+
+class FileCache(object):
+  """The cache backend which keeps the entries on disk.
+
+  The entries are shared by the processes of the same user, each group is a
+  directory and each entry is a json file in it.
+  """
+
+  def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+    self._cache_dir = cache_dir
+
+  def _group_dir(self, group):
+    return os.path.join(self._cache_dir, group)
+
+  def _entry_path(self, group, key):
+    return os.path.join(
+        self._group_dir(group),
+        hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+  def get(self, group, key):
+    try:
+      with open(self._entry_path(group, key)) as f:
+        entry = json.load(f)
+    except (IOError, OSError, ValueError):
+      return None
+    # The file name is the hash of the key, so check the key for collisions
+    if entry.get("key") != key:
+      return None
+    return entry
+
+  def set(self, group, key, entry):
+    group_dir = self._group_dir(group)
+    if not os.path.exists(group_dir):
+      try:
+        os.makedirs(group_dir, 0o700)
+      except OSError:
+        # Created by another process
+        pass
+    entry = dict(entry, key=key)
+    # Write to a temporary file and rename it to avoid partial entries
+    fd, temp_path = tempfile.mkstemp(dir=group_dir)
+    with os.fdopen(fd, "w") as f:
+      json.dump(entry, f)
+    try:
+      os.rename(temp_path, self._entry_path(group, key))
+    except OSError:
+      os.remove(temp_path)
+
+  def clear(self, group):
+    shutil.rmtree(self._group_dir(group), ignore_errors=True)
+
+
+class ResponseCache(object):
+  """The cache of responses for the read-mostly endpoints of cloud-ml.
+
+  The successful responses are cached for the ttl of their endpoint group.
+  The expired entries with `ETag` or `Last-Modified` header are revalidated
+  with a conditional request, and reused if the server answers 304.
+  """
+
+  def __init__(self, backend=None, ttls=None):
+    """Create a new ResponseCache.
+
+    Args:
+      backend: The cache backend, `MemoryCache` by default.
+      ttls: The dictionary of endpoint group and the seconds to cache its
+            responses. The default ttls are used for the missing groups.
+    """
+    self._backend = backend or MemoryCache()
+    self._ttls = dict(DEFAULT_TTLS)
+    if ttls:
+      self._ttls.update(ttls)
+    self._stats = {
+        "hits": 0,
+        "misses": 0,
+        "revalidations": 0,
+        "stores": 0,
+        "invalidations": 0
+    }
+    self._lock = threading.Lock()
+
+  def _count(self, name):
+    with self._lock:
+      self._stats[name] += 1
+
+  def stats(self):
+    """Get the counters of the cache.
+
+    Returns:
+      The dictionary with the number of hits, misses, revalidations (the
+      expired entries reused after 304), stores and invalidations.
+    """
+    with self._lock:
+      return dict(self._stats)
+
+  def is_cached_group(self, group):
+    return group in self._ttls
+
+  def fetch(self, group, key, send):
+    """Get the response of the request from the cache or by sending it.
+
+    Args:
+      group: The endpoint group of the request.
+      key: The key of the request.
+      send: The function to send the request with the dictionary of extra
+            headers, which returns the `requests.Response`.
+
+    Returns:
+      The `requests.Response` object, whose `from_cache` is True if it's
+      not sent.
+    """
+    entry = self._backend.get(group, key)
+    if entry is not None and entry["expires"] > time.time():
+      self._count("hits")
+      response = self._to_response(entry)
+      response.from_cache = True
+      return response
+
+    headers = {}
+    if entry is not None:
+      if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+      if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    response = send(headers)
+    if headers and response.status_code == 304:
+      entry = dict(entry, expires=time.time() + self._ttls[group])
+      self._backend.set(group, key, entry)
+      self._count("revalidations")
+      cached = self._to_response(entry)
+      cached.elapsed = response.elapsed
+      return cached
+
+    self._count("misses")
+    if response.ok:
+      self._store(group, key, response)
+    return response
+
+  def _store(self, group, key, response):
+    try:
+      content = response.content.decode("utf-8")
+    except UnicodeDecodeError:
+      return
+    self._backend.set(group, key, {
+        "expires": time.time() + self._ttls[group],
+        "url": response.url,
+        "status_code": response.status_code,
+        "content_type": response.headers.get("Content-Type"),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content": content
+    })
+    self._count("stores")
+
+  def _to_response(self, entry):
+    response = requests.Response()
+    response.url = entry["url"]
+    response.status_code = entry["status_code"]
+    response.reason = "OK"
+    response.encoding = "utf-8"
+    response._content = entry["content"].encode("utf-8")
+    if entry.get("content_type"):
+      response.headers["Content-Type"] = entry["content_type"]
+    return response
+
+  def invalidate(self, group):
+    """Remove the cached responses of the endpoint group."""
+    self._backend.clear(group)
+    self._count("invalidations")
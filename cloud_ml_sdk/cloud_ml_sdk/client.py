@@ -14,18 +14,59 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
+import copy
 import json
 import logging
+from multiprocessing.pool import ThreadPool
 import os
 import requests
 import sys
-
-from cloud_ml_common.auth.signature import Signer
+import threading
+import time
+import uuid
+
+from cloud_ml_common.auth import signature
+from cloud_ml_common.auth.constant import Constant
+
+from . import compression
+from . import config
+from . import hooks as request_hooks
+from . import json_stream
+from . import logs as log_util
+from .endpoints import (DEFAULT_PROBE_INTERVAL, EndpointSelector,
+                        split_endpoints)
+from .errors import DeadlineExceededError, ErrorResponse
+from .pagination import ListQuery
+from .retry import (DEFAULT_TIMEOUT, IDEMPOTENCY_KEY_HEADER, RequestOptions,
+                    RetryPolicy)
+from .single_flight import SingleFlight
 
 sys.path.append("../../cloud_ml_common/")
 logging.basicConfig(level=logging.DEBUG)
 
 
+def load_credentials(access_key=None, secret_key=None, endpoint=None,
+                     profile=None):
+  """Load the credentials of cloud-ml which are not given.
+
+  The missing access key, secret key and endpoint are read from the
+  environment variables or the configuration file of `cloudml init`, which
+  is read once per process.
+
+  Args:
+    access_key: Access key for authentic.
+    secret_key: Secret key for authentic.
+    endpoint: The endpoint of cloud-ml service.
+    profile: The named profile in the configuration file, which is optional.
+
+  Returns:
+    The tuple of access key, secret key and endpoint.
+  """
+  return tuple(config.resolve_credentials(access_key, secret_key, endpoint,
+                                          profile))
+
+
 class CloudMlClient(object):
   """The client to auth and operate to cloud-ml.
 
@@ -34,7 +75,26 @@ class CloudMlClient(object):
    methods.
   """
 
-  def __init__(self, access_key=None, secret_key=None, endpoint=None):
+  # The bytes to read at a time from the streamed list responses
+  STREAM_CHUNK_SIZE = 64 * 1024
+
+  def __init__(self,
+               access_key=None,
+               secret_key=None,
+               endpoint=None,
+               pool_connections=10,
+               pool_maxsize=10,
+               cache=None,
+               hooks=None,
+               timeout=DEFAULT_TIMEOUT,
+               deadline=None,
+               retry_policy=None,
+               single_flight=False,
+               rate_limiter=None,
+               probe_interval=DEFAULT_PROBE_INTERVAL,
+               profile=None,
+               share_transport=False,
+               compress_threshold=None):
     """Create a new CloudMlClient with given definition.
 
     The `access_key` and `secret_key` must be provided.
@@ -42,49 +102,65 @@ class CloudMlClient(object):
     Args:
       access_key: Access key for authentic.
       secret_key: Secret key for authentic.
+      endpoint: The endpoint of cloud-ml service, or the list of endpoints
+                which can also be a comma-separated string. The requests are
+                routed to the fastest healthy one of the multiple endpoints.
+      pool_connections: The number of hosts to keep connection pools for.
+      pool_maxsize: The max number of keep-alive connections for each host.
+      cache: The `cache.ResponseCache` for the read-mostly endpoints, which
+             is optional.
+      hooks: The list of `hooks.RequestHook` called before and after each
+             request, which is optional.
+      timeout: The seconds to wait for the server, a float or a tuple of
+               connect and read timeouts. None means to wait forever.
+      deadline: The seconds to finish each request including its retries,
+                which is optional.
+      retry_policy: The `retry.RetryPolicy` of the requests. The default
+                    policy retries GET and DELETE requests up to 3 times.
+      single_flight: Whether the concurrent identical GET requests share one
+                     in-flight request and its decoded result.
+      rate_limiter: The `rate_limit.RateLimiter` of the endpoint groups,
+                    which is optional.
+      probe_interval: The seconds between the latency probes of the multiple
+                      endpoints.
+      profile: The named profile of the credentials in the configuration
+               file, which is optional.
+      share_transport: Whether to share the keep-alive session with the
+                       other clients of the same access key and endpoint in
+                       this process. The shared session is kept open by
+                       `close`.
+      compress_threshold: The min number of bytes to compress the request
+                          body with gzip, if the server accepts the
+                          compressed bodies. None means not to compress.
     """
-    if access_key == None or secret_key == None:
-      # TODO: check and catch exception
-      # Get keys from environment variables
-      if "XIAOMI_ACCESS_KEY_ID" in os.environ and "XIAOMI_SECRET_ACCESS_KEY" in os.environ:
-        access_key = os.environ["XIAOMI_ACCESS_KEY_ID"]
-        secret_key = os.environ["XIAOMI_SECRET_ACCESS_KEY"]
-      else:
-        # Read keys from configuration file
-        config_filename = os.path.join(
-            os.path.expanduser("~"), ".config/xiaomi/config")
-        if os.path.exists(config_filename):
-          try:
-            with open(config_filename) as f:
-              data = json.load(f)
-              access_key = data["xiaomi_access_key_id"]
-              secret_key = data["xiaomi_secret_access_key"]
-          except Exception as e:
-            raise ValueError(
-                "Failed to load config data, is the json data in right format? Exception content: {}".format(
-                    e))
-        else:
-          raise StandardError(
-              "Can't find access key and secret key, please run cloudml init")
-
-    if endpoint == None:
-      self._endpoint = ""
-      if "XIAOMI_CLOUDML_ENDPOINT" in os.environ:
-        self._endpoint = os.environ["XIAOMI_CLOUDML_ENDPOINT"]
-      else:
-        config_filename = os.path.join(
-            os.path.expanduser("~"), ".config/xiaomi/config")
-        if os.path.exists(config_filename):
-          with open(config_filename) as f:
-            data = json.load(f)
-            self._endpoint = data["xiaomi_cloudml_endpoint"]
-        else:
-          raise StandardError(
-              "Can't find cloudml endpoint, please run cloudml init")
+    access_key, secret_key, endpoint = load_credentials(
+        access_key, secret_key, endpoint, profile)
+    endpoints = split_endpoints(endpoint)
+    self._endpoint = endpoints[0]
+
+    self._access_key = access_key
+    self._auth = config.get_signer(access_key, secret_key)
+    self._cache = cache
+    self._single_flight = SingleFlight() if single_flight else None
+    self._rate_limiter = rate_limiter
+    self._hooks = list(hooks or [])
+    self._options = RequestOptions(timeout, deadline, retry_policy or
+                                   RetryPolicy())
+    self._local = threading.local()
+    self._pool_maxsize = pool_maxsize
+    self._share_transport = share_transport
+    self._compress_threshold = compress_threshold
+    if share_transport:
+      self._session = config.get_session(
+          self._create_session, access_key, tuple(endpoints),
+          pool_connections, pool_maxsize)
     else:
-      self._endpoint = endpoint
-
-    self._auth = Signer(access_key, secret_key)
+      self._session = self._create_session(pool_connections, pool_maxsize)
+    self._endpoint_selector = None
+    if len(endpoints) > 1:
+      self._endpoint_selector = EndpointSelector(
+          endpoints, probe_interval=probe_interval)
+      self._endpoint_selector.start_probing(self._probe)
     self._train_url = self._endpoint + "/cloud_ml/v1/train"
     self._model_url = self._endpoint + "/cloud_ml/v1/model"
     self._dev_url = self._endpoint + "/cloud_ml/v1/dev"
@@ -95,10 +171,482 @@ class CloudMlClient(object):
     self._org_id_url = self._endpoint + "/cloud_ml/v1/org_ids"
     self._dev_server_url = self._endpoint + "/dev_server/v1/dev_servers"
 
+  def _create_session(self, pool_connections, pool_maxsize):
+    """Create the keep-alive session shared by all requests of this client.
+
+    The connection pools of urllib3 are thread-safe, so one client can be used
+    by multiple threads and at most `pool_maxsize` connections are kept for
+    each host.
+    """
+    session = requests.Session()
+    adapter = request_hooks.TimedHTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+  def _probe(self, endpoint):
+    """Send the cheap request to measure the latency of the endpoint."""
+    return self._session.get(endpoint + "/cloud_ml/v1/framework",
+                             timeout=self._options.timeout)
+
+  def _route(self, url, exclude):
+    """Get the endpoint and the url to send the request of the url to.
+
+    Args:
+      url: The url of the primary endpoint.
+      exclude: The failed endpoints of this request.
+
+    Returns:
+      The tuple of the selected endpoint and its url, or None and the url if
+      there is only one endpoint.
+    """
+    if self._endpoint_selector is None or not url.startswith(self._endpoint):
+      return None, url
+    endpoint = self._endpoint_selector.select(exclude)
+    return endpoint, endpoint + url[len(self._endpoint):]
+
+  def _request(self, method, url, cache_group=None, event=None, **kwargs):
+    """Send the http request with the pooled session of this client.
+
+    The failed request is retried by the retry policy, and each attempt is
+    sent with the timeout which ends before the deadline, after waiting for
+    the rate limiter. The string body is encoded as utf-8, and compressed
+    with gzip if it's larger than the compress threshold. The file or
+    iterable body is hashed once in chunks, and rewound for each attempt.
+    With multiple endpoints, each attempt is sent to the fastest healthy
+    endpoint, and the retry fails over to another endpoint without waiting.
+
+    Args:
+      method: The http method, such as "GET" or "POST".
+      url: The url to request.
+      cache_group: The endpoint group in the response cache. The response of
+                   GET request may be cached, and the other requests
+                   invalidate the cached responses of the group.
+      event: The `hooks.RequestEvent` to record the measurements, which is
+             optional.
+      kwargs: The other arguments of `requests.Session.request`. The request
+              is signed by this client unless `auth` is given.
+
+    Returns:
+      The `requests.Response` object.
+
+    Raises:
+      requests.ConnectionError: If the connection fails after retries.
+      requests.Timeout: If the request times out after retries, or
+                        `errors.DeadlineExceededError` if the deadline is
+                        exceeded.
+    """
+    options = self._current_options()
+    policy = options.retry_policy
+    deadline = None
+    if options.deadline is not None:
+      deadline = time.time() + options.deadline
+    if method == "POST" and policy.retry_post:
+      # The retries of the request share the same key
+      headers = dict(kwargs.get("headers") or {})
+      headers.setdefault(IDEMPOTENCY_KEY_HEADER, uuid.uuid4().hex)
+      kwargs["headers"] = headers
+    if isinstance(kwargs.get("data"), (bytes, compression.text_type)):
+      # The retries send and sign the same encoded body
+      kwargs["data"], headers = compression.encode_body(
+          kwargs["data"], self._compress_threshold)
+      if headers:
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **headers)
+    position = None
+    if signature.is_stream(kwargs.get("data")):
+      # The body which can be read only once is buffered to be sent again
+      content_md5, kwargs["data"] = signature.Signer.hash_stream(
+          kwargs["data"])
+      position = kwargs["data"].tell()
+      if "auth" not in kwargs:
+        kwargs["headers"] = dict(kwargs.get("headers") or {})
+        kwargs["headers"][Constant.CONTENT_MD5] = content_md5
+
+    policy.budget.record_request()
+    retries = 0
+    failed_endpoints = []
+    while True:
+      kwargs["timeout"] = options.attempt_timeout(deadline)
+      if position is not None:
+        kwargs["data"].seek(position)
+      endpoint, endpoint_url = self._route(url, failed_endpoints)
+      try:
+        response = self._measured_send(method, url, endpoint_url,
+                                       cache_group, event, **kwargs)
+      except (requests.ConnectionError, requests.Timeout) as e:
+        self._record_endpoint(endpoint, failed_endpoints, failed=True)
+        delay = policy.retry_delay(method, retries, error=e, deadline=deadline)
+        if delay is None:
+          if deadline is not None and time.time() >= deadline:
+            # The attempt was cut short by the deadline
+            raise DeadlineExceededError(
+                "The deadline of the request is exceeded: {}".format(e),
+                request=e.request)
+          raise
+      else:
+        if not getattr(response, "from_cache", False):
+          # The cached response says nothing about the endpoint
+          self._record_endpoint(endpoint, failed_endpoints,
+                                response.elapsed.total_seconds(),
+                                response.status_code >= 500)
+        delay = policy.retry_delay(method, retries, response=response,
+                                   deadline=deadline)
+        if delay is None:
+          return response
+        response.close()
+      if endpoint in failed_endpoints and \
+          self._endpoint_selector.select(failed_endpoints,
+                                         peek=True) != endpoint:
+        # Fail over to another endpoint
+        delay = 0
+      time.sleep(delay)
+      retries += 1
+      if event is not None:
+        event.retries = retries
+
+  def _record_endpoint(self, endpoint, failed_endpoints, latency=None,
+                       failed=False):
+    if endpoint is None:
+      return
+    self._endpoint_selector.record(endpoint, latency, failed)
+    if failed:
+      failed_endpoints.append(endpoint)
+
+  def _measured_send(self, method, url, endpoint_url, cache_group, event,
+                     **kwargs):
+    """Send the request and record the measurements in the event."""
+    if event is None:
+      return self._send(method, url, endpoint_url, cache_group, **kwargs)
+
+    request_hooks.reset_connect_time()
+    # The time waiting for the rate limiter is not downloading
+    start = time.time() - event.timings["wait"]
+    response = self._send(method, url, endpoint_url, cache_group, event,
+                          **kwargs)
+    start += event.timings["wait"]
+    connect_seconds, connections = request_hooks.get_connect_time()
+    # The elapsed time is from sending the request to parsing the headers
+    elapsed = response.elapsed.total_seconds()
+    event.status_code = response.status_code
+    event.new_connection = connections > 0
+    event.timings["connect"] = connect_seconds
+    event.timings["server"] = max(elapsed - connect_seconds, 0.0)
+    if response.request is not None:
+      try:
+        event.request_bytes = len(response.request.body or "")
+      except TypeError:
+        # The body is a file or generator
+        pass
+    if not kwargs.get("stream"):
+      event.response_bytes = len(response.content)
+      event.timings["download"] = max(time.time() - start - elapsed, 0.0)
+    return response
+
+  def _send(self, method, url, endpoint_url, cache_group=None, event=None,
+            **kwargs):
+    """Send the request, or get the response from the cache.
+
+    The request waits for the rate limiter only when it's sent to the
+    server, so the cached responses don't take the tokens. The response is
+    cached by the url of the primary endpoint, so it's shared by all the
+    endpoints.
+    """
+    kwargs.setdefault("auth", self._auth)
+
+    def send(extra_headers=None):
+      if self._rate_limiter is not None:
+        waited = self._rate_limiter.acquire(url)
+        if event is not None:
+          event.timings["wait"] += waited
+      if extra_headers:
+        kwargs["headers"] = dict(kwargs.get("headers") or {},
+                                 **extra_headers)
+      return self._session.request(method, endpoint_url, **kwargs)
+
+    if self._cache is None:
+      return send()
+
+    if method != "GET":
+      response = send()
+      # Creating or deleting any resource may change the used quota
+      for group in set([cache_group, "quota"]):
+        if self._cache.is_cached_group(group):
+          self._cache.invalidate(group)
+      return response
+
+    if not self._cache.is_cached_group(cache_group):
+      return send()
+
+    return self._cache.fetch(cache_group, self._access_key + " " + url, send)
+
+  def _call(self, method, url, key=None, raise_errors=False, **kwargs):
+    """Send the request and decode the json response.
+
+    The concurrent identical GET requests are sent once if single-flight is
+    enabled, and each caller gets a copy of the shared decoded result.
+
+    Args:
+      method: The http method, such as "GET" or "POST".
+      url: The url to request.
+      key: The key of the json response to return, which is optional.
+      raise_errors: Raise `requests.HTTPError` if the request fails instead
+                    of returning the content.
+      kwargs: The other arguments of `_request`.
+
+    Returns:
+      The decoded json data if the request succeeds, otherwise the
+      `errors.ErrorResponse`.
+    """
+    if method != "GET" or self._single_flight is None:
+      return self._send_call(method, url, key, raise_errors, **kwargs)
+
+    # The url has the org_id and the other parameters of the request
+    result, shared = self._single_flight.do(
+        (url, key, raise_errors),
+        lambda: self._send_call(method, url, key, raise_errors, **kwargs))
+    if shared and isinstance(result, (dict, list)):
+      result = copy.deepcopy(result)
+    return result
+
+  def _send_call(self, method, url, key, raise_errors, **kwargs):
+    event = self._start_event(method, url)
+    try:
+      response = self._request(method, url, event=event, **kwargs)
+      start = time.time()
+      if response.ok:
+        result = json.loads(response.content.decode("utf-8"))
+        if key:
+          result = result[key]
+      elif raise_errors:
+        response.raise_for_status()
+      else:
+        result = ErrorResponse.from_response(response)
+        result.retries = event.retries
+      event.timings["decode"] = time.time() - start
+      return result
+    except Exception as e:
+      event.error = e
+      raise
+    finally:
+      self._finish_event(event)
+
+  def _current_options(self):
+    return getattr(self._local, "options", None) or self._options
+
+  @contextlib.contextmanager
+  def request_options(self, timeout=None, deadline=None, retry_policy=None):
+    """Override the timeouts and retry policy of the requests in the context.
+
+    It only applies to the requests of the current thread, and the bulk
+    methods called in the context.
+
+    Example:
+      with client.request_options(timeout=5, deadline=30):
+        client.describe_train_job("linear")
+
+    Args:
+      timeout: The seconds to wait for the server, a float or a tuple of
+               connect and read timeouts.
+      deadline: The seconds to finish each request including its retries.
+      retry_policy: The `retry.RetryPolicy` of the requests.
+    """
+    previous = getattr(self._local, "options", None)
+    self._local.options = self._current_options().merge(
+        RequestOptions(timeout, deadline, retry_policy))
+    try:
+      yield self
+    finally:
+      self._local.options = previous
+
+  @property
+  def hooks(self):
+    return self._hooks
+
+  def add_hook(self, hook):
+    """Add the `hooks.RequestHook` to call before and after each request."""
+    self._hooks.append(hook)
+
+  def remove_hook(self, hook):
+    self._hooks.remove(hook)
+
+  def _start_event(self, method, url):
+    event = request_hooks.RequestEvent(method, url)
+    for hook in self._hooks:
+      hook.before_request(event)
+    return event
+
+  def _finish_event(self, event):
+    event.timings["total"] = time.time() - event.start_time
+    for hook in self._hooks:
+      hook.after_request(event)
+
+  def close(self):
+    """Close the pooled connections of this client.
+
+    The session shared by `share_transport=True` is kept for the other
+    clients.
+    """
+    if self._endpoint_selector is not None:
+      self._endpoint_selector.close()
+    if not self._share_transport:
+      self._session.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def _map_concurrently(self, func, args_list, max_workers=None):
+    """Call the function with each arguments by a bounded thread pool.
+
+    Args:
+      func: The function to call.
+      args_list: The list of argument tuples of each call.
+      max_workers: The max number of concurrent calls, which is the max number
+                   of connections of each host by default.
+
+    Returns:
+      The list of results in the order of `args_list`. If a call raises, its
+      result is the exception.
+    """
+
+    options = self._current_options()
+
+    def call(args):
+      # Apply the request options of the caller thread
+      self._local.options = options
+      try:
+        return func(*args)
+      except Exception as e:
+        return e
+      finally:
+        self._local.options = None
+
+    if not args_list:
+      return []
+    pool = ThreadPool(min(max_workers or self._pool_maxsize, len(args_list)))
+    try:
+      return pool.map(call, args_list)
+    finally:
+      pool.close()
+      pool.join()
+
+  def _stream(self, url, decode):
+    """Request the url and decode the response while it is streamed.
+
+    The request is sent before returning, so the errors are raised by this
+    function instead of the first iteration.
+
+    Args:
+      url: The url of the GET request.
+      decode: The function to decode the iterable of the chunks of the
+              response body, which returns an iterable.
+
+    Returns:
+      The generator of the decoded values.
+
+    Raises:
+      requests.HTTPError: If the request fails, and the content of the error
+                          response is kept in its `response`.
+    """
+    event = self._start_event("GET", url)
+    try:
+      response = self._request("GET", url, event=event, stream=True)
+      if not response.ok:
+        # Read the error content to release the connection
+        event.response_bytes = len(response.content)
+        response.raise_for_status()
+    except Exception as e:
+      event.error = e
+      self._finish_event(event)
+      raise
+
+    def read_chunks():
+      for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+        event.response_bytes += len(chunk)
+        yield chunk
+
+    def generate():
+      # The body is downloaded and decoded together
+      start = time.time()
+      try:
+        for value in decode(read_chunks()):
+          yield value
+      except Exception as e:
+        event.error = e
+        raise
+      finally:
+        response.close()
+        event.timings["download"] = time.time() - start
+        self._finish_event(event)
+
+    return generate()
+
+  def _iter_data(self, url):
+    """Request the list and iterate its items while the response is streamed.
+
+    Returns:
+      The generator of the items in the "data" of the response.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    return self._stream(
+        url, lambda chunks: json_stream.iter_json_array(chunks, "data"))
+
+  def _download_logs(self, url, org_id, path, compress, resume):
+    """Stream the "logs" of the response to the file.
+
+    To resume, only the logs after the partial file are requested. The
+    server which supports the offset returns the "offset" with the logs,
+    otherwise the whole logs replace the partial file.
+    """
+    offset = log_util.resume_offset(path, compress) if resume else 0
+    values = {}
+    pieces = self._stream(
+        log_util.logs_url(url, org_id, offset),
+        lambda chunks: json_stream.iter_json_string(chunks, "logs", values))
+    return log_util.write_logs(
+        pieces, path, compress, offset,
+        lambda: "offset" in values or "line_offset" in values)
+
+  def _iter_list(self, query, base_url, org_id, name_key, page_size=None):
+    """Iterate the items of the list request with the query.
+
+    The list is streamed by one request, or requested page by page if
+    `page_size` is given or the query starts from an offset or page token.
+    """
+    if not page_size and not query.is_paged:
+      return query.filter_stream(
+          self._iter_data(query.url(base_url, org_id)), name_key)
+
+    def get_page(url):
+      return self._call("GET", url, raise_errors=True)
+
+    return query.iter_pages(get_page, base_url, org_id, name_key, page_size)
+
+  @property
+  def cache(self):
+    return self._cache
+
+  @property
+  def single_flight(self):
+    return self._single_flight
+
+  @property
+  def rate_limiter(self):
+    return self._rate_limiter
+
   @property
   def endpoint(self):
     return self._endpoint
 
+  @property
+  def endpoint_selector(self):
+    return self._endpoint_selector
+
   @endpoint.setter
   def endpoint(self, value):
     """Function for setting endpoint.
@@ -114,6 +662,10 @@ class CloudMlClient(object):
       raise ValueError("endpoint must be a string!")
     if not value.startswith("http://"):
       raise ValueError("endpoint must start with `http://`!")
+    if self._endpoint_selector is not None:
+      # Only use the given endpoint
+      self._endpoint_selector.close()
+      self._endpoint_selector = None
     self._endpoint = value
     self._train_url = self._endpoint + "/cloud_ml/v1/train"
     self._model_url = self._endpoint + "/cloud_ml/v1/model"
@@ -134,30 +686,83 @@ class CloudMlClient(object):
     Returns:
       The dictionary of train job.
     """
-    response = requests.post(self._train_url, auth=self._auth, data=json_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
-
-  def list_train_jobs(self, org_id=None):
+    return self._call("POST", self._train_url, data=json_data)
+
+  def list_train_jobs(self,
+                      org_id=None,
+                      limit=None,
+                      offset=None,
+                      page_token=None,
+                      state=None,
+                      created_after=None,
+                      name_prefix=None):
     """List train jobs.
 
+    The paging and filtering parameters are sent to the server, and the
+    filters are also applied to the returned jobs in case the server doesn't
+    support them.
+
     Args:
-      The org_id whose train_jobs to list.
+      org_id: The org_id whose train_jobs to list.
+      limit: The max number of train jobs to return.
+      offset: The number of matched train jobs to skip.
+      page_token: The `next_page_token` of the previous page.
+      state: Only return the train jobs in this state, such as "running".
+      created_after: Only return the train jobs created at or after this time,
+                     which is a `datetime` or a string like
+                     "2017-01-01 00:00:00".
+      name_prefix: Only return the train jobs whose name starts with it.
 
     Returns:
       The list of dictionary of train jobs.
     """
-    if org_id:
-      url = self._train_url + "?org_id=" + org_id
-    else:
-      url = self._train_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    items = self._call(
+        "GET", query.list_url(self._train_url, org_id), key="data")
+    if not isinstance(items, list):
+      return items
+    return query.filter(items, "job_name")
+
+  def iter_train_jobs(self,
+                      org_id=None,
+                      page_size=None,
+                      limit=None,
+                      offset=None,
+                      page_token=None,
+                      state=None,
+                      created_after=None,
+                      name_prefix=None):
+    """Iterate train jobs while the list response is downloaded.
+
+    It's like `list_train_jobs` but decodes the response incrementally, so the
+    first items are available before the whole list is received. If
+    `page_size`, `offset` or `page_token` is given, the jobs are requested
+    page by page until `limit` jobs are returned or the list ends.
+
+    Args:
+      org_id: The org_id whose train_jobs to list.
+      page_size: The number of train jobs of each page.
+      The other arguments are the same as `list_train_jobs`.
+
+    Returns:
+      The generator of dictionaries of train jobs.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    return self._iter_list(
+        query, self._train_url, org_id, "job_name", page_size)
 
   def describe_train_job(self, job_name, org_id=None):
     """Describe and get information of the train job.
@@ -172,30 +777,96 @@ class CloudMlClient(object):
       url = self._train_url + "/" + job_name + "?org_id=" + org_id
     else:
       url = self._train_url + "/" + job_name
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
-  def get_train_job_logs(self, job_name, org_id=None):
+  def get_train_job_logs(self,
+                         job_name,
+                         org_id=None,
+                         offset=None,
+                         line_offset=None):
     """Get logs of the train job.
 
     Args:
       job_name: The name of the train job.
+      offset: The number of bytes of the logs to skip.
+      line_offset: The number of lines of the logs to skip.
 
     Returns:
-      The logs of train job.
+      The logs of train job, with the "offset" and "line_offset" of the end
+      of the logs to request the new logs next time.
     """
-    if org_id:
-      url = self._train_url + "/" + job_name + "/logs" + "?org_id=" + org_id
-    else:
-      url = self._train_url + "/" + job_name + "/logs"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    url = log_util.logs_url(self._train_url + "/" + job_name + "/logs",
+                            org_id, offset, line_offset)
+    response = self._call("GET", url)
+    if isinstance(response, ErrorResponse):
+      return response
+    return log_util.slice_logs(response, offset, line_offset)
+
+  def follow_train_job_logs(self,
+                            job_name,
+                            org_id=None,
+                            offset=0,
+                            min_interval=log_util.MIN_POLL_INTERVAL,
+                            max_interval=log_util.MAX_POLL_INTERVAL):
+    """Iterate the logs of the train job while they are written.
+
+    Only the new logs are requested each time, and the polling slows down
+    when there are no new logs. It stops after the train job is finished.
+
+    Args:
+      job_name: The name of the train job.
+      offset: The number of bytes of the logs to skip.
+      min_interval: The min seconds to wait between the polls.
+      max_interval: The max seconds to wait between the polls.
+
+    Returns:
+      The generator of the new logs.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    url = self._train_url + "/" + job_name
+
+    def get_logs(offset):
+      response = self._call(
+          "GET", log_util.logs_url(url + "/logs", org_id, offset),
+          raise_errors=True)
+      return log_util.slice_logs(response, offset)
+
+    def is_finished():
+      train_job = self._call(
+          "GET", log_util.logs_url(url, org_id), raise_errors=True)
+      return train_job.get("state") in log_util.FINISHED_STATES
+
+    return log_util.follow_logs(get_logs, is_finished, offset, min_interval,
+                                max_interval)
+
+  def download_train_job_logs(self,
+                              job_name,
+                              path,
+                              org_id=None,
+                              compress=False,
+                              resume=False):
+    """Download the logs of the train job to the file.
+
+    The logs are written to the file while they are downloaded, so they are
+    never kept in memory.
+
+    Args:
+      job_name: The name of the train job.
+      path: The path of the file to write.
+      compress: Whether to compress the file with gzip.
+      resume: Whether to keep the logs in the partial file of the previous
+              download and only write the rest.
+
+    Returns:
+      The number of bytes of the logs in the file, before compression.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    return self._download_logs(self._train_url + "/" + job_name + "/logs",
+                               org_id, path, compress, resume)
 
   def get_train_job_metrics(self, job_name, org_id=None):
     """Get the metrics of the train job.
@@ -210,11 +881,7 @@ class CloudMlClient(object):
       url = self._train_url + "/" + job_name + "/metrics" + "?org_id=" + org_id
     else:
       url = self._train_url + "/" + job_name + "/metrics"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def get_train_job_hyperparameters_data(self, job_name):
     """Get hyperparameters data of the train job.
@@ -226,11 +893,7 @@ class CloudMlClient(object):
       The hyperparameter data of train job.
     """
     url = self._train_url + "/" + job_name + "/hyperparameters"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def delete_train_job(self, job_name):
     """Delete the train job.
@@ -242,11 +905,59 @@ class CloudMlClient(object):
       The response.
     """
     url = self._train_url + "/" + job_name
-    response = requests.delete(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("DELETE", url)
+
+  def describe_train_jobs(self,
+                          job_names,
+                          org_id=None,
+                          max_workers=None,
+                          list_threshold=None):
+    """Describe the train jobs concurrently.
+
+    If `list_threshold` is set and there are at least this number of train
+    jobs, they are listed by one request and only the ones which are not
+    listed are described. The listed train jobs are the items of
+    `list_train_jobs`, which may have fewer fields than `describe_train_job`.
+
+    Args:
+      job_names: The list of train job names.
+      org_id: The org_id of the train jobs.
+      max_workers: The max number of concurrent requests.
+      list_threshold: The min number of train jobs to list instead of
+                      describe, or None to always describe.
+
+    Returns:
+      The list of results of `describe_train_job`, or the listed items, in
+      the order of `job_names`. If describing a train job raises, its result
+      is the exception.
+    """
+    train_jobs = {}
+    if list_threshold is not None and len(job_names) >= list_threshold:
+      response = self.list_train_jobs(org_id)
+      if isinstance(response, list):
+        train_jobs = dict((job["job_name"], job) for job in response)
+
+    missing_names = [name for name in job_names if name not in train_jobs]
+    results = self._map_concurrently(self.describe_train_job,
+                                     [(name, org_id) for name in missing_names],
+                                     max_workers)
+    train_jobs.update(zip(missing_names, results))
+    return [train_jobs[name] for name in job_names]
+
+  def delete_train_jobs(self, job_names, max_workers=None):
+    """Delete the train jobs concurrently.
+
+    Args:
+      job_names: The list of train job names.
+      max_workers: The max number of concurrent requests.
+
+    Returns:
+      The list of results of `delete_train_job` in the order of `job_names`.
+      If deleting a train job raises, its result is the exception.
+    """
+    return self._map_concurrently(self.delete_train_job,
+                                  [(name, ) for name in job_names],
+                                  max_workers)
 
   def get_train_job_events(self, job_name, org_id=None):
     """Get events of the train job.
@@ -261,11 +972,7 @@ class CloudMlClient(object):
       url = self._train_url + "/" + job_name + "/events" +  "?org_id=" + org_id
     else:
       url = self._train_url + "/" + job_name + "/events"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def create_model_service(self, model_service):
     """Create the model service.
@@ -277,29 +984,67 @@ class CloudMlClient(object):
       The dictionary of model service.
     """
     model_service_data = model_service.get_json_data()
-    response = requests.post(self._model_url,
-                             auth=self._auth,
-                             data=model_service_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
-
-  def list_model_services(self, org_id=None):
+    return self._call(
+        "POST", self._model_url, data=model_service_data, cache_group="model")
+
+  def list_model_services(self,
+                          org_id=None,
+                          limit=None,
+                          offset=None,
+                          page_token=None,
+                          state=None,
+                          created_after=None,
+                          name_prefix=None):
     """List model services.
 
+    Args:
+      org_id: The org_id whose model services to list.
+      The paging and filtering arguments are the same as `list_train_jobs`.
+
     Returns:
       The list of dictionary of model services.
     """
-    if org_id:
-      url = self._model_url + "?org_id=" + org_id
-    else:
-      url = self._model_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    items = self._call(
+        "GET", query.list_url(self._model_url, org_id), key="data")
+    if not isinstance(items, list):
+      return items
+    return query.filter(items, "model_name")
+
+  def iter_model_services(self,
+                          org_id=None,
+                          page_size=None,
+                          limit=None,
+                          offset=None,
+                          page_token=None,
+                          state=None,
+                          created_after=None,
+                          name_prefix=None):
+    """Iterate model services while the list response is downloaded.
+
+    Args:
+      org_id: The org_id whose model services to list.
+      The other arguments are the same as `iter_train_jobs`.
+
+    Returns:
+      The generator of dictionaries of model services.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    return self._iter_list(
+        query, self._model_url, org_id, "model_name", page_size)
 
   def describe_model_service(self, model_name, model_version, org_id=None):
     """Describe and get information of the model service.
@@ -315,11 +1060,7 @@ class CloudMlClient(object):
       url = self._model_url + "/" + model_name + "/" + model_version + "?org_id=" + org_id
     else:
       url = self._model_url + "/" + model_name + "/" + model_version
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url, cache_group="model")
 
   def update_model_service(self, model_name, model_version, update_json, org_id=None):
     """Describe and get information of the model service.
@@ -336,31 +1077,98 @@ class CloudMlClient(object):
       url = self._model_url + "/" + model_name + "/" + model_version + "?org_id=" + org_id
     else:
       url = self._model_url + "/" + model_name + "/" + model_version
-    response = requests.put(url, auth=self._auth, data=update_json)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
-
-  def get_model_service_logs(self, model_name, model_version, org_id=None):
+    return self._call("PUT", url, data=update_json, cache_group="model")
+
+  def get_model_service_logs(self,
+                             model_name,
+                             model_version,
+                             org_id=None,
+                             offset=None,
+                             line_offset=None):
     """Get logs of the model service.
 
     Args:
       model_name: The name of the model service.
       model_version: The version of the model service.
+      offset: The number of bytes of the logs to skip.
+      line_offset: The number of lines of the logs to skip.
 
     Returns:
-      The logs of the model service.
+      The logs of the model service, with the "offset" and "line_offset" of
+      the end of the logs to request the new logs next time.
     """
-    if org_id:
-      url = self._model_url + "/" + model_name + "/" + model_version + "/logs" + "?org_id=" + org_id
-    else:
-      url = self._model_url + "/" + model_name + "/" + model_version + "/logs"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    url = log_util.logs_url(
+        self._model_url + "/" + model_name + "/" + model_version + "/logs",
+        org_id, offset, line_offset)
+    response = self._call("GET", url)
+    if isinstance(response, ErrorResponse):
+      return response
+    return log_util.slice_logs(response, offset, line_offset)
+
+  def follow_model_service_logs(self,
+                                model_name,
+                                model_version,
+                                org_id=None,
+                                offset=0,
+                                min_interval=log_util.MIN_POLL_INTERVAL,
+                                max_interval=log_util.MAX_POLL_INTERVAL):
+    """Iterate the logs of the model service while they are written.
+
+    Only the new logs are requested each time, and the polling slows down
+    when there are no new logs. It never stops by itself.
+
+    Args:
+      model_name: The name of the model service.
+      model_version: The version of the model service.
+      offset: The number of bytes of the logs to skip.
+      min_interval: The min seconds to wait between the polls.
+      max_interval: The max seconds to wait between the polls.
+
+    Returns:
+      The generator of the new logs.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    url = self._model_url + "/" + model_name + "/" + model_version + "/logs"
+
+    def get_logs(offset):
+      response = self._call(
+          "GET", log_util.logs_url(url, org_id, offset), raise_errors=True)
+      return log_util.slice_logs(response, offset)
+
+    return log_util.follow_logs(get_logs, None, offset, min_interval,
+                                max_interval)
+
+  def download_model_service_logs(self,
+                                  model_name,
+                                  model_version,
+                                  path,
+                                  org_id=None,
+                                  compress=False,
+                                  resume=False):
+    """Download the logs of the model service to the file.
+
+    The logs are written to the file while they are downloaded, so they are
+    never kept in memory.
+
+    Args:
+      model_name: The name of the model service.
+      model_version: The version of the model service.
+      path: The path of the file to write.
+      compress: Whether to compress the file with gzip.
+      resume: Whether to keep the logs in the partial file of the previous
+              download and only write the rest.
+
+    Returns:
+      The number of bytes of the logs in the file, before compression.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    return self._download_logs(
+        self._model_url + "/" + model_name + "/" + model_version + "/logs",
+        org_id, path, compress, resume)
 
   def get_model_service_metrics(self, model_name, model_version, org_id=None):
     """Get the metrics of the model service.
@@ -376,11 +1184,7 @@ class CloudMlClient(object):
       url = self._model_url + "/" + model_name + "/" + model_version + "/metrics" + "?org_id=" + org_id
     else:
       url = self._model_url + "/" + model_name + "/" + model_version + "/metrics"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def delete_model_service(self, model_name, model_version):
     """Delete the model service.
@@ -393,11 +1197,64 @@ class CloudMlClient(object):
       The response.
     """
     url = self._model_url + "/" + model_name + "/" + model_version
-    response = requests.delete(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("DELETE", url, cache_group="model")
+
+  def describe_model_services(self,
+                              models,
+                              org_id=None,
+                              max_workers=None,
+                              list_threshold=None):
+    """Describe the model services concurrently.
+
+    If `list_threshold` is set and there are at least this number of model
+    services, they are listed by one request and only the ones which are not
+    listed are described. The listed model services are the items of
+    `list_model_services`, which may have fewer fields than
+    `describe_model_service`.
+
+    Args:
+      models: The list of tuples of model name and model version.
+      org_id: The org_id of the model services.
+      max_workers: The max number of concurrent requests.
+      list_threshold: The min number of model services to list instead of
+                      describe, or None to always describe.
+
+    Returns:
+      The list of results of `describe_model_service`, or the listed items,
+      in the order of `models`. If describing a model service raises, its
+      result is the exception.
+    """
+    models = [tuple(model) for model in models]
+    model_services = {}
+    if list_threshold is not None and len(models) >= list_threshold:
+      response = self.list_model_services(org_id)
+      if isinstance(response, list):
+        model_services = dict(
+            ((model["model_name"], model["model_version"]), model)
+            for model in response)
+
+    missing_models = [model for model in models if model not in model_services]
+    results = self._map_concurrently(
+        self.describe_model_service,
+        [(name, version, org_id) for name, version in missing_models],
+        max_workers)
+    model_services.update(zip(missing_models, results))
+    return [model_services[model] for model in models]
+
+  def delete_model_services(self, models, max_workers=None):
+    """Delete the model services concurrently.
+
+    Args:
+      models: The list of tuples of model name and model version.
+      max_workers: The max number of concurrent requests.
+
+    Returns:
+      The list of results of `delete_model_service` in the order of `models`.
+      If deleting a model service raises, its result is the exception.
+    """
+    return self._map_concurrently(self.delete_model_service,
+                                  [tuple(model) for model in models],
+                                  max_workers)
 
   def get_model_service_events(self, model_name, model_version, org_id=None):
     """Get events of the model service.
@@ -413,11 +1270,7 @@ class CloudMlClient(object):
       url = self._model_url + "/" + model_name + "/" + model_version + "/events" + "?org_id=" + org_id
     else:
       url = self._model_url + "/" + model_name + "/" + model_version + "/events"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def create_dev_env(self, dev_env):
     """Create the dev env.
@@ -429,27 +1282,66 @@ class CloudMlClient(object):
       The dictionary of dev env.
     """
     dev_env_data = dev_env.get_json_data()
-    response = requests.post(self._dev_url, auth=self._auth, data=dev_env_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("POST", self._dev_url, data=dev_env_data)
+
+  def list_dev_envs(self,
+                    org_id=None,
+                    limit=None,
+                    offset=None,
+                    page_token=None,
+                    state=None,
+                    created_after=None,
+                    name_prefix=None):
+    """List dev environments.
 
-  def list_dev_envs(self, org_id=None):
-    """List the dev environments.
+    Args:
+      org_id: The org_id whose dev environments to list.
+      The paging and filtering arguments are the same as `list_train_jobs`.
 
     Returns:
-      The list of dictionary of dev env.
+      The list of dictionary of dev environments.
     """
-    if org_id:
-      url = self._dev_url + "?org_id=" + org_id
-    else:
-      url = self._dev_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    items = self._call(
+        "GET", query.list_url(self._dev_url, org_id), key="data")
+    if not isinstance(items, list):
+      return items
+    return query.filter(items, "dev_name")
+
+  def iter_dev_envs(self,
+                    org_id=None,
+                    page_size=None,
+                    limit=None,
+                    offset=None,
+                    page_token=None,
+                    state=None,
+                    created_after=None,
+                    name_prefix=None):
+    """Iterate dev environments while the list response is downloaded.
+
+    Args:
+      org_id: The org_id whose dev environments to list.
+      The other arguments are the same as `iter_train_jobs`.
+
+    Returns:
+      The generator of dictionaries of dev environments.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    return self._iter_list(
+        query, self._dev_url, org_id, "dev_name", page_size)
 
   def describe_dev_env(self, dev_name, org_id=None):
     """Describe and get information of the dev environment.
@@ -464,11 +1356,7 @@ class CloudMlClient(object):
       url = self._dev_url + "/" + dev_name + "?org_id=" + org_id
     else:
       url = self._dev_url + "/" + dev_name
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def delete_dev_env(self, dev_name):
     """Delete the dev environment.
@@ -480,11 +1368,7 @@ class CloudMlClient(object):
       The response.
     """
     url = self._dev_url + "/" + dev_name
-    response = requests.delete(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("DELETE", url)
 
   def get_dev_env_events(self, dev_name):
     """Get events of the dev env.
@@ -496,11 +1380,7 @@ class CloudMlClient(object):
       The events of the dev env.
     """
     url = self._dev_url + "/" + dev_name + "/events"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def get_dev_env_metrics(self, dev_name):
     """Get the metrics of the dev env.
@@ -512,11 +1392,7 @@ class CloudMlClient(object):
       The events of the dev env.
     """
     url = self._dev_url + "/" + dev_name + "/metrics"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def create_dev_server(self, dev_server):
     """Create the dev server.
@@ -528,29 +1404,66 @@ class CloudMlClient(object):
       The dictionary of dev server.
     """
     dev_server_data = dev_server.get_json_data()
-    response = requests.post(self._dev_server_url,
-                             auth=self._auth,
-                             data=dev_server_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("POST", self._dev_server_url, data=dev_server_data)
+
+  def list_dev_servers(self,
+                       org_id=None,
+                       limit=None,
+                       offset=None,
+                       page_token=None,
+                       state=None,
+                       created_after=None,
+                       name_prefix=None):
+    """List dev servers.
 
-  def list_dev_servers(self, org_id=None):
-    """List the dev servers.
+    Args:
+      org_id: The org_id whose dev servers to list.
+      The paging and filtering arguments are the same as `list_train_jobs`.
 
     Returns:
-      The list of dictionary of dev server.
+      The list of dictionary of dev servers.
     """
-    if org_id:
-      url = self._dev_server_url + "?org_id=" + org_id
-    else:
-      url = self._dev_server_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    items = self._call(
+        "GET", query.list_url(self._dev_server_url, org_id), key="data")
+    if not isinstance(items, list):
+      return items
+    return query.filter(items, "dev_name")
+
+  def iter_dev_servers(self,
+                       org_id=None,
+                       page_size=None,
+                       limit=None,
+                       offset=None,
+                       page_token=None,
+                       state=None,
+                       created_after=None,
+                       name_prefix=None):
+    """Iterate dev servers while the list response is downloaded.
+
+    Args:
+      org_id: The org_id whose dev servers to list.
+      The other arguments are the same as `iter_train_jobs`.
+
+    Returns:
+      The generator of dictionaries of dev servers.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    return self._iter_list(
+        query, self._dev_server_url, org_id, "dev_name", page_size)
 
   def describe_dev_server(self, dev_name, org_id=None):
     """Describe and get information of the dev server.
@@ -565,11 +1478,7 @@ class CloudMlClient(object):
       url = self._dev_server_url + "/" + dev_name + "?org_id=" + org_id
     else:
       url = self._dev_server_url + "/" + dev_name
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def delete_dev_server(self, dev_name):
     """Delete the dev server.
@@ -581,11 +1490,7 @@ class CloudMlClient(object):
       The response.
     """
     url = self._dev_server_url + "/" + dev_name
-    response = requests.delete(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("DELETE", url)
 
   def get_dev_server_events(self, dev_name):
     """Get events of the dev server.
@@ -597,11 +1502,7 @@ class CloudMlClient(object):
       The events of the dev server.
     """
     url = self._dev_server_url + "/" + dev_name + "/events"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def create_tensorboard_service(self, tensorboard_service):
     """Create the tensorboard_service.
@@ -613,29 +1514,67 @@ class CloudMlClient(object):
       The dictionary of tensorboard_service.
     """
     tensorboard_service_data = tensorboard_service.get_json_data()
-    response = requests.post(self._tensorboard_url,
-                             auth=self._auth,
-                             data=tensorboard_service_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call(
+        "POST", self._tensorboard_url, data=tensorboard_service_data)
+
+  def list_tensorboard_services(self,
+                                org_id=None,
+                                limit=None,
+                                offset=None,
+                                page_token=None,
+                                state=None,
+                                created_after=None,
+                                name_prefix=None):
+    """List tensorboard services.
 
-  def list_tensorboard_services(self, org_id=None):
-    """List tensorboard_services.
+    Args:
+      org_id: The org_id whose tensorboard services to list.
+      The paging and filtering arguments are the same as `list_train_jobs`.
 
     Returns:
-      The list of dictionary of tensorboard_services.
+      The list of dictionary of tensorboard services.
     """
-    if org_id:
-      url = self._tensorboard_url + "?org_id=" + org_id
-    else:
-      url = self._tensorboard_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    items = self._call(
+        "GET", query.list_url(self._tensorboard_url, org_id), key="data")
+    if not isinstance(items, list):
+      return items
+    return query.filter(items, "tensorboard_name")
+
+  def iter_tensorboard_services(self,
+                                org_id=None,
+                                page_size=None,
+                                limit=None,
+                                offset=None,
+                                page_token=None,
+                                state=None,
+                                created_after=None,
+                                name_prefix=None):
+    """Iterate tensorboard services while the list response is downloaded.
+
+    Args:
+      org_id: The org_id whose tensorboard services to list.
+      The other arguments are the same as `iter_train_jobs`.
+
+    Returns:
+      The generator of dictionaries of tensorboard services.
+
+    Raises:
+      requests.HTTPError: If the request fails.
+    """
+    query = ListQuery(limit=limit,
+                      offset=offset,
+                      page_token=page_token,
+                      state=state,
+                      created_after=created_after,
+                      name_prefix=name_prefix)
+    return self._iter_list(
+        query, self._tensorboard_url, org_id, "tensorboard_name", page_size)
 
   def describe_tensorboard_service(self, tensorboard_name, org_id=None):
     """Describe and get information of the tensorboard_service.
@@ -650,11 +1589,7 @@ class CloudMlClient(object):
       url = self._tensorboard_url + "/" + tensorboard_name + "?org_id=" + org_id
     else:
       url = self._tensorboard_url + "/" + tensorboard_name
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def delete_tensorboard_service(self, tensorboard_name):
     """Delete the tensorboard_service.
@@ -666,11 +1601,7 @@ class CloudMlClient(object):
       The response.
     """
     url = self._tensorboard_url + "/" + tensorboard_name
-    response = requests.delete(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("DELETE", url)
 
   def get_tensorboard_service_events(self, tensorboard_name):
     """Get events of the tensorboard service.
@@ -682,11 +1613,7 @@ class CloudMlClient(object):
       The events of the tensorboard service.
     """
     url = self._tensorboard_url + "/" + tensorboard_name + "/events"
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", url)
 
   def get_quota(self, org_id=None):
     """Get quota.
@@ -695,11 +1622,7 @@ class CloudMlClient(object):
       url = self._quota_url + "?org_id=" + org_id
     else:
       url = self._quota_url
-    response = requests.get(url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))["data"]
-    else:
-      return response.content
+    return self._call("GET", url, cache_group="quota", key="data")
 
   def do_predict(self, model_name, model_version, data_file, timeout=10.0):
     """Request generic gRPC server to predict
@@ -721,8 +1644,19 @@ class CloudMlClient(object):
       })
 
   def do_predict_server(self, server, model_name, data_file, timeout=10.0):
+    """Request the gRPC server to predict.
+
+    The channel of the server is kept in the channel pool of this process,
+    and reused by the next predictions.
+
+    Args:
+      server: The address of server. Example: "localhost:9000".
+      model_name: The name of the model.
+      data_file: The json data file.
+      timeout: The timeout of the gRPC request.
+    """
 
-    from predict_client import generic_predict_client
+    from .predict_client import generic_predict_client
 
     if os.path.isfile(data_file):
       with open(data_file) as f:
@@ -743,29 +1677,15 @@ class CloudMlClient(object):
     """
     quota_data = quota.get_json_data()
     url = self._quota_url + "/" + quota.org_id
-    response = requests.put(url, auth=self._auth, data=quota_data)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("PUT", url, data=quota_data)
 
   def get_frameworks(self):
-    response = requests.get(self._framework_url)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call(
+        "GET", self._framework_url, auth=None, cache_group="framework")
 
   def authentication(self):
-    response = requests.get(self._authentication_url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call(
+        "GET", self._authentication_url, cache_group="authentication")
 
   def get_org_id(self):
-    response = requests.get(self._org_id_url, auth=self._auth)
-    if response.ok:
-      return json.loads(response.content.decode("utf-8"))
-    else:
-      return response.content
+    return self._call("GET", self._org_id_url, cache_group="org_id")
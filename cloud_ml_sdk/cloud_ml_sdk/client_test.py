@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import gc
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+import unittest
+import weakref
+import zlib
+
+import requests
+
+from cloud_ml_sdk.cache import ResponseCache
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.compression import gzip_compress
+from cloud_ml_sdk.rate_limit import RateLimiter
+from cloud_ml_sdk.retry import RetryPolicy
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+ACCESS_KEY = "ak"
+SECRET_KEY = "sk"
+
+FAKE_TRAIN_JOBS = [{
+    "job_name": "job-{}".format(i),
+    "state": "running",
+    "create_time": "2017-01-01 00:00:00",
+    "update_time": "2017-01-01 00:00:00"
+} for i in range(100)]
+
+
+def gzip_decompress(data):
+  return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+def expected_authorization(path, timestamp, content_md5):
+  """Sign the request like the server of cloud-ml."""
+  string_to_sign = "{}\n{}\n{}\n".format(path, timestamp, content_md5)
+  digest = hmac.new(SECRET_KEY.encode("utf-8"), string_to_sign.encode("utf-8"),
+                    hashlib.sha1).digest()
+  return "Galaxy V3 " + base64.b64encode(digest).decode("utf-8")
+
+
+class SigningHandler(StandInHandler):
+  """The server which checks the signature and content md5 of the requests,
+  and records the decoded bodies."""
+
+  def _reply(self, status, data):
+    content = json.dumps(data).encode("utf-8")
+    headers = {}
+    if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+      content = gzip_compress(content)
+      headers["Content-Encoding"] = "gzip"
+    self.reply(status, content, headers)
+
+  def handle_request(self, body):
+    content_md5 = self.headers.get("X-Xiaomi-Content-MD5")
+    if hashlib.md5(body).hexdigest() != content_md5:
+      return self._reply(400, {"message": "content md5 mismatch"})
+    if self.headers.get("Authorization") != expected_authorization(
+        self.path.split("?")[0], self.headers.get("X-Xiaomi-Timestamp"),
+        content_md5):
+      return self._reply(401, {"message": "signature mismatch"})
+    if self.server.unavailable:
+      self.server.unavailable -= 1
+      return self._reply(503, {"message": "unavailable"})
+
+    encoding = self.headers.get("Content-Encoding")
+    if encoding == "gzip":
+      body = gzip_decompress(body)
+    self.server.requests.append({
+        "method": self.command,
+        "path": self.path,
+        "content_encoding": encoding,
+        "accept_encoding": self.headers.get("Accept-Encoding"),
+        "body": body
+    })
+    if self.command == "GET":
+      self._reply(200, {"data": FAKE_TRAIN_JOBS})
+    else:
+      self._reply(200, json.loads(body.decode("utf-8")))
+
+
+class JobsHandler(StandInHandler):
+  """The server of the train jobs "job-<i>", which answers the later jobs
+  sooner. The "missing" job is not found, and the "broken" one closes the
+  connection."""
+
+  def handle_request(self, body):
+    name = self.path.split("?")[0].split("/")[-1]
+    self.server.requests.append((self.command, name))
+    if name == "train":
+      return self.reply(200, {"data": [{"job_name": "job-{}".format(i)}
+                                       for i in range(4)]})
+    if name == "broken":
+      self.close_connection = True
+      return
+    if name == "missing":
+      return self.reply(404, {"message": "train job not found"})
+    time.sleep(0.01 * (10 - int(name.split("-")[1])))
+    self.reply(200, {"job_name": name, "state": "running", "detail": True})
+
+
+class BulkTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(JobsHandler)
+    self.client = CloudMlClient(ACCESS_KEY, SECRET_KEY, self.server.endpoint,
+                                retry_policy=RetryPolicy(max_retries=0))
+    self.names = ["job-{}".format(i) for i in range(8)]
+    self.names[2:2] = ["missing", "broken"]
+
+  def tearDown(self):
+    self.client.close()
+    self.server.stop()
+
+  def test_describe(self):
+    results = self.client.describe_train_jobs(self.names, max_workers=4)
+    self.assertEqual(len(self.names), len(results))
+    for name, result in zip(self.names, results):
+      if name == "missing":
+        self.assertEqual(404, result.status_code)
+      elif name == "broken":
+        self.assertIsInstance(result, requests.ConnectionError)
+      else:
+        self.assertEqual({"job_name": name, "state": "running",
+                          "detail": True}, result)
+    self.assertEqual(sorted(("GET", name) for name in self.names),
+                     sorted(self.server.requests))
+
+  def test_describe_listed(self):
+    results = self.client.describe_train_jobs(self.names, max_workers=4,
+                                              list_threshold=5)
+    # The listed train jobs are the items of the list
+    self.assertEqual([{"job_name": "job-0"}, {"job_name": "job-1"}],
+                     results[:2])
+    self.assertEqual([{"job_name": "job-2"}, {"job_name": "job-3"}],
+                     results[4:6])
+    self.assertEqual(404, results[2].status_code)
+    self.assertIsInstance(results[3], requests.ConnectionError)
+    self.assertEqual(["job-4", "job-5", "job-6", "job-7"],
+                     [result["job_name"] for result in results[6:]])
+    self.assertEqual(("GET", "train"), self.server.requests[0])
+    self.assertEqual(
+        sorted(("GET", name) for name in
+               ["missing", "broken", "job-4", "job-5", "job-6", "job-7"]),
+        sorted(self.server.requests[1:]))
+
+  def test_delete(self):
+    results = self.client.delete_train_jobs(self.names, max_workers=4)
+    self.assertEqual(len(self.names), len(results))
+    self.assertEqual(404, results[2].status_code)
+    self.assertIsInstance(results[3], requests.ConnectionError)
+    self.assertEqual(
+        [name for name in self.names if name not in ("missing", "broken")],
+        [result["job_name"] for result in results[:2] + results[4:]])
+    self.assertEqual(sorted(("DELETE", name) for name in self.names),
+                     sorted(self.server.requests))
+
+
+class CompressionTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(SigningHandler, unavailable=0)
+    self.client = CloudMlClient(
+        ACCESS_KEY,
+        SECRET_KEY,
+        self.server.endpoint,
+        share_transport=False,
+        compress_threshold=1024,
+        retry_policy=RetryPolicy(backoff_base=0.01, retry_post=True))
+
+  def tearDown(self):
+    self.client.close()
+    self.server.stop()
+
+  def test_small_body(self):
+    job = {"job_name": "linear", "job_args": "--steps 10"}
+    self.assertEqual(job, self.client.submit_train_job(json.dumps(job)))
+    request = self.server.requests[-1]
+    self.assertIsNone(request["content_encoding"])
+    self.assertEqual(job, json.loads(request["body"].decode("utf-8")))
+
+  def test_large_body(self):
+    job = {"job_name": "linear", "job_args": "--learning_rate 0.01 " * 1000}
+    self.assertEqual(job, self.client.submit_train_job(json.dumps(job)))
+    request = self.server.requests[-1]
+    self.assertEqual("gzip", request["content_encoding"])
+    self.assertEqual(job, json.loads(request["body"].decode("utf-8")))
+
+  def test_utf8_body(self):
+    job = {"job_name": "linear", "job_args": u"--comment 线性回归"}
+    data = json.dumps(job, ensure_ascii=False)
+    self.assertEqual(job, self.client.submit_train_job(data))
+    request = self.server.requests[-1]
+    self.assertEqual(job, json.loads(request["body"].decode("utf-8")))
+
+  def test_compressed_response(self):
+    self.assertEqual(FAKE_TRAIN_JOBS, self.client.list_train_jobs())
+    self.assertEqual(FAKE_TRAIN_JOBS, list(self.client.iter_train_jobs()))
+    request = self.server.requests[-1]
+    self.assertIn("gzip", request["accept_encoding"])
+
+  def test_deterministic_gzip(self):
+    data = b"x" * 4096
+    self.assertEqual(gzip_compress(data), gzip_compress(data))
+    self.assertEqual(data, gzip_decompress(gzip_compress(data)))
+
+  def test_file_body(self):
+    job = {"job_name": "linear", "job_args": "--learning_rate 0.01 " * 1000}
+    self.server.unavailable = 1
+    body = io.BytesIO(json.dumps(job).encode("utf-8"))
+    self.assertEqual(job, self.client.submit_train_job(body))
+    self.assertEqual(1, len(self.server.requests))
+
+  def test_iterable_body(self):
+    job = {"job_name": "linear", "job_args": "--learning_rate 0.01 " * 1000}
+    data = json.dumps(job)
+    chunks = (data[i:i + 100] for i in range(0, len(data), 100))
+    self.server.unavailable = 2
+    self.assertEqual(job, self.client.submit_train_job(chunks))
+    self.assertEqual(1, len(self.server.requests))
+
+
+class CacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(SigningHandler, unavailable=0)
+    self.client = CloudMlClient(ACCESS_KEY,
+                                SECRET_KEY,
+                                self.server.endpoint,
+                                share_transport=False,
+                                cache=ResponseCache(),
+                                rate_limiter=RateLimiter({"quota": (1, 1)}))
+
+  def tearDown(self):
+    self.client.close()
+    self.server.stop()
+
+  def test_cache_hits_skip_rate_limiter(self):
+    for _ in range(3):
+      self.assertEqual(FAKE_TRAIN_JOBS, self.client.get_quota())
+    self.assertEqual(1, len(self.server.requests))
+    self.assertEqual(2, self.client.cache.stats()["hits"])
+    stats = self.client.rate_limiter.stats()["quota"]
+    self.assertEqual(1, stats["requests"])
+    self.assertEqual(0, stats["waits"])
+
+
+class PoolingTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(SigningHandler, unavailable=0)
+
+  def tearDown(self):
+    self.server.stop()
+
+  def test_keep_alive(self):
+    with CloudMlClient(ACCESS_KEY, SECRET_KEY, self.server.endpoint) as client:
+      for _ in range(5):
+        self.assertEqual(FAKE_TRAIN_JOBS, client.list_train_jobs())
+        self.assertEqual(FAKE_TRAIN_JOBS, client.get_quota())
+    self.assertEqual(10, len(self.server.requests))
+    self.assertEqual(1, self.server.connections)
+
+  def test_threads(self):
+    results = []
+
+    def list_train_jobs(client):
+      for _ in range(10):
+        results.append(client.list_train_jobs())
+
+    with CloudMlClient(ACCESS_KEY, SECRET_KEY, self.server.endpoint,
+                       pool_maxsize=4) as client:
+      threads = [threading.Thread(target=list_train_jobs, args=(client,))
+                 for _ in range(4)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+    self.assertEqual([FAKE_TRAIN_JOBS] * 40, results)
+    # At most one connection for each thread is opened and kept
+    self.assertLessEqual(self.server.connections, 4)
+
+
+class SessionTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(SigningHandler, unavailable=0)
+
+  def tearDown(self):
+    self.server.stop()
+
+  def test_close_own_session(self):
+    with CloudMlClient(ACCESS_KEY, SECRET_KEY, self.server.endpoint) as client:
+      other = CloudMlClient(ACCESS_KEY, SECRET_KEY, self.server.endpoint)
+      self.assertIsNot(client._session, other._session)
+      other.close()
+      self.assertEqual(FAKE_TRAIN_JOBS, client.list_train_jobs())
+      pools = client._session.get_adapter(self.server.endpoint).poolmanager
+      self.assertEqual(1, len(pools.pools))
+    self.assertEqual(0, len(pools.pools))
+
+  def test_shared_session(self):
+    clients = [
+        CloudMlClient(access_key, SECRET_KEY, endpoint, share_transport=True)
+        for access_key, endpoint in [
+            (ACCESS_KEY, self.server.endpoint),
+            (ACCESS_KEY, self.server.endpoint),
+            ("other", self.server.endpoint),
+            (ACCESS_KEY, self.server.endpoint + "/"),
+        ]
+    ]
+    self.assertIs(clients[0]._session, clients[1]._session)
+    self.assertIsNot(clients[0]._session, clients[2]._session)
+    self.assertIsNot(clients[0]._session, clients[3]._session)
+    clients[0].close()
+    self.assertEqual(FAKE_TRAIN_JOBS, clients[1].list_train_jobs())
+    pools = clients[1]._session.get_adapter(self.server.endpoint).poolmanager
+    self.assertEqual(1, len(pools.pools))
+
+
+class MultipleEndpointsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servers = [start_server(SigningHandler, unavailable=0)
+                    for _ in range(2)]
+    self.endpoint = ",".join(server.endpoint for server in self.servers)
+
+  def tearDown(self):
+    for server in self.servers:
+      server.stop()
+
+  def test_cache_shared_by_endpoints(self):
+    client = CloudMlClient(ACCESS_KEY,
+                           SECRET_KEY,
+                           self.endpoint,
+                           share_transport=False,
+                           cache=ResponseCache(),
+                           probe_interval=3600)
+    with client:
+      selector = client.endpoint_selector
+      deadline = time.time() + 5
+      while None in [item["latency"] for item in selector.status()] and \
+          time.time() < deadline:
+        time.sleep(0.01)
+      self.assertEqual(FAKE_TRAIN_JOBS, client.get_quota())
+      status = selector.status()
+      for endpoint in selector.endpoints:
+        # Each endpoint is cached by the url of the primary endpoint
+        selector.select = lambda *args, **kwargs: endpoint
+        self.assertEqual(FAKE_TRAIN_JOBS, client.get_quota())
+      # The cache hits are not recorded as the latencies of endpoints
+      self.assertEqual(status, selector.status())
+    self.assertEqual(1, sum(len(server.requests) for server in self.servers))
+    self.assertEqual(2, client.cache.stats()["hits"])
+
+  def test_probe_stops_with_unclosed_client(self):
+    client = CloudMlClient(ACCESS_KEY, SECRET_KEY, self.endpoint,
+                           share_transport=False, probe_interval=3600)
+    thread = client.endpoint_selector._thread
+    owner = weakref.ref(client)
+    del client
+    deadline = time.time() + 5
+    while owner() is not None and time.time() < deadline:
+      gc.collect()
+      time.sleep(0.01)
+    self.assertIsNone(owner())
+    thread.join(5)
+    self.assertFalse(thread.is_alive())
+
+
+if __name__ == "__main__":
+  unittest.main()
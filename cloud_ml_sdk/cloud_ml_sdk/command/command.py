@@ -15,10 +15,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import argcomplete
 import argparse
 import logging
-import pkg_resources
+import os
 import sys
 sys.path.append("../../")
 
@@ -28,15 +27,60 @@ from . import util
 logging.basicConfig(level=logging.DEBUG)
 
 
+class VersionAction(argparse.Action):
+  """Show the version of the SDK, which is only looked up when asked."""
+
+  def __init__(self, option_strings, dest=argparse.SUPPRESS,
+               default=argparse.SUPPRESS, help=None):
+    super(VersionAction, self).__init__(
+        option_strings=option_strings,
+        dest=dest,
+        default=default,
+        nargs=0,
+        help=help)
+
+  def __call__(self, parser, namespace, values, option_string=None):
+    import pkg_resources
+    sys.stdout.write("{}\n".format(
+        pkg_resources.require(constant.SDK_NAME)[0].version))
+    parser.exit()
+
+
+def add_list_filter_arguments(parser):
+  """Add the arguments to filter the resources to list."""
+  parser.add_argument(
+      "--state",
+      dest="state",
+      help="Only list the resources in the state, such as running")
+  parser.add_argument(
+      "--since",
+      dest="since",
+      type=util.parse_since,
+      help="Only list the resources created since the time, such as "
+      "\"2017-01-01 08:00:00\", \"2017-01-01\" or \"2h\" and \"7d\" ago")
+  parser.add_argument(
+      "--limit",
+      dest="limit",
+      type=int,
+      help="The max number of resources to list")
+
+
 def main():
   parser = argparse.ArgumentParser()
 
   parser.add_argument(
       "-v",
       "--version",
-      action="version",
-      version=pkg_resources.require(constant.SDK_NAME)[0].version,
+      action=VersionAction,
       help="Show version")
+  parser.add_argument(
+      "--profile",
+      action="store_true",
+      help="Print the latency of the requests to each endpoint")
+  parser.add_argument(
+      "--config_profile",
+      dest="config_profile",
+      help="The named profile of the credentials in the config file")
 
   main_subparser = parser.add_subparsers(dest="command_group", help="Commands")
 
@@ -54,6 +98,7 @@ def main():
 
   # subcommand of jobs: list
   jobs_list_parser = jobs_subparser.add_parser("list", help="List jobs")
+  add_list_filter_arguments(jobs_list_parser)
   jobs_list_parser.set_defaults(func=util.list_jobs)
 
   # subcommand of jobs: submit
@@ -156,6 +201,21 @@ def main():
   jobs_logs_parser = jobs_subparser.add_parser(
       "logs", help="Get the logs of the job")
   jobs_logs_parser.add_argument("job_name", help="The job to get the logs")
+  jobs_logs_parser.add_argument(
+      "-f",
+      "--follow",
+      action="store_true",
+      help="Keep printing the new logs of the job")
+  jobs_logs_parser.add_argument(
+      "-o",
+      "--output",
+      dest="output",
+      help="Save the logs to the file, which is compressed if it ends with .gz")
+  jobs_logs_parser.add_argument(
+      "--resume",
+      action="store_true",
+      help="Resume saving the logs to the partial file, which only "
+      "downloads the rest of the logs if the server supports the offset")
   jobs_logs_parser.set_defaults(func=util.get_job_logs)
 
   # subcommand of jobs: metrics
@@ -191,6 +251,7 @@ def main():
   # subcommand of models: list
   models_list_parser = models_subparser.add_parser(
       "list", help="List model services")
+  add_list_filter_arguments(models_list_parser)
   models_list_parser.set_defaults(func=util.list_models)
 
   # subcommand of models: create
@@ -298,6 +359,21 @@ def main():
   models_logs_parser.add_argument("model_name", help="The name of the model")
   models_logs_parser.add_argument(
       "model_version", help="The version of the model")
+  models_logs_parser.add_argument(
+      "-f",
+      "--follow",
+      action="store_true",
+      help="Keep printing the new logs of the model service")
+  models_logs_parser.add_argument(
+      "-o",
+      "--output",
+      dest="output",
+      help="Save the logs to the file, which is compressed if it ends with .gz")
+  models_logs_parser.add_argument(
+      "--resume",
+      action="store_true",
+      help="Resume saving the logs to the partial file, which only "
+      "downloads the rest of the logs if the server supports the offset")
   models_logs_parser.set_defaults(func=util.get_model_logs)
 
   # subcommand of models: metrics
@@ -360,6 +436,7 @@ def main():
   # subcommand of tensorboard: list
   tensorboard_list_parser = tensorboard_subparser.add_parser(
       "list", help="List tensorboards")
+  add_list_filter_arguments(tensorboard_list_parser)
   tensorboard_list_parser.set_defaults(func=util.list_tensorboard_services)
 
   # subcommand of tensorboard: create
@@ -438,6 +515,7 @@ def main():
   # subcommand of dev: list
   dev_list_parser = dev_subparser.add_parser(
       "list", help="List dev environments")
+  add_list_filter_arguments(dev_list_parser)
   dev_list_parser.set_defaults(func=util.list_dev_envs)
 
   # subcommand of dev: create
@@ -625,14 +703,51 @@ def main():
       "list", help="List all resources")
   all_list_parser.set_defaults(func=util.list_all)
 
-  # For auto-complete
-  argcomplete.autocomplete(parser)
+  # subcommand: agent
+  agent_parser = main_subparser.add_parser(
+      "agent", help="Commands about the local agent")
+  agent_subparser = agent_parser.add_subparsers(
+      dest="agent_command", help="Subcommands of agent")
+
+  # subcommand of agent: start
+  agent_start_parser = agent_subparser.add_parser(
+      "start",
+      help="Start the agent which keeps the clients warm for the commands")
+  agent_start_parser.add_argument(
+      "-d",
+      "--daemon",
+      action="store_true",
+      help="Run the agent in the background")
+  agent_start_parser.set_defaults(func=util.start_agent)
+
+  # subcommand of agent: stop
+  agent_stop_parser = agent_subparser.add_parser(
+      "stop", help="Stop the agent")
+  agent_stop_parser.set_defaults(func=util.stop_agent)
+
+  # subcommand of agent: status
+  agent_status_parser = agent_subparser.add_parser(
+      "status", help="Show the status of the agent")
+  agent_status_parser.set_defaults(func=util.get_agent_status)
+
+  for parser_with_socket in (agent_start_parser, agent_stop_parser,
+                             agent_status_parser):
+    parser_with_socket.add_argument(
+        "--socket",
+        dest="socket",
+        help="The path of the agent socket, "
+        "~/.cache/xiaomi/cloud_ml/agent.sock by default")
+
+  # For auto-complete, which is only imported when the shell completes
+  if "_ARGCOMPLETE" in os.environ:
+    import argcomplete
+    argcomplete.autocomplete(parser)
 
   if len(sys.argv) == 1:
     args = parser.parse_args(["-h"])
   else:
     args = parser.parse_args(sys.argv[1:])
-  args.func(args)
+  util.run_command(args)
 
 
 if __name__ == "__main__":
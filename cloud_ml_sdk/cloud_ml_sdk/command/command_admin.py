@@ -26,6 +26,14 @@ logging.basicConfig(level=logging.DEBUG)
 
 def main():
   parser = argparse.ArgumentParser()
+  parser.add_argument(
+      "--profile",
+      action="store_true",
+      help="Print the latency of the requests to each endpoint")
+  parser.add_argument(
+      "--config_profile",
+      dest="config_profile",
+      help="The named profile of the credentials in the config file")
   main_subparser = parser.add_subparsers(dest="command_group", help="Commands")
 
   # subcommand: jobs
@@ -53,6 +61,21 @@ def main():
   jobs_logs_parser.add_argument("job_name", help="The job to get the logs")
   jobs_logs_parser.add_argument(
       "org_id", help="The org_id of the job's owner")
+  jobs_logs_parser.add_argument(
+      "-f",
+      "--follow",
+      action="store_true",
+      help="Keep printing the new logs of the job")
+  jobs_logs_parser.add_argument(
+      "-o",
+      "--output",
+      dest="output",
+      help="Save the logs to the file, which is compressed if it ends with .gz")
+  jobs_logs_parser.add_argument(
+      "--resume",
+      action="store_true",
+      help="Resume saving the logs to the partial file, which only "
+      "downloads the rest of the logs if the server supports the offset")
   jobs_logs_parser.set_defaults(func=util.get_job_logs)
 
   # subcommand of jobs: events
@@ -94,6 +117,21 @@ def main():
       "model_version", help="The version of the model")
   models_logs_parser.add_argument(
       "org_id", help="The org_id of the model's owner")
+  models_logs_parser.add_argument(
+      "-f",
+      "--follow",
+      action="store_true",
+      help="Keep printing the new logs of the model service")
+  models_logs_parser.add_argument(
+      "-o",
+      "--output",
+      dest="output",
+      help="Save the logs to the file, which is compressed if it ends with .gz")
+  models_logs_parser.add_argument(
+      "--resume",
+      action="store_true",
+      help="Resume saving the logs to the partial file, which only "
+      "downloads the rest of the logs if the server supports the offset")
   models_logs_parser.set_defaults(func=util.get_model_logs)
 
   # subcommand of models: events
@@ -211,7 +249,7 @@ def main():
   quota_update_parser.set_defaults(func=util.update_quota)
 
   args = parser.parse_args()
-  args.func(args)
+  util.run_command(args)
 
 
 if __name__ == "__main__":
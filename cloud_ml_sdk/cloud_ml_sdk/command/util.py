@@ -12,28 +12,93 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+import datetime
 import json
 import logging
 import os
 import getpass
+import importlib
+import re
 import sys
 import time
 sys.path.append("../../")
 
 from . import color_util
 from . import constant
-from cloud_ml_sdk.client import CloudMlClient
-from cloud_ml_sdk.models.train_job import TrainJob
-from cloud_ml_sdk.models.model_service import ModelService
-from cloud_ml_sdk.models.dev_env import DevEnv
-from cloud_ml_sdk.models.tensorboard_service import TensorboardService
-from cloud_ml_sdk.models.quota import Quota
-from cloud_ml_sdk.models.dev_server import DevServer
+from cloud_ml_sdk import config
 
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger("requests").setLevel(logging.WARNING)
 
 
+class LazyModule(object):
+  """The module which is imported when its attribute is first used.
+
+  It's used for the exceptions in the except clauses, which are only
+  evaluated when an exception is raised.
+  """
+
+  def __init__(self, name):
+    self._name = name
+
+  def __getattr__(self, name):
+    return getattr(importlib.import_module(self._name), name)
+
+
+requests = LazyModule("requests")
+
+# The request hooks of the clients created by the commands
+REQUEST_HOOKS = []
+
+# The clients created by the commands of each credentials
+_clients = {}
+
+
+def create_client(access_key=None, secret_key=None, endpoint=None):
+  """Get the CloudMlClient with the request hooks of the commands.
+
+  The client of the same credentials is reused by the commands, such as the
+  four lists of `cloudml all`. The client is imported with the first command
+  which needs it, so the commands like `cloudml init` start faster.
+
+  If `cloudml agent` is running, the requests are sent to the agent, except
+  with `--profile` which measures the requests of this process.
+  """
+  key = (access_key, secret_key, endpoint)
+  if key not in _clients:
+    client = None
+    if not REQUEST_HOOKS:
+      from cloud_ml_sdk import agent_client
+      client = agent_client.connect(access_key, secret_key, endpoint)
+    if client is None:
+      from cloud_ml_sdk.client import CloudMlClient
+      client = CloudMlClient(access_key, secret_key, endpoint,
+                             hooks=REQUEST_HOOKS)
+    _clients[key] = client
+  return _clients[key]
+
+
+def run_command(args):
+  """Run the function of the command.
+
+  With `--profile`, the latency percentiles of each endpoint are printed to
+  stderr after the command. With `--config_profile`, the credentials are read
+  from the named profile of the configuration file.
+  """
+  config.set_profile(getattr(args, "config_profile", None))
+  aggregator = None
+  if getattr(args, "profile", False):
+    from cloud_ml_sdk.hooks import LatencyAggregator
+    aggregator = LatencyAggregator()
+    REQUEST_HOOKS.append(aggregator)
+  try:
+    args.func(args)
+  finally:
+    if aggregator is not None:
+      REQUEST_HOOKS.remove(aggregator)
+      aggregator.report()
+
 def compatibility_input(obj):
   if sys.version_info > (3, 0):
     res = input(obj)
@@ -42,8 +107,49 @@ def compatibility_input(obj):
   return res
 
 
+def parse_since(value):
+  """Parse the time of `--since` for the list commands.
+
+  Args:
+    value: The absolute time like "2017-01-01 08:00:00" and "2017-01-01", or
+           the relative time like "30m", "2h" and "7d" ago.
+
+  Returns:
+    The `datetime` of the time.
+
+  Raises:
+    argparse.ArgumentTypeError: If the value is invalid.
+  """
+  match = re.match(r"^(\d+)([smhd])$", value)
+  if match:
+    seconds = int(match.group(1)) * {
+        "s": 1,
+        "m": 60,
+        "h": 3600,
+        "d": 86400
+    }[match.group(2)]
+    return datetime.datetime.now() - datetime.timedelta(seconds=seconds)
+  for time_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+    try:
+      return datetime.datetime.strptime(value, time_format)
+    except ValueError:
+      pass
+  raise argparse.ArgumentTypeError(
+      "invalid time: {}, use \"2017-01-01 08:00:00\", \"2017-01-01\" or "
+      "\"2h\"".format(value))
+
+
+def get_list_filters(args):
+  """Get the filtering arguments of the list commands."""
+  return {
+      "state": getattr(args, "state", None),
+      "created_after": getattr(args, "since", None),
+      "limit": getattr(args, "limit", None)
+  }
+
+
 def authentication(access_key, secret_key, endpoint):
-  client = CloudMlClient(access_key, secret_key, endpoint)
+  client = create_client(access_key, secret_key, endpoint)
   response = client.authentication()
   if isinstance(response, str):
     return False
@@ -110,6 +216,7 @@ def init_config(args):
         os.makedirs(config_dir)
       with open(config_path, "w") as outfile:
         json.dump(config_data, outfile, indent=4)
+      config.clear_cache()
       print("Successfully initialize config file in path: {}".format(
           config_path))
     else:
@@ -122,7 +229,7 @@ def init_config(args):
 def get_org_id(args):
   """Get org_id by access_key and secret_key in config file."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_org_id()
   if isinstance(response, str):
     print("response: {}".format(response))
@@ -433,39 +540,43 @@ def print_metrics_result(metrics):
 def list_jobs(args):
   """List train jobs."""
 
-  client = CloudMlClient()
-  if "org_id" in args:
-    if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
-      response_train_jobs = client.list_train_jobs(
-          constant.CLOUDML_ALL_ORG_PARAMETER)
+  client = create_client()
+  filters = get_list_filters(args)
+  # Print the train jobs while the response is downloaded
+  try:
+    if "org_id" in args:
+      if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
+        response_train_jobs = client.iter_train_jobs(
+            constant.CLOUDML_ALL_ORG_PARAMETER, **filters)
+      else:
+        response_train_jobs = client.iter_train_jobs(args.org_id, **filters)
     else:
-      response_train_jobs = client.list_train_jobs(args.org_id)
+      response_train_jobs = client.iter_train_jobs(**filters)
+  except requests.HTTPError as e:
+    print("response: {}".format(e.response.content))
+    return
+  if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
+    print("{:16} {:16} {:32} {:16} {:32} {:32}".format(
+        "ORG ID", "ORG NAME", "JOB_NAME", "STATE", "CREATED", "UPDATED"))
+    for train_job in response_train_jobs:
+      print("{:<16} {:16} {:32} {:16} {:32} {:32}".format(train_job[
+          "org_id"], train_job["org_name"], train_job["job_name"],
+          color_util.colorize_state(train_job["state"]),
+          train_job["create_time"], train_job["update_time"]))
   else:
-    response_train_jobs = client.list_train_jobs()
-  if not isinstance(response_train_jobs, str):
-    if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
-      print("{:16} {:16} {:32} {:16} {:32} {:32}".format(
-          "ORG ID", "ORG NAME", "JOB_NAME", "STATE", "CREATED", "UPDATED"))
-      for train_job in response_train_jobs:
-        print("{:<16} {:16} {:32} {:16} {:32} {:32}".format(train_job[
-            "org_id"], train_job["org_name"], train_job["job_name"],
-            color_util.colorize_state(train_job["state"]),
-            train_job["create_time"], train_job["update_time"]))
-    else:
-      print("{:32} {:16} {:32} {:32}".format("JOB_NAME", "STATE", "CREATED",
-                                             "UPDATED"))
-      for train_job in response_train_jobs:
-        print("{:32} {:16} {:32} {:32}".format(train_job[
-            "job_name"], color_util.colorize_state(train_job["state"]),
-            train_job["create_time"], train_job["update_time"]))
-  else:
-    print("response: {}".format(response_train_jobs))
+    print("{:32} {:16} {:32} {:32}".format("JOB_NAME", "STATE", "CREATED",
+                                           "UPDATED"))
+    for train_job in response_train_jobs:
+      print("{:32} {:16} {:32} {:32}".format(train_job[
+          "job_name"], color_util.colorize_state(train_job["state"]),
+          train_job["create_time"], train_job["update_time"]))
 
 
 def submit_job(args):
   """Submit the job."""
+  from cloud_ml_sdk.models.train_job import TrainJob
 
-  client = CloudMlClient()
+  client = create_client()
   if args.filename:
     with open(args.filename) as f:
       # TODO: Check file format and verify the items
@@ -557,7 +668,7 @@ def submit_job(args):
 def describe_job(args):
   """Describe the job."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.describe_train_job(args.job_name, args.org_id)
   else:
@@ -568,10 +679,42 @@ def describe_job(args):
     print("response: {}".format(response))
 
 
+def print_followed_logs(logs):
+  """Print the logs while they are written until Ctrl+C."""
+  try:
+    for text in logs:
+      sys.stdout.write(text)
+      sys.stdout.flush()
+  except KeyboardInterrupt:
+    return
+  except requests.HTTPError as e:
+    print("response: {}".format(e.response.content))
+
+
+def download_logs(download, args):
+  """Download the logs to the file, which is compressed if it ends with .gz."""
+  try:
+    size = download(args.output, compress=args.output.endswith(".gz"),
+                    resume=args.resume)
+  except requests.HTTPError as e:
+    print("response: {}".format(e.response.content))
+    return
+  print("Saved {} bytes of logs to {}".format(size, args.output))
+
+
 def get_job_logs(args):
   """Get the logs of the job."""
 
-  client = CloudMlClient()
+  client = create_client()
+  org_id = getattr(args, "org_id", None)
+  if getattr(args, "output", None):
+    download_logs(
+        lambda path, **kwargs: client.download_train_job_logs(
+            args.job_name, path, org_id, **kwargs), args)
+    return
+  if getattr(args, "follow", False):
+    print_followed_logs(client.follow_train_job_logs(args.job_name, org_id))
+    return
   if "org_id" in args:
     response = client.get_train_job_logs(args.job_name, args.org_id)
   else:
@@ -585,7 +728,7 @@ def get_job_logs(args):
 def get_job_metrics(args):
   """Get the metrics of the job."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.get_train_job_metrics(args.job_name, args.org_id)
   else:
@@ -599,7 +742,7 @@ def get_job_metrics(args):
 def get_job_hyperparameters_data(args):
   """Get hyperparameters data of the job."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_train_job_hyperparameters_data(args.job_name)
   if not isinstance(response, str):
     print_hyperparameter_data_result(response)
@@ -610,7 +753,7 @@ def get_job_hyperparameters_data(args):
 def delete_job(args):
   """Delete the job."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.delete_train_job(args.job_name)
   print(response)
 
@@ -618,7 +761,7 @@ def delete_job(args):
 def get_train_job_events(args):
   """Get events of the train job."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.get_train_job_events(args.job_name, args.org_id)
   else:
@@ -632,43 +775,47 @@ def get_train_job_events(args):
 def list_models(args):
   """List model services."""
 
-  client = CloudMlClient()
-  if "org_id" in args:
-    if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
-      response_models = client.list_model_services(
-          constant.CLOUDML_ALL_ORG_PARAMETER)
-    else:
-      response_models = client.list_model_services(args.org_id)
-  else:
-    response_models = client.list_model_services()
-  if not isinstance(response_models, str):
-    if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
-      print("{:16} {:16} {:32} {:16} {:32} {:16} {:32} {:32}".format(
-          "ORG ID", "ORG NAME", "MODEL_NAME", "MODEL_VERSION", "ADDRESS",
-          "STATE", "CREATED", "UPDATED"))
-      for model in response_models:
-        print("{:16} {:16} {:32} {:16} {:32} {:16} {:32} {:32}".format(model[
-            "org_id"], model["org_name"], model["model_name"], model[
-            "model_version"], model["address"],
-            color_util.colorize_state(model["state"]), model[
-            "create_time"], model["update_time"]))
+  client = create_client()
+  filters = get_list_filters(args)
+  # Print the model services while the response is downloaded
+  try:
+    if "org_id" in args:
+      if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
+        response_models = client.iter_model_services(
+            constant.CLOUDML_ALL_ORG_PARAMETER, **filters)
+      else:
+        response_models = client.iter_model_services(args.org_id, **filters)
     else:
-      print("{:32} {:16} {:32} {:16} {:32} {:32}".format(
-          "MODEL_NAME", "MODEL_VERSION", "ADDRESS", "STATE", "CREATED",
-          "UPDATED"))
-      for model in response_models:
-        print("{:32} {:16} {:32} {:16} {:32} {:32}".format(model[
-            "model_name"], model["model_version"], model["address"],
-            color_util.colorize_state(model["state"]),
-            model["create_time"], model["update_time"]))
+      response_models = client.iter_model_services(**filters)
+  except requests.HTTPError as e:
+    print("response: {}".format(e.response.content))
+    return
+  if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
+    print("{:16} {:16} {:32} {:16} {:32} {:16} {:32} {:32}".format(
+        "ORG ID", "ORG NAME", "MODEL_NAME", "MODEL_VERSION", "ADDRESS",
+        "STATE", "CREATED", "UPDATED"))
+    for model in response_models:
+      print("{:16} {:16} {:32} {:16} {:32} {:16} {:32} {:32}".format(model[
+          "org_id"], model["org_name"], model["model_name"], model[
+          "model_version"], model["address"],
+          color_util.colorize_state(model["state"]), model[
+          "create_time"], model["update_time"]))
   else:
-    print("response: {}".format(response_models))
+    print("{:32} {:16} {:32} {:16} {:32} {:32}".format(
+        "MODEL_NAME", "MODEL_VERSION", "ADDRESS", "STATE", "CREATED",
+        "UPDATED"))
+    for model in response_models:
+      print("{:32} {:16} {:32} {:16} {:32} {:32}".format(model[
+          "model_name"], model["model_version"], model["address"],
+          color_util.colorize_state(model["state"]),
+          model["create_time"], model["update_time"]))
 
 
 def create_model(args):
   """Create the model service."""
+  from cloud_ml_sdk.models.model_service import ModelService
 
-  client = CloudMlClient()
+  client = create_client()
   model = ModelService(args.model_name, args.model_version, args.model_uri)
 
   if args.model_args:
@@ -736,7 +883,7 @@ def create_model(args):
 def describe_model(args):
   """Describe the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.describe_model_service(args.model_name,
                                              args.model_version, args.org_id)
@@ -751,7 +898,7 @@ def describe_model(args):
 def update_model(args):
   """Update the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
   update_json = {}
 
   if args.replicas:
@@ -774,7 +921,18 @@ def update_model(args):
 def get_model_logs(args):
   """Get logs of the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
+  org_id = getattr(args, "org_id", None)
+  if getattr(args, "output", None):
+    download_logs(
+        lambda path, **kwargs: client.download_model_service_logs(
+            args.model_name, args.model_version, path, org_id, **kwargs),
+        args)
+    return
+  if getattr(args, "follow", False):
+    print_followed_logs(client.follow_model_service_logs(
+        args.model_name, args.model_version, org_id))
+    return
   if "org_id" in args:
     response = client.get_model_service_logs(args.model_name, args.model_version, args.org_id)
   else:
@@ -788,7 +946,7 @@ def get_model_logs(args):
 def get_model_metrics(args):
   """Get the metrics of the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.get_model_service_metrics(args.model_name, args.model_version, args.org_id)
   else:
@@ -802,7 +960,7 @@ def get_model_metrics(args):
 def delete_model(args):
   """Delete the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.delete_model_service(args.model_name, args.model_version)
   print(response)
 
@@ -810,7 +968,7 @@ def delete_model(args):
 def get_model_service_events(args):
   """Get events of the model service."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.get_model_service_events(args.model_name,
                                                args.model_version, args.org_id)
@@ -826,15 +984,17 @@ def get_model_service_events(args):
 def list_tensorboard_services(args):
   """List tensorboard_services."""
 
-  client = CloudMlClient()
+  client = create_client()
+  filters = get_list_filters(args)
   if "org_id" in args:
     if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
       response_tensorboard = client.list_tensorboard_services(
-          constant.CLOUDML_ALL_ORG_PARAMETER)
+          constant.CLOUDML_ALL_ORG_PARAMETER, **filters)
     else:
-      response_tensorboard = client.list_tensorboard_services(args.org_id)
+      response_tensorboard = client.list_tensorboard_services(
+          args.org_id, **filters)
   else:
-    response_tensorboard = client.list_tensorboard_services()
+    response_tensorboard = client.list_tensorboard_services(**filters)
 
   if not isinstance(response_tensorboard, str):
     if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
@@ -862,8 +1022,9 @@ def list_tensorboard_services(args):
 
 def create_tensorboard_service(args):
   """Create the tensorboard_service."""
+  from cloud_ml_sdk.models.tensorboard_service import TensorboardService
 
-  client = CloudMlClient()
+  client = create_client()
   tensorboard = TensorboardService(args.tensorboard_name, args.logdir)
 
   if args.framework:
@@ -889,7 +1050,7 @@ def create_tensorboard_service(args):
 def describe_tensorboard_service(args):
   """Describe the tensorboard_service."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.describe_tensorboard_service(args.tensorboard_name,
                                                    args.org_id)
@@ -904,7 +1065,7 @@ def describe_tensorboard_service(args):
 def delete_tensorboard_service(args):
   """Delete the tensorboard_service."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.delete_tensorboard_service(args.tensorboard_name)
   print(response)
 
@@ -912,7 +1073,7 @@ def delete_tensorboard_service(args):
 def get_tensorboard_service_events(args):
   """Get events of the tensorboard service."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_tensorboard_service_events(args.tensorboard_name)
   if not isinstance(response, str):
     print_kubernetes_events(response["events"])
@@ -923,15 +1084,16 @@ def get_tensorboard_service_events(args):
 def list_dev_envs(args):
   """List dev environments."""
 
-  client = CloudMlClient()
+  client = create_client()
+  filters = get_list_filters(args)
   if "org_id" in args:
     if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
       response_dev_envs = client.list_dev_envs(
-          constant.CLOUDML_ALL_ORG_PARAMETER)
+          constant.CLOUDML_ALL_ORG_PARAMETER, **filters)
     else:
-      response_dev_envs = client.list_dev_envs(args.org_id)
+      response_dev_envs = client.list_dev_envs(args.org_id, **filters)
   else:
-    response_dev_envs = client.list_dev_envs()
+    response_dev_envs = client.list_dev_envs(**filters)
   if not isinstance(response_dev_envs, str):
     if "org_id" in args and args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
       print("{:16} {:16} {:32} {:32} {:16} {:32} {:32}".format(
@@ -956,8 +1118,9 @@ def list_dev_envs(args):
 
 def create_dev_env(args):
   """Create dev env."""
+  from cloud_ml_sdk.models.dev_env import DevEnv
 
-  client = CloudMlClient()
+  client = create_client()
   dev_env = DevEnv(args.dev_name, args.password)
 
   if args.cpu_limit:
@@ -1015,7 +1178,7 @@ def create_dev_env(args):
 def describe_dev_env(args):
   """Describe the dev environment."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.describe_dev_env(args.dev_name, args.org_id)
   else:
@@ -1029,7 +1192,7 @@ def describe_dev_env(args):
 def delete_dev_env(args):
   """Delete the dev environment."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.delete_dev_env(args.dev_name)
   print(response)
 
@@ -1037,7 +1200,7 @@ def delete_dev_env(args):
 def get_dev_env_events(args):
   """Get events of the dev environment."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_dev_env_events(args.dev_name)
   if not isinstance(response, str):
     print_kubernetes_events(response["events"])
@@ -1048,7 +1211,7 @@ def get_dev_env_events(args):
 def get_dev_env_metrics(args):
   """Get the metrics of the dev environment."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_dev_env_metrics(args.dev_name)
   if not isinstance(response, str):
     print_metrics_result(response)
@@ -1059,7 +1222,7 @@ def get_dev_env_metrics(args):
 def list_dev_servers(args):
   """List dev servers."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
       response_dev_servers = client.list_dev_servers(
@@ -1093,8 +1256,9 @@ def list_dev_servers(args):
 
 def create_dev_server(args):
   """Create dev server."""
+  from cloud_ml_sdk.models.dev_server import DevServer
 
-  client = CloudMlClient()
+  client = create_client()
   dev_server = DevServer(args.dev_name, args.password)
 
   if args.framework:
@@ -1116,7 +1280,7 @@ def create_dev_server(args):
 def describe_dev_server(args):
   """Describe the dev server."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     response = client.describe_dev_server(args.dev_name, args.org_id)
   else:
@@ -1130,7 +1294,7 @@ def describe_dev_server(args):
 def delete_dev_server(args):
   """Delete the dev server."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.delete_dev_server(args.dev_name)
   print(response)
 
@@ -1138,7 +1302,7 @@ def delete_dev_server(args):
 def get_dev_server_events(args):
   """Get events of the dev server."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_dev_server_events(args.dev_name)
   if not isinstance(response, str):
     print_kubernetes_events(response["events"])
@@ -1149,7 +1313,7 @@ def get_dev_server_events(args):
 def list_quota(args):
   """List the quota."""
 
-  client = CloudMlClient()
+  client = create_client()
   if "org_id" in args:
     if args.org_id == constant.CLOUDML_ALL_ORG_PARAMETER:
       response_quotas = client.get_quota(constant.CLOUDML_ALL_ORG_PARAMETER)
@@ -1174,7 +1338,7 @@ def list_quota(args):
 def do_predict(args):
   """Do predict."""
 
-  client = CloudMlClient()
+  client = create_client()
   # TODO: Remove duplicated code
   if args.timeout:
     if args.model_version:
@@ -1203,7 +1367,8 @@ def do_predict(args):
 
 
 def update_job_quota(args):
-  client = CloudMlClient()
+  from cloud_ml_sdk.models.quota import Quota
+  client = create_client()
   quota = Quota(args.org_id, args.org_name)
   if args.cpu:
     quota.train_cpu_quota = args.cpu
@@ -1221,7 +1386,8 @@ def update_job_quota(args):
 
 
 def update_model_quota(args):
-  client = CloudMlClient()
+  from cloud_ml_sdk.models.quota import Quota
+  client = create_client()
   quota = Quota(args.org_id, args.org_name)
   if args.cpu:
     quota.model_cpu_quota = args.cpu
@@ -1239,7 +1405,8 @@ def update_model_quota(args):
 
 
 def update_dev_quota(args):
-  client = CloudMlClient()
+  from cloud_ml_sdk.models.quota import Quota
+  client = create_client()
   quota = Quota(args.org_id, args.org_name)
   if args.cpu:
     quota.dev_cpu_quota = args.cpu
@@ -1257,7 +1424,8 @@ def update_dev_quota(args):
 
 
 def update_tensorboard_quota(args):
-  client = CloudMlClient()
+  from cloud_ml_sdk.models.quota import Quota
+  client = create_client()
   quota = Quota(args.org_id, args.org_name)
   if args.tensorboard:
     quota.tensorboard_quota = int(args.tensorboard)
@@ -1269,7 +1437,8 @@ def update_tensorboard_quota(args):
 
 
 def update_total_quota(args):
-  client = CloudMlClient()
+  from cloud_ml_sdk.models.quota import Quota
+  client = create_client()
   quota = Quota(args.org_id, args.org_name)
   if args.cpu:
     quota.total_cpu_quota = args.cpu
@@ -1306,7 +1475,7 @@ def update_quota(args):
 def list_framework(args):
   """List the framework."""
 
-  client = CloudMlClient()
+  client = create_client()
   response = client.get_frameworks()
 
   if not isinstance(response, str):
@@ -1326,3 +1495,70 @@ def list_all(args):
   list_dev_envs(args)
   print("\nList all tensorboard services:")
   list_tensorboard_services(args)
+
+
+def start_agent(args):
+  """Start the agent, which runs in the background with `--daemon`."""
+  from cloud_ml_sdk import agent_client
+  from cloud_ml_sdk.agent import Agent
+
+  try:
+    agent = Agent(args.socket)
+  except agent_client.AgentError as e:
+    print("ERROR: {}".format(e))
+    return
+  print("The agent is listening on {}".format(agent.path))
+  if args.daemon:
+    # The socket is ready before the command returns
+    sys.stdout.flush()
+    if os.fork():
+      return
+    os.setsid()
+    with open(os.devnull, "r+") as devnull:
+      for stream in (sys.stdin, sys.stdout, sys.stderr):
+        os.dup2(devnull.fileno(), stream.fileno())
+  agent.serve_forever()
+
+
+def stop_agent(args):
+  """Stop the agent."""
+  from cloud_ml_sdk import agent_client
+
+  connection = agent_client.open_connection(args.socket)
+  if connection is None:
+    print("The agent is not running")
+    return
+  try:
+    connection.call("stop")
+  finally:
+    connection.close()
+  # The agent removes the socket after the running requests
+  path = agent_client.socket_path(args.socket)
+  for i in range(50):
+    if not os.path.exists(path):
+      break
+    time.sleep(0.1)
+  print("Stopped the agent")
+
+
+def get_agent_status(args):
+  """Print the status of the agent."""
+  from cloud_ml_sdk import agent_client
+
+  connection = agent_client.open_connection(args.socket)
+  if connection is None:
+    print("The agent is not running")
+    return
+  try:
+    status = connection.call("status")
+  finally:
+    connection.close()
+  print("{:20} {}".format("Socket:", status["path"]))
+  print("{:20} {}".format("Pid:", status["pid"]))
+  print("{:20} {:.0f} seconds".format("Uptime:", status["uptime"]))
+  print("{:20} {}".format("Requests:", status["requests"]))
+  for endpoint in status["endpoints"]:
+    print("{:20} {}".format("Endpoint:", endpoint["endpoint"]))
+    print("{:20} {}".format("  Cache:", json.dumps(endpoint["cache"])))
+    print("{:20} {}".format("  Single-flight:",
+                            json.dumps(endpoint["single_flight"])))
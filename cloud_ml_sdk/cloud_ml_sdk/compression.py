@@ -0,0 +1,61 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Encode the request bodies, which are compressed with gzip if they're large.
+
+The body is signed after it's encoded, so the content md5 is computed over
+the bytes on the wire.
+"""
+
+import zlib
+
+try:
+  text_type = unicode
+except NameError:
+  text_type = str
+
+CONTENT_ENCODING_HEADER = "Content-Encoding"
+
+# The compression level of gzip, which is fast and saves most of the bytes of
+# the json bodies
+COMPRESS_LEVEL = 6
+
+
+def gzip_compress(data):
+  """Compress the bytes in gzip format.
+
+  The header has no file name and modification time, so the same data is
+  always compressed to the same bytes.
+  """
+  compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED,
+                                16 + zlib.MAX_WBITS)
+  return compressor.compress(data) + compressor.flush()
+
+
+def encode_body(data, compress_threshold=None):
+  """Encode the string body of the request.
+
+  Args:
+    data: The string or bytes body.
+    compress_threshold: The min number of bytes to compress the body with
+                        gzip. None means not to compress.
+
+  Returns:
+    The tuple of the utf-8 bytes to send, and the dictionary of headers to
+    add to the request.
+  """
+  if isinstance(data, text_type):
+    data = data.encode("utf-8")
+  if compress_threshold is None or len(data) < compress_threshold:
+    return data, {}
+  return gzip_compress(data), {CONTENT_ENCODING_HEADER: "gzip"}
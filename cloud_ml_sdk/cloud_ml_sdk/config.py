@@ -0,0 +1,192 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Resolve the credentials of cloud-ml once per process.
+
+The configuration file of `cloudml init` may have named profiles besides
+the default one:
+
+  {
+    "xiaomi_access_key_id": "...",
+    "xiaomi_secret_access_key": "...",
+    "xiaomi_cloudml_endpoint": "...",
+    "profiles": {
+      "prod": {
+        "xiaomi_access_key_id": "...",
+        "xiaomi_secret_access_key": "...",
+        "xiaomi_cloudml_endpoint": "..."
+      }
+    }
+  }
+
+The profile is selected by `set_profile`, the `XIAOMI_CLOUDML_PROFILE`
+environment variable, or `cloudml --config_profile prod`.
+"""
+
+import collections
+import json
+import os
+import threading
+
+CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".config/xiaomi/config")
+
+PROFILE_ENV = "XIAOMI_CLOUDML_PROFILE"
+
+Credentials = collections.namedtuple("Credentials",
+                                     ["access_key", "secret_key", "endpoint"])
+
+_lock = threading.Lock()
+_configs = {}
+_profile = None
+_signers = {}
+_sessions = {}
+
+
+def set_profile(profile):
+  """Set the default profile of this process, None for the default one."""
+  global _profile
+  _profile = profile
+
+
+def get_profile():
+  """Get the profile selected by `set_profile` or the environment."""
+  return _profile or os.environ.get(PROFILE_ENV)
+
+
+def load_config(path=CONFIG_PATH):
+  """Load the configuration file, which is read once per process.
+
+  Returns:
+    The dictionary of the configuration, or None if the file doesn't exist.
+
+  Raises:
+    ValueError: If the file is not in json format.
+  """
+  with _lock:
+    if path not in _configs:
+      if not os.path.exists(path):
+        _configs[path] = None
+      else:
+        try:
+          with open(path) as f:
+            _configs[path] = json.load(f)
+        except Exception as e:
+          raise ValueError(
+              "Failed to load config data, is the json data in right "
+              "format? Exception content: {}".format(e))
+    return _configs[path]
+
+
+def clear_cache():
+  """Forget the loaded configuration files, such as after `cloudml init`."""
+  with _lock:
+    _configs.clear()
+
+
+def resolve_credentials(access_key=None,
+                        secret_key=None,
+                        endpoint=None,
+                        profile=None,
+                        path=CONFIG_PATH):
+  """Resolve the credentials of cloud-ml which are not given.
+
+  The missing values are read from the named profile if any, otherwise from
+  the environment variables or the default profile of the configuration
+  file.
+
+  Args:
+    access_key: Access key for authentic.
+    secret_key: Secret key for authentic.
+    endpoint: The endpoint of cloud-ml service.
+    profile: The name of the profile, `get_profile()` by default.
+    path: The path of the configuration file.
+
+  Returns:
+    The `Credentials` tuple.
+
+  Raises:
+    ValueError: If the credentials or the profile can't be found.
+  """
+  profile = profile or get_profile()
+  if profile:
+    data = (load_config(path) or {}).get("profiles", {}).get(profile)
+    if data is None:
+      raise ValueError("Can't find profile {} in {}".format(profile, path))
+    environ = {}
+  else:
+    data = None
+    environ = os.environ
+
+  if access_key is None or secret_key is None:
+    if "XIAOMI_ACCESS_KEY_ID" in environ and \
+        "XIAOMI_SECRET_ACCESS_KEY" in environ:
+      access_key = environ["XIAOMI_ACCESS_KEY_ID"]
+      secret_key = environ["XIAOMI_SECRET_ACCESS_KEY"]
+    else:
+      data = data or load_config(path)
+      if data is None:
+        raise ValueError(
+            "Can't find access key and secret key, please run cloudml init")
+      try:
+        access_key = data["xiaomi_access_key_id"]
+        secret_key = data["xiaomi_secret_access_key"]
+      except KeyError as e:
+        raise ValueError("Failed to load config data, missing {}".format(e))
+
+  if endpoint is None:
+    if "XIAOMI_CLOUDML_ENDPOINT" in environ:
+      endpoint = environ["XIAOMI_CLOUDML_ENDPOINT"]
+    else:
+      data = data or load_config(path)
+      if data is None or "xiaomi_cloudml_endpoint" not in data:
+        raise ValueError(
+            "Can't find cloudml endpoint, please run cloudml init")
+      endpoint = data["xiaomi_cloudml_endpoint"]
+
+  return Credentials(access_key, secret_key, endpoint)
+
+
+def get_signer(access_key, secret_key):
+  """Get the signer of the credentials shared by the clients."""
+  # Imported with the first client, which keeps `cloudml init` fast
+  from cloud_ml_common.auth.signature import Signer
+  key = (access_key, secret_key)
+  with _lock:
+    if key not in _signers:
+      _signers[key] = Signer(access_key, secret_key)
+    return _signers[key]
+
+
+def get_session(create_session, access_key, endpoint, pool_connections,
+                pool_maxsize):
+  """Get the keep-alive session shared by the clients of the same access key
+  and endpoint.
+
+  The clients of different credentials or endpoints never share the session
+  and its cookies.
+
+  Args:
+    create_session: The function to create the session with the pool sizes.
+    access_key: The access key of the clients.
+    endpoint: The endpoint of the clients, or the tuple of their endpoints.
+    pool_connections: The number of hosts to keep connection pools for.
+    pool_maxsize: The max number of keep-alive connections for each host.
+
+  Returns:
+    The `requests.Session` object.
+  """
+  key = (access_key, endpoint, pool_connections, pool_maxsize)
+  with _lock:
+    if key not in _sessions:
+      _sessions[key] = create_session(pool_connections, pool_maxsize)
+    return _sessions[key]
@@ -0,0 +1,240 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Select the fastest healthy endpoint of the multiple cloud-ml endpoints."""
+
+import functools
+import logging
+import threading
+import time
+import weakref
+
+# The seconds between the latency probes of the endpoints
+DEFAULT_PROBE_INTERVAL = 30.0
+
+# The weight of the new latency in the moving average
+LATENCY_WEIGHT = 0.3
+
+
+def split_endpoints(endpoint):
+  """Get the list of endpoints of the list or comma-separated string."""
+  if isinstance(endpoint, (list, tuple)):
+    return list(endpoint)
+  return [value.strip() for value in endpoint.split(",")]
+
+
+class CircuitBreaker(object):
+  """The circuit breaker of an endpoint.
+
+  The circuit opens after `failure_threshold` consecutive failures, and the
+  endpoint is not used until `reset_timeout` seconds later. Then one request
+  is allowed to try it again, which closes the circuit if it succeeds and
+  opens it again if it fails. The trial is allowed again if its result is
+  not recorded in `reset_timeout` seconds.
+  """
+
+  def __init__(self, failure_threshold=3, reset_timeout=30.0):
+    self._failure_threshold = failure_threshold
+    self._reset_timeout = reset_timeout
+    self._failures = 0
+    self._opened_at = None
+    self._trial_at = None
+
+  @property
+  def is_open(self):
+    return self._opened_at is not None
+
+  def available(self):
+    """Check whether a request is allowed to use the endpoint."""
+    if self._opened_at is None:
+      return True
+    now = time.time()
+    if self._trial_at is not None:
+      return now - self._trial_at >= self._reset_timeout
+    return now - self._opened_at >= self._reset_timeout
+
+  def start_trial(self):
+    """Let the request try the endpoint of the open circuit, and stop the
+    others until its result is recorded."""
+    if self._opened_at is not None:
+      self._trial_at = time.time()
+
+  def record_success(self):
+    self._failures = 0
+    self._opened_at = None
+    self._trial_at = None
+
+  def record_failure(self):
+    self._failures += 1
+    self._trial_at = None
+    if self._opened_at is not None or \
+        self._failures >= self._failure_threshold:
+      self._opened_at = time.time()
+
+
+class EndpointSelector(object):
+  """Route the requests to the fastest healthy endpoint.
+
+  The latency of each endpoint is the moving average of the probes and the
+  requests. The endpoints are tried in the given order before they are
+  probed.
+  """
+
+  def __init__(self,
+               endpoints,
+               failure_threshold=3,
+               reset_timeout=30.0,
+               probe_interval=DEFAULT_PROBE_INTERVAL):
+    """Create a new EndpointSelector.
+
+    Args:
+      endpoints: The list of endpoints of cloud-ml service.
+      failure_threshold: The number of consecutive failures to stop using an
+                         endpoint.
+      reset_timeout: The seconds to stop using the failed endpoint.
+      probe_interval: The seconds between the latency probes.
+    """
+    self._endpoints = list(endpoints)
+    self._breakers = dict((endpoint, CircuitBreaker(failure_threshold,
+                                                    reset_timeout))
+                          for endpoint in self._endpoints)
+    self._latencies = {}
+    self._probe_interval = probe_interval
+    self._stopped = threading.Event()
+    self._thread = None
+    self._lock = threading.Lock()
+
+  @property
+  def endpoints(self):
+    return list(self._endpoints)
+
+  def select(self, exclude=(), peek=False):
+    """Get the fastest healthy endpoint.
+
+    The endpoint of the open circuit is selected by one request at a time
+    after its reset timeout.
+
+    Args:
+      exclude: The endpoints to avoid, such as the failed ones of this
+               request, unless all the endpoints are excluded.
+      peek: Whether to only check the endpoint without sending the request,
+            which doesn't take the trial of the open circuit.
+
+    Returns:
+      The endpoint to send the request to.
+    """
+    with self._lock:
+      candidates = [endpoint for endpoint in self._endpoints
+                    if endpoint not in exclude] or self._endpoints
+      healthy = [endpoint for endpoint in candidates
+                 if self._breakers[endpoint].available()]
+      if not healthy:
+        # Try the endpoint which failed the earliest
+        return min(candidates,
+                   key=lambda endpoint: self._breakers[endpoint]._opened_at)
+      order = dict((endpoint, i) for i, endpoint in enumerate(self._endpoints))
+      endpoint = min(healthy, key=lambda endpoint: (
+          self._latencies.get(endpoint, 0.0), order[endpoint]))
+      if not peek:
+        self._breakers[endpoint].start_trial()
+      return endpoint
+
+  def record(self, endpoint, latency=None, failed=False):
+    """Record the result of a request or probe to the endpoint.
+
+    Args:
+      endpoint: The endpoint of the request.
+      latency: The seconds to get the response, which is optional.
+      failed: Whether it fails with connection errors, timeouts or 5xx.
+    """
+    with self._lock:
+      breaker = self._breakers.get(endpoint)
+      if breaker is None:
+        return
+      if failed:
+        breaker.record_failure()
+        return
+      breaker.record_success()
+      if latency is not None:
+        average = self._latencies.get(endpoint)
+        if average is None:
+          self._latencies[endpoint] = latency
+        else:
+          self._latencies[endpoint] = (
+              LATENCY_WEIGHT * latency + (1 - LATENCY_WEIGHT) * average)
+
+  def status(self):
+    """Get the latency and health of each endpoint.
+
+    Returns:
+      The list of dictionaries with the endpoint, its average latency in
+      seconds or None if unknown, and whether its circuit is open.
+    """
+    with self._lock:
+      return [{
+          "endpoint": endpoint,
+          "latency": self._latencies.get(endpoint),
+          "open": self._breakers[endpoint].is_open
+      } for endpoint in self._endpoints]
+
+  def start_probing(self, probe):
+    """Probe the latency of the endpoints in a background thread.
+
+    The bound method is held by a weak reference, so the thread stops when
+    its object is collected without closing this selector.
+
+    Args:
+      probe: The function to send a cheap request to the endpoint, which
+             returns the `requests.Response` or raises the exception.
+    """
+    if self._thread is not None:
+      return
+
+    stopped = self._stopped
+    owner = getattr(probe, "__self__", None)
+    if owner is not None:
+      func = probe.__func__
+      owner = weakref.ref(owner, lambda ref: stopped.set())
+      probe = None
+
+    def probe_all():
+      """Probe each endpoint, or return False if the owner is collected."""
+      if owner is None:
+        send = probe
+      else:
+        instance = owner()
+        if instance is None:
+          return False
+        send = functools.partial(func, instance)
+      for endpoint in self._endpoints:
+        start = time.time()
+        try:
+          response = send(endpoint)
+          failed = response.status_code >= 500
+        except Exception as e:
+          logging.debug("Failed to probe %s: %s", endpoint, e)
+          failed = True
+        self.record(endpoint, time.time() - start, failed)
+      return True
+
+    def run():
+      while not stopped.is_set() and probe_all():
+        stopped.wait(self._probe_interval)
+
+    self._thread = threading.Thread(target=run, name="endpoint-probe")
+    self._thread.daemon = True
+    self._thread.start()
+
+  def close(self):
+    """Stop probing the endpoints."""
+    self._stopped.set()
@@ -0,0 +1,101 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import threading
+import time
+import unittest
+import weakref
+
+from cloud_ml_sdk.endpoints import (CircuitBreaker, EndpointSelector,
+                                    split_endpoints)
+
+
+class StandInResponse(object):
+  status_code = 200
+
+
+class Prober(object):
+  """The object whose bound method probes the endpoints."""
+
+  def __init__(self):
+    self.probed = threading.Event()
+
+  def probe(self, endpoint):
+    self.probed.set()
+    return StandInResponse()
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+  def test_half_open_trial(self):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    self.assertFalse(breaker.is_open)
+    breaker.record_failure()
+    self.assertTrue(breaker.is_open)
+    self.assertTrue(breaker.available())
+    breaker.start_trial()
+    breaker._reset_timeout = 60
+    self.assertFalse(breaker.available())
+    breaker.record_failure()
+    self.assertFalse(breaker.available())
+    breaker.record_success()
+    self.assertTrue(breaker.available())
+    self.assertFalse(breaker.is_open)
+
+
+class EndpointSelectorTest(unittest.TestCase):
+
+  def test_split_endpoints(self):
+    self.assertEqual(["http://a", "http://b"],
+                     split_endpoints("http://a, http://b"))
+    self.assertEqual(["http://a"], split_endpoints(("http://a", )))
+
+  def test_one_trial_after_reset_timeout(self):
+    selector = EndpointSelector(["http://a", "http://b"],
+                                failure_threshold=1, reset_timeout=60)
+    selector.record("http://a", 0.01)
+    selector.record("http://b", 0.5)
+    selector.record("http://a", failed=True)
+    self.assertEqual("http://b", selector.select())
+
+    # The reset timeout of the open circuit has passed
+    selector._breakers["http://a"]._opened_at -= 60
+    self.assertEqual("http://a", selector.select(peek=True))
+    self.assertEqual("http://a", selector.select())
+    for _ in range(3):
+      self.assertEqual("http://b", selector.select())
+    selector.record("http://a", 0.01)
+    self.assertEqual("http://a", selector.select())
+
+  def test_probe_stops_when_owner_is_collected(self):
+    selector = EndpointSelector(["http://a", "http://b"], probe_interval=60)
+    prober = Prober()
+    owner = weakref.ref(prober)
+    selector.start_probing(prober.probe)
+    self.assertTrue(prober.probed.wait(5))
+    del prober
+    # The thread may still be probing with the owner
+    deadline = time.time() + 5
+    while owner() is not None and time.time() < deadline:
+      gc.collect()
+      time.sleep(0.01)
+    self.assertIsNone(owner())
+    selector._thread.join(5)
+    self.assertFalse(selector._thread.is_alive())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,92 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import requests
+
+
+class DeadlineExceededError(requests.Timeout):
+  """The overall deadline of the request is exceeded, including retries."""
+  pass
+
+
+class ErrorResponse(str):
+  """The error response of a failed request.
+
+  It's the content of the response as a string, so it can be printed and
+  checked with `isinstance(response, str)` like before, and it has the
+  details of the error as attributes.
+
+  Attributes:
+    status_code: The http status code.
+    reason: The http reason phrase, such as "Bad Gateway".
+    method: The http method of the request.
+    url: The url of the request.
+    content: The raw bytes of the response body.
+    json: The decoded json body, or None if it's not json.
+    message: The error message in the json body, or the body itself.
+    code: The error code in the json body, or None.
+    request_id: The request id in the response headers, or None.
+    retries: The number of retries before the error.
+  """
+
+  def __new__(cls,
+              status_code,
+              content,
+              reason=None,
+              method=None,
+              url=None,
+              headers=None):
+    content = content or b""
+    if isinstance(content, bytes) and str is not bytes:
+      text = content.decode("utf-8", "replace")
+    else:
+      text = content
+    self = str.__new__(cls, text)
+    self.status_code = status_code
+    self.reason = reason
+    self.method = method
+    self.url = url
+    self.content = content
+    self.retries = 0
+
+    try:
+      data = json.loads(text)
+    except ValueError:
+      data = None
+    self.json = data
+    if not isinstance(data, dict):
+      data = {}
+    self.message = data.get("message") or data.get("error") or text
+    self.code = data.get("code") or data.get("error_code")
+    headers = headers or {}
+    self.request_id = headers.get("X-Request-Id") or headers.get(
+        "X-Xiaomi-Request-Id")
+    return self
+
+  @classmethod
+  def from_response(cls, response):
+    """Create the ErrorResponse from the `requests.Response`."""
+    request = response.request
+    return cls(response.status_code,
+               response.content,
+               reason=response.reason,
+               method=request.method if request is not None else None,
+               url=response.url,
+               headers=response.headers)
+
+  def __repr__(self):
+    return "ErrorResponse(status_code={}, message={!r})".format(
+        self.status_code, self.message)
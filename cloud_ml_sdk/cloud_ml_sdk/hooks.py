@@ -0,0 +1,297 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The hooks to measure the requests of CloudMlClient.
+
+Example:
+
+  aggregator = LatencyAggregator()
+  client = CloudMlClient(hooks=[aggregator])
+  client.list_train_jobs()
+  aggregator.report()
+"""
+
+import collections
+import math
+import sys
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3 import connectionpool
+
+try:
+  from urllib.parse import urlparse
+except ImportError:
+  from urlparse import urlparse
+
+# The names of the path segments after the url of each resource type
+RESOURCE_NAMES = {
+    "/cloud_ml/v1/train": ["{job_name}"],
+    "/cloud_ml/v1/model": ["{model_name}", "{model_version}"],
+    "/cloud_ml/v1/dev": ["{dev_name}"],
+    "/cloud_ml/v1/tensorboard": ["{tensorboard_name}"],
+    "/cloud_ml/v1/quota": ["{org_id}"],
+    "/dev_server/v1/dev_servers": ["{dev_name}"]
+}
+
+# The phases of the requests summed by LatencyAggregator
+PHASES = ("connect", "server", "download", "decode", "wait")
+
+# The number of the recent latencies of each endpoint to get the percentiles
+LATENCY_WINDOW = 10000
+
+
+def endpoint_template(url):
+  """Get the endpoint template of the url to group the requests.
+
+  Example:
+    "http://host/cloud_ml/v1/train/linear/logs?org_id=1" has the template
+    "/cloud_ml/v1/train/{job_name}/logs".
+
+  Args:
+    url: The url of the request.
+
+  Returns:
+    The path of the url with the resource names replaced by placeholders.
+  """
+  path = urlparse(url).path.rstrip("/")
+  for base_path, names in RESOURCE_NAMES.items():
+    if path.startswith(base_path + "/"):
+      segments = path[len(base_path) + 1:].split("/")
+      count = min(len(names), len(segments))
+      return "/".join([base_path] + names[:count] + segments[count:])
+  return path
+
+
+class RequestEvent(object):
+  """The measurement of a request, which is passed to the hooks.
+
+  Attributes:
+    method: The http method, such as "GET".
+    url: The url of the request.
+    endpoint: The endpoint template, such as "/cloud_ml/v1/train/{job_name}".
+    status_code: The status code of the response, or None if it fails.
+    error: The exception raised by the request, or None.
+    request_bytes: The size of the request body.
+    response_bytes: The size of the response body.
+    retries: The number of retries of this request.
+    new_connection: Whether a new connection was established.
+    start_time: The timestamp when the request starts.
+    timings: The dictionary of seconds spent in each phase. "connect" is the
+             dns lookup, tcp and tls handshake of the new connections, "server"
+             is from sending the request to receiving the response headers
+             except connecting, "download" is receiving the response body,
+             "decode" is decoding the json, "wait" is waiting for the rate
+             limiter, and "total" is all of them.
+  """
+
+  def __init__(self, method, url):
+    self.method = method
+    self.url = url
+    self.endpoint = endpoint_template(url)
+    self.status_code = None
+    self.error = None
+    self.request_bytes = 0
+    self.response_bytes = 0
+    self.retries = 0
+    self.new_connection = False
+    self.start_time = time.time()
+    self.timings = {
+        "connect": 0.0,
+        "server": 0.0,
+        "download": 0.0,
+        "decode": 0.0,
+        "wait": 0.0,
+        "total": 0.0
+    }
+
+
+class RequestHook(object):
+  """The base class of the hooks called before and after each request."""
+
+  def before_request(self, event):
+    """Called before sending the request.
+
+    Args:
+      event: The `RequestEvent` with the method, url and endpoint.
+    """
+    pass
+
+  def after_request(self, event):
+    """Called after the response is decoded or the request fails.
+
+    Args:
+      event: The `RequestEvent` with all the measurements.
+    """
+    pass
+
+
+def percentile(sorted_values, percent):
+  """Get the nearest-rank percentile of the sorted values."""
+  if not sorted_values:
+    return 0.0
+  index = int(math.ceil(percent / 100.0 * len(sorted_values))) - 1
+  return sorted_values[max(0, min(index, len(sorted_values) - 1))]
+
+
+class LatencyAggregator(RequestHook):
+  """The hook to aggregate the latency percentiles of each endpoint.
+
+  The counters are kept for all requests, and the percentiles are of the
+  recent `window` requests of each endpoint, so the memory is bounded in the
+  long-running processes.
+  """
+
+  def __init__(self, window=LATENCY_WINDOW):
+    self._window = window
+    self._summaries = {}
+    self._lock = threading.Lock()
+
+  def after_request(self, event):
+    key = (event.method, event.endpoint)
+    with self._lock:
+      summary = self._summaries.get(key)
+      if summary is None:
+        summary = {
+            "method": event.method,
+            "endpoint": event.endpoint,
+            "count": 0,
+            "errors": 0,
+            "retries": 0,
+            "new_connections": 0,
+            "request_bytes": 0,
+            "response_bytes": 0,
+            "total": 0.0,
+            "latencies": collections.deque(maxlen=self._window)
+        }
+        for phase in PHASES:
+          summary[phase] = 0.0
+        self._summaries[key] = summary
+      summary["count"] += 1
+      if event.error or (event.status_code or 0) >= 400:
+        summary["errors"] += 1
+      summary["retries"] += event.retries
+      if event.new_connection:
+        summary["new_connections"] += 1
+      summary["request_bytes"] += event.request_bytes
+      summary["response_bytes"] += event.response_bytes
+      summary["total"] += event.timings["total"]
+      summary["latencies"].append(event.timings["total"])
+      for phase in PHASES:
+        summary[phase] += event.timings[phase]
+
+  def summary(self):
+    """Summarize the requests of each endpoint.
+
+    Returns:
+      The list of dictionaries with the method, endpoint, count, errors,
+      retries, bytes, the seconds of each phase, and the p50/p95/p99/max of
+      the recent total latencies, sorted by the sum of latency.
+    """
+    with self._lock:
+      groups = [(dict(summary), sorted(summary["latencies"]))
+                for summary in self._summaries.values()]
+    summaries = []
+    for summary, latencies in groups:
+      del summary["latencies"]
+      summary["p50"] = percentile(latencies, 50)
+      summary["p95"] = percentile(latencies, 95)
+      summary["p99"] = percentile(latencies, 99)
+      summary["max"] = latencies[-1]
+      summaries.append(summary)
+    summaries.sort(key=lambda summary: summary["total"], reverse=True)
+    return summaries
+
+  def report(self, output=None):
+    """Print the summary table, the latencies are in milliseconds.
+
+    Args:
+      output: The file to print to, which is stderr by default.
+    """
+    output = output or sys.stderr
+    output.write("{:7} {:48} {:>6} {:>6} {:>8} {:>8} {:>8} {:>8} {:>10} "
+                 "{:>10} {:>10} {:>10} {:>10}\n".format(
+                     "METHOD", "ENDPOINT", "COUNT", "ERRORS", "P50", "P95",
+                     "P99", "MAX", "CONNECT", "SERVER", "DOWNLOAD", "DECODE",
+                     "WAIT"))
+    for summary in self.summary():
+      output.write("{:7} {:48} {:>6} {:>6} {:>8.1f} {:>8.1f} {:>8.1f} "
+                   "{:>8.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} "
+                   "{:>10.1f}\n".format(
+                       summary["method"], summary["endpoint"],
+                       summary["count"], summary["errors"],
+                       summary["p50"] * 1000, summary["p95"] * 1000,
+                       summary["p99"] * 1000, summary["max"] * 1000,
+                       summary["connect"] * 1000, summary["server"] * 1000,
+                       summary["download"] * 1000, summary["decode"] * 1000,
+                       summary["wait"] * 1000))
+
+
+_connect_times = threading.local()
+
+
+def reset_connect_time():
+  """Reset the seconds spent in connecting of the current thread."""
+  _connect_times.seconds = 0.0
+  _connect_times.count = 0
+
+
+def get_connect_time():
+  """Get the seconds and the number of connections of the current thread."""
+  return (getattr(_connect_times, "seconds", 0.0),
+          getattr(_connect_times, "count", 0))
+
+
+def _add_connect_time(seconds):
+  _connect_times.seconds = getattr(_connect_times, "seconds", 0.0) + seconds
+  _connect_times.count = getattr(_connect_times, "count", 0) + 1
+
+
+class TimedHTTPConnection(connectionpool.HTTPConnection):
+
+  def connect(self):
+    start = time.time()
+    try:
+      connectionpool.HTTPConnection.connect(self)
+    finally:
+      _add_connect_time(time.time() - start)
+
+
+class TimedHTTPSConnection(connectionpool.HTTPSConnection):
+
+  def connect(self):
+    start = time.time()
+    try:
+      connectionpool.HTTPSConnection.connect(self)
+    finally:
+      _add_connect_time(time.time() - start)
+
+
+class TimedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+  ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+  ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+  """The adapter which measures the time to establish the connections."""
+
+  def init_poolmanager(self, *args, **kwargs):
+    HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+    self.poolmanager.pool_classes_by_scheme = {
+        "http": TimedHTTPConnectionPool,
+        "https": TimedHTTPSConnectionPool
+    }
@@ -0,0 +1,210 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import time
+import unittest
+
+import requests
+
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.errors import ErrorResponse
+from cloud_ml_sdk.hooks import (LatencyAggregator, RequestEvent, RequestHook,
+                                endpoint_template, percentile)
+from cloud_ml_sdk.retry import RetryPolicy
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+
+class JobHandler(StandInHandler):
+  """The handler which returns the job, or fails for the "broken" job."""
+
+  def handle_request(self, body):
+    if self.path.endswith("/broken"):
+      self.reply(500, {"message": "broken"})
+    else:
+      self.reply(200, {"job_name": "linear", "state": "running"})
+
+
+class RecordingHook(RequestHook):
+
+  def __init__(self):
+    self.calls = []
+
+  def before_request(self, event):
+    self.calls.append(("before", event.method, event.endpoint))
+
+  def after_request(self, event):
+    self.calls.append(("after", event))
+
+
+def request_event(method, url, total, status_code=200, error=None):
+  """Create the finished `RequestEvent` which took the seconds."""
+  event = RequestEvent(method, url)
+  event.status_code = status_code
+  event.error = error
+  event.timings["total"] = total
+  event.timings["server"] = total
+  return event
+
+
+class EndpointTemplateTest(unittest.TestCase):
+
+  def test_endpoint_template(self):
+    for url, expected in [
+        ("http://host/cloud_ml/v1/train", "/cloud_ml/v1/train"),
+        ("http://host/cloud_ml/v1/train/", "/cloud_ml/v1/train"),
+        ("http://host/cloud_ml/v1/train?org_id=1&limit=10",
+         "/cloud_ml/v1/train"),
+        ("http://host/cloud_ml/v1/train/linear",
+         "/cloud_ml/v1/train/{job_name}"),
+        ("http://host/cloud_ml/v1/train/linear/logs?offset=10",
+         "/cloud_ml/v1/train/{job_name}/logs"),
+        ("http://host/cloud_ml/v1/model/mnist/1",
+         "/cloud_ml/v1/model/{model_name}/{model_version}"),
+        ("http://host/cloud_ml/v1/model/mnist/1/events",
+         "/cloud_ml/v1/model/{model_name}/{model_version}/events"),
+        ("http://host/cloud_ml/v1/model/mnist",
+         "/cloud_ml/v1/model/{model_name}"),
+        ("http://host/cloud_ml/v1/quota/123", "/cloud_ml/v1/quota/{org_id}"),
+        ("http://host/dev_server/v1/dev_servers/gpu/metrics",
+         "/dev_server/v1/dev_servers/{dev_name}/metrics"),
+        ("http://host/cloud_ml/v1/trainer/x", "/cloud_ml/v1/trainer/x"),
+        ("http://host/cloud_ml/v1/framework", "/cloud_ml/v1/framework"),
+    ]:
+      self.assertEqual(expected, endpoint_template(url), url)
+
+
+class LatencyAggregatorTest(unittest.TestCase):
+
+  def test_percentile(self):
+    values = list(range(1, 101))
+    self.assertEqual(0.0, percentile([], 50))
+    self.assertEqual(1, percentile(values, 0))
+    self.assertEqual(1, percentile(values, 1))
+    self.assertEqual(50, percentile(values, 50))
+    self.assertEqual(95, percentile(values, 95))
+    self.assertEqual(99, percentile(values, 99))
+    self.assertEqual(100, percentile(values, 100))
+    self.assertEqual(3, percentile([3], 99))
+    # The nearest rank rounds up
+    self.assertEqual(2, percentile([1, 2, 3], 50))
+    self.assertEqual(3, percentile([1, 2, 3], 67))
+
+  def test_summary(self):
+    aggregator = LatencyAggregator()
+    for i in range(1, 101):
+      aggregator.after_request(request_event(
+          "GET", "http://host/cloud_ml/v1/train/job-{}".format(i), i / 1000.0))
+    aggregator.after_request(request_event(
+        "GET", "http://host/cloud_ml/v1/train/job-1", 1.0, status_code=404))
+    aggregator.after_request(request_event(
+        "DELETE", "http://host/cloud_ml/v1/train/job-1", 0.5, None,
+        requests.ConnectionError()))
+
+    describe, delete = aggregator.summary()
+    self.assertEqual(("GET", "/cloud_ml/v1/train/{job_name}", 101, 1),
+                     (describe["method"], describe["endpoint"],
+                      describe["count"], describe["errors"]))
+    self.assertEqual((0.051, 0.096, 0.1, 1.0),
+                     (describe["p50"], describe["p95"], describe["p99"],
+                      describe["max"]))
+    self.assertAlmostEqual(6.05, describe["total"])
+    self.assertAlmostEqual(6.05, describe["server"])
+    self.assertEqual(("DELETE", 1, 1, 0.5),
+                     (delete["method"], delete["count"], delete["errors"],
+                      delete["p99"]))
+
+  def test_window(self):
+    aggregator = LatencyAggregator(window=10)
+    for i in range(100):
+      aggregator.after_request(request_event(
+          "GET", "http://host/cloud_ml/v1/quota", 100 - i))
+    summary, = aggregator.summary()
+    # The counters are of all requests, and the percentiles are of the recent
+    self.assertEqual(100, summary["count"])
+    self.assertEqual(5050, summary["total"])
+    self.assertEqual((5, 10, 10, 10), (summary["p50"], summary["p95"],
+                                       summary["p99"], summary["max"]))
+
+  def test_report(self):
+    aggregator = LatencyAggregator()
+    aggregator.after_request(request_event(
+        "GET", "http://host/cloud_ml/v1/model/mnist/1", 0.25))
+    output = io.StringIO()
+    aggregator.report(output)
+    header, line = output.getvalue().splitlines()
+    self.assertEqual(["METHOD", "ENDPOINT", "COUNT", "ERRORS", "P50", "P95",
+                      "P99", "MAX", "CONNECT", "SERVER", "DOWNLOAD", "DECODE",
+                      "WAIT"], header.split())
+    self.assertEqual(["GET", "/cloud_ml/v1/model/{model_name}/{model_version}",
+                      "1", "0", "250.0", "250.0", "250.0", "250.0", "0.0",
+                      "250.0", "0.0", "0.0", "0.0"], line.split())
+
+
+class RequestHookTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(JobHandler)
+    self.addCleanup(self.server.stop)
+    self.hook = RecordingHook()
+    self.client = self.create_client(self.server.endpoint)
+
+  def create_client(self, endpoint):
+    client = CloudMlClient("ak", "sk", endpoint, hooks=[self.hook],
+                           retry_policy=RetryPolicy(max_retries=0))
+    self.addCleanup(client.close)
+    return client
+
+  def test_success(self):
+    self.client.describe_train_job("linear")
+    self.client.describe_train_job("linear")
+    self.assertEqual(4, len(self.hook.calls))
+    self.assertEqual(("before", "GET", "/cloud_ml/v1/train/{job_name}"),
+                     self.hook.calls[0])
+    (_, first), (_, second) = self.hook.calls[1::2]
+    self.assertEqual((200, None), (first.status_code, first.error))
+    self.assertGreater(first.response_bytes, 0)
+    self.assertGreater(first.timings["total"], 0)
+    # The connection is kept alive for the second request
+    self.assertTrue(first.new_connection)
+    self.assertFalse(second.new_connection)
+    self.assertEqual(0.0, second.timings["connect"])
+
+  def test_error_response(self):
+    self.assertIsInstance(self.client.describe_train_job("broken"), ErrorResponse)
+    (_, method, _), (_, event) = self.hook.calls
+    self.assertEqual("GET", method)
+    self.assertEqual((500, None), (event.status_code, event.error))
+
+  def test_connection_error(self):
+    # The port of the stopped server refuses the connection
+    server = start_server(JobHandler)
+    server.stop()
+    client = self.create_client(server.endpoint)
+    start = time.time()
+    self.assertRaises(requests.ConnectionError, client.describe_train_job,
+                      "linear")
+    (before, _, _), (after, event) = self.hook.calls
+    self.assertEqual(("before", "after"), (before, after))
+    self.assertIsInstance(event.error, requests.ConnectionError)
+    self.assertIsNone(event.status_code)
+    self.assertLessEqual(event.timings["total"], time.time() - start)
+
+    aggregator = LatencyAggregator()
+    aggregator.after_request(event)
+    self.assertEqual(1, aggregator.summary()[0]["errors"])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,257 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Decode the json response incrementally while it is downloaded."""
+
+import codecs
+import json
+import numbers
+import re
+
+WHITESPACE = " \t\n\r"
+
+# Compact the buffer when the decoded text is longer than this size
+COMPACT_SIZE = 64 * 1024
+
+# The characters which may continue the number at the end of the buffer
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+# The characters of a json string before the closing quote or an escape
+STRING_CHUNK = re.compile(r'[^"\\]*')
+
+# The escape sequence, or the surrogate pair of two escape sequences
+ESCAPE = re.compile(r"\\(?:u[dD][89abAB][0-9a-fA-F]{2}"
+                    r"\\u[dD][c-fC-F][0-9a-fA-F]{2}|"
+                    r'u[0-9a-fA-F]{4}|["\\/bfnrt])')
+MAX_ESCAPE_SIZE = 12
+ESCAPES = {
+    u'\\"': u'"',
+    u"\\\\": u"\\",
+    u"\\/": u"/",
+    u"\\b": u"\b",
+    u"\\f": u"\f",
+    u"\\n": u"\n",
+    u"\\r": u"\r",
+    u"\\t": u"\t"
+}
+
+
+class JsonReader(object):
+  """The reader to decode json values from the chunks of text or bytes."""
+
+  def __init__(self, chunks):
+    self._chunks = iter(chunks)
+    self._decoder = json.JSONDecoder()
+    self._utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    self._buffer = ""
+    self._pos = 0
+    self._eof = False
+
+  def _fill(self):
+    """Read the next chunk into the buffer.
+
+    Returns:
+      False if there are no more chunks.
+    """
+    if self._pos > COMPACT_SIZE:
+      self._buffer = self._buffer[self._pos:]
+      self._pos = 0
+    try:
+      chunk = next(self._chunks)
+    except StopIteration:
+      self._eof = True
+      self._buffer += self._utf8_decoder.decode(b"", final=True)
+      return False
+    if isinstance(chunk, bytes):
+      chunk = self._utf8_decoder.decode(chunk)
+    self._buffer += chunk
+    return True
+
+  def peek(self):
+    """Get the next non-whitespace character without consuming it."""
+    while True:
+      while self._pos < len(self._buffer):
+        if self._buffer[self._pos] not in WHITESPACE:
+          return self._buffer[self._pos]
+        self._pos += 1
+      if not self._fill():
+        raise ValueError("Unexpected end of json data")
+
+  def expect(self, characters):
+    """Consume the next non-whitespace character, which must be expected.
+
+    Returns:
+      The consumed character.
+    """
+    character = self.peek()
+    if character not in characters:
+      raise ValueError("Expecting one of {!r} at {!r}".format(
+          characters, self._buffer[self._pos:self._pos + 32]))
+    self._pos += 1
+    return character
+
+  def decode(self):
+    """Decode the next json value."""
+    self.peek()
+    while True:
+      try:
+        value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        # A number or literal may continue in the next chunk, like "1." of
+        # "1.5"
+        if self._eof or not (end == len(self._buffer) or (
+            isinstance(value, numbers.Number) and
+            NUMBER_TAIL.match(self._buffer, end))):
+          self._pos = end
+          return value
+      except ValueError:
+        if self._eof:
+          raise
+      self._fill()
+
+  def iter_keys(self):
+    """Decode the next json object, which must end the data.
+
+    The value of each key must be consumed by the caller before the next key.
+
+    Returns:
+      The generator of the keys of the object.
+    """
+    self.expect("{")
+    if self.peek() == "}":
+      self._pos += 1
+    else:
+      while True:
+        if self.peek() != '"':
+          raise ValueError("Expecting the key at {!r}".format(
+              self._buffer[self._pos:self._pos + 32]))
+        key = self.decode()
+        self.expect(":")
+        yield key
+        if self.expect(",}") == "}":
+          break
+    self.expect_end()
+
+  def expect_end(self):
+    """Check that there is only whitespace after the consumed data."""
+    while True:
+      if self._buffer[self._pos:].strip(WHITESPACE):
+        raise ValueError("Extra data at {!r}".format(
+            self._buffer[self._pos:self._pos + 32]))
+      self._pos = len(self._buffer)
+      if not self._fill():
+        return
+
+  def iter_string(self):
+    """Decode the next json string incrementally.
+
+    Returns:
+      The generator of the pieces of the string, one for each chunk.
+    """
+    self.expect('"')
+    while True:
+      pieces = []
+      finished = False
+      while True:
+        end = STRING_CHUNK.match(self._buffer, self._pos).end()
+        pieces.append(self._buffer[self._pos:end])
+        self._pos = end
+        if end == len(self._buffer):
+          break
+        if self._buffer[end] == '"':
+          self._pos += 1
+          finished = True
+          break
+        # The escape sequence and its low surrogate may be in the next chunk
+        if len(self._buffer) - end < MAX_ESCAPE_SIZE and not self._eof:
+          break
+        match = ESCAPE.match(self._buffer, end)
+        if match is None:
+          raise ValueError("Invalid escape at {!r}".format(
+              self._buffer[end:end + MAX_ESCAPE_SIZE]))
+        escape = match.group()
+        pieces.append(ESCAPES.get(escape) or json.loads('"' + escape + '"'))
+        self._pos = match.end()
+
+      text = "".join(pieces)
+      if text:
+        yield text
+      if finished:
+        return
+      if not self._fill() and self._pos == len(self._buffer):
+        raise ValueError("Unterminated json string")
+
+
+def iter_json_array(chunks, key):
+  """Iterate the items of an array in the json object incrementally.
+
+  Example:
+    The chunks `['{"data": [{"a": ', '1}, {"a": 2}]}']` with key "data" yield
+    `{"a": 1}` and `{"a": 2}`.
+
+  Args:
+    chunks: The iterable of text or utf-8 bytes of the json object.
+    key: The key of the array in the json object.
+
+  Returns:
+    The generator of the items in the array. It yields nothing if the key
+    doesn't exist.
+
+  Raises:
+    ValueError: If the json data is truncated or invalid, after the items
+                before the error are yielded.
+  """
+  reader = JsonReader(chunks)
+  for name in reader.iter_keys():
+    if name != key:
+      reader.decode()
+      continue
+    reader.expect("[")
+    if reader.peek() == "]":
+      reader.expect("]")
+      continue
+    while True:
+      yield reader.decode()
+      if reader.expect(",]") == "]":
+        break
+
+
+def iter_json_string(chunks, key, values=None):
+  """Iterate the string in the json object incrementally.
+
+  Example:
+    The chunks `['{"logs": "a\\', 'nb"}']` with key "logs" yield `"a"`,
+    `"\\n"` and `"b"`.
+
+  Args:
+    chunks: The iterable of text or utf-8 bytes of the json object.
+    key: The key of the string in the json object.
+    values: The dictionary to store the other values of the object in, which
+            is complete after the generator is exhausted. It's optional.
+
+  Returns:
+    The generator of the pieces of the string. It yields nothing if the key
+    doesn't exist or the value is null.
+
+  Raises:
+    ValueError: If the json data is truncated or invalid, after the pieces
+                before the error are yielded.
+  """
+  reader = JsonReader(chunks)
+  for name in reader.iter_keys():
+    if name == key and reader.peek() == '"':
+      for piece in reader.iter_string():
+        yield piece
+    else:
+      value = reader.decode()
+      if values is not None:
+        values[name] = value
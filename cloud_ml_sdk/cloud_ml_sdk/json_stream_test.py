@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+from cloud_ml_sdk import json_stream
+from cloud_ml_sdk.json_stream import iter_json_array, iter_json_string
+
+ARRAYS = [
+    u'{"data": []}',
+    u'{"data": [ ] }',
+    u'{}',
+    u'{"total": 2}',
+    u'{"total": 2, "data": [1, -2.5e+3, 0.125, 1E2, -0, 10]}',
+    u'{"data": [true, false, null, "x"], "total": 4}',
+    u'{"meta": {"a": [1, {"b": "]}"}]}, "data": [[], {}, [[1], {"c": []}]]}',
+    u'{"data": [{"name": "a\\"b\\\\c\\/d\\b\\f\\n\\r\\t", "n": 123456}]}',
+    u'{"data": ["\\u00e9\\u7ebf", "\\ud83d\\ude00!", "线\U0001f600"]}',
+    u'\n{ "next_page_token" : "t" ,\t"data" :\r\n[ {"x" : 1} , {"x" : 2} ] }',
+]
+
+STRINGS = [
+    u'{"logs": ""}',
+    u'{"logs": null}',
+    u'{}',
+    u'{"state": "done", "logs": "line 1\\nline 2\\n"}',
+    u'{"logs": "a\\"b\\\\c\\/d\\b\\f\\r\\t", "offset": 12.5}',
+    u'{"logs": "\\u00e9\\u7ebf \\ud83d\\ude00 线\U0001f600 \\ud83d!"}',
+    u'{"offset": [1, {"a": "logs"}], "logs": "\\\\u0041 \\u0041"}',
+]
+
+
+def split_chunks(text):
+  """Get the chunks of the text split at each offset, as text and as the
+  utf-8 bytes, and the chunks of one character or byte."""
+  data = text.encode("utf-8")
+  for value in (text, data):
+    for i in range(len(value) + 1):
+      yield [value[:i], value[i:]]
+    yield [value[i:i + 1] for i in range(len(value))]
+
+
+class IterJsonArrayTest(unittest.TestCase):
+
+  def test_split_chunks(self):
+    for text in ARRAYS:
+      expected = json.loads(text).get("data", [])
+      for chunks in split_chunks(text):
+        self.assertEqual(expected, list(iter_json_array(chunks, "data")),
+                         chunks)
+
+  def test_numbers(self):
+    # The number is decoded after it ends, not at the end of the chunk
+    for chunks in [[u'{"data": [1.', u'5]}'], [u'{"data": [1', u'.5e', u'1]}'],
+                   [u'{"data": [2e', u'+', u'3, 4', u']}'],
+                   [u'{"data": [-', u'1, 1', u'0]}']]:
+      self.assertEqual(json.loads(u"".join(chunks))["data"],
+                       list(iter_json_array(chunks, "data")))
+
+  def test_lazy(self):
+
+    def chunks():
+      yield u'{"data": [{"a": 1}, '
+      raise AssertionError("The first item is read before the next chunk")
+
+    self.assertEqual({"a": 1}, next(iter_json_array(chunks(), "data")))
+
+  def test_truncated(self):
+    for text in [u'', u'{', u'{"data"', u'{"data": [', u'{"data": [1, 2',
+                 u'{"data": [1, {"a": ', u'{"data": ["abc', u'{"data": [tr',
+                 u'{"data": [1, 2]', u'{"data": [1.5e']:
+      for chunks in split_chunks(text):
+        items = iter_json_array(chunks, "data")
+        self.assertRaises(ValueError, list, items)
+
+  def test_truncated_items(self):
+    items = iter_json_array([u'{"data": [1, {"a": 2}, ', u'{"b"'], "data")
+    self.assertEqual([1, {"a": 2}], [next(items), next(items)])
+    self.assertRaises(ValueError, next, items)
+
+  def test_malformed(self):
+    for text in [u'[1, 2]', u'{"data": [1 2]}', u'{"data": [1,]}',
+                 u'{"data": {"a": 1}}', u'{"data" [1]}', u'{"data": [1]],',
+                 u'{"total": 1 "data": [1]}', u'{"data": [nul]}',
+                 u'{"data": ["\\x"]}', u'{"data": [01]}']:
+      for chunks in split_chunks(text):
+        self.assertRaises(ValueError, list, iter_json_array(chunks, "data"))
+
+
+class IterJsonStringTest(unittest.TestCase):
+
+  def test_split_chunks(self):
+    for text in STRINGS:
+      expected = json.loads(text).get("logs") or u""
+      for chunks in split_chunks(text):
+        pieces = list(iter_json_string(chunks, "logs"))
+        self.assertEqual(expected, u"".join(pieces), chunks)
+        self.assertNotIn(u"", pieces)
+
+  def test_lazy(self):
+
+    def chunks():
+      yield u'{"logs": "line 1\\nline 2'
+      raise AssertionError("The first piece is read before the next chunk")
+
+    # The escape near the end of the chunk waits for the next chunk
+    self.assertEqual(u"line 1", next(iter_json_string(chunks(), "logs")))
+
+  def test_values(self):
+    values = {}
+    chunks = [u'{"offset": 12, "logs": "a', u'\\nb", "state": {"a": [1]}}']
+    pieces = iter_json_string(chunks, "logs", values)
+    self.assertEqual(u"a", next(pieces))
+    self.assertEqual({"offset": 12}, values)
+    # The values after the string are decoded when the generator ends
+    self.assertEqual([u"\nb"], list(pieces))
+    self.assertEqual({"offset": 12, "state": {"a": [1]}}, values)
+
+  def test_large(self):
+    text = json.dumps({"logs": u"line 线\n" * 100000})
+    data = text.encode("utf-8")
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    self.assertEqual(json.loads(text)["logs"],
+                     u"".join(iter_json_string(chunks, "logs")))
+    self.assertGreater(len(data), json_stream.COMPACT_SIZE)
+
+  def test_truncated(self):
+    for text in [u'', u'{"logs": ', u'{"logs": "abc', u'{"logs": "a\\',
+                 u'{"logs": "\\u00', u'{"offset": 1']:
+      for chunks in split_chunks(text):
+        self.assertRaises(ValueError, list, iter_json_string(chunks, "logs"))
+
+  def test_malformed(self):
+    for text in [u'"logs"', u'{"logs": "\\x"}', u'{"logs": "\\u00zz"}',
+                 u'{"logs" "a"}', u'{"offset": 1 "logs": "a"}']:
+      for chunks in split_chunks(text):
+        self.assertRaises(ValueError, list, iter_json_string(chunks, "logs"))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,267 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Read the logs of the train jobs and model services incrementally."""
+
+import gzip
+import os
+import struct
+import time
+import zlib
+
+try:
+  from urllib.parse import urlencode
+except ImportError:
+  from urllib import urlencode
+
+# The states of the train jobs which don't write logs any more
+FINISHED_STATES = ("completed", "failed", "error", "terminated")
+
+# The seconds to wait between the polls of the logs
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 30.0
+
+# The size of the chunks to read when resuming the compressed file
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def logs_url(url, org_id=None, offset=None, line_offset=None):
+  """Construct the url of the log request.
+
+  Args:
+    url: The url of the logs, such as ".../train/{job_name}/logs".
+    org_id: The org_id to operate, which is optional.
+    offset: The number of bytes of the logs to skip.
+    line_offset: The number of lines of the logs to skip.
+
+  Returns:
+    The url with the parameters in its query string.
+  """
+  params = [("org_id", org_id), ("offset", offset),
+            ("line_offset", line_offset)]
+  params = [(key, value) for key, value in params if value]
+  if not params:
+    return url
+  return url + "?" + urlencode(params)
+
+
+def slice_logs(response, offset=None, line_offset=None):
+  """Apply the offsets to the log response.
+
+  The server which supports the offsets returns the new logs with the
+  "offset" and "line_offset" to request next time. Otherwise it returns the
+  whole logs, which are sliced here so that the results are the same.
+
+  Args:
+    response: The decoded json response with the "logs".
+    offset: The number of bytes of the logs to skip.
+    line_offset: The number of lines of the logs to skip.
+
+  Returns:
+    The response with the "logs" after the offset, and the "offset" and
+    "line_offset" of the end of the logs. The "line_offset" counts the
+    complete lines, so the last line without newline is returned again with
+    its rest next time.
+  """
+  if "offset" in response or "line_offset" in response:
+    return response
+
+  logs = response.get("logs") or u""
+  data = logs.encode("utf-8")
+  response = dict(response)
+  response["offset"] = len(data)
+  response["line_offset"] = logs.count(u"\n")
+  if offset:
+    response["logs"] = data[offset:].decode("utf-8", "replace")
+  elif line_offset:
+    response["logs"] = u"".join(logs.splitlines(True)[line_offset:])
+  return response
+
+
+def follow_logs(get_logs,
+                is_finished=None,
+                offset=0,
+                min_interval=MIN_POLL_INTERVAL,
+                max_interval=MAX_POLL_INTERVAL):
+  """Poll the logs and iterate the new lines.
+
+  The poll interval is reset to `min_interval` when there are new logs, and
+  doubled up to `max_interval` when there are not. The last line of the new
+  logs is held back until its newline arrives, or until the logs are
+  finished.
+
+  Args:
+    get_logs: The function to request the logs after the byte offset, which
+              returns the response of `slice_logs`.
+    is_finished: The function to check whether no more logs will be written,
+                 or None to follow forever.
+    offset: The number of bytes of the logs to skip.
+    min_interval: The min seconds to wait between the polls.
+    max_interval: The max seconds to wait between the polls.
+
+  Returns:
+    The generator of the new logs, which end with newlines except the last
+    ones.
+  """
+  interval = min_interval
+  idle = False
+  finished = False
+  # The received part of the line which doesn't end yet
+  partial = u""
+  while True:
+    # Check the state before polling so that the last logs are not missed
+    if idle and is_finished is not None:
+      finished = is_finished()
+    response = get_logs(offset)
+    if response["logs"]:
+      offset = response["offset"]
+      interval = min_interval
+      idle = False
+      logs = partial + response["logs"]
+      end = logs.rfind(u"\n") + 1
+      partial = logs[end:]
+      if end:
+        yield logs[:end]
+    elif finished:
+      if partial:
+        yield partial
+      return
+    else:
+      idle = True
+    time.sleep(interval)
+    if idle:
+      interval = min(interval * 2, max_interval)
+
+
+def _gzip_resume_point(fileobj):
+  """Find the end of the last complete gzip member in the file.
+
+  The file may end with a partial member if the download was interrupted,
+  which is decompressed to be checked but not counted.
+
+  Returns:
+    The tuple of the position after the complete members and their size
+    after decompression.
+  """
+  position = 0
+  size = 0
+  consumed = 0
+  member_size = 0
+  member_crc = 0
+  decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+  data = fileobj.read(READ_CHUNK_SIZE)
+  while data:
+    try:
+      output = decompressor.decompress(data)
+    except zlib.error:
+      return position, size
+    member_size += len(output)
+    member_crc = zlib.crc32(output, member_crc) & 0xffffffff
+    if decompressor.unused_data:
+      # The member ends in this chunk and the next member starts
+      consumed += len(data) - len(decompressor.unused_data)
+      position = consumed
+      size += member_size
+      member_size = 0
+      member_crc = 0
+      data = decompressor.unused_data
+      decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    else:
+      consumed += len(data)
+      data = fileobj.read(READ_CHUNK_SIZE)
+
+  # The last member is complete if the file ends with its crc and size
+  if consumed - position >= 8:
+    fileobj.seek(consumed - 8)
+    crc, isize = struct.unpack("<II", fileobj.read(8))
+    if crc == member_crc and isize == member_size & 0xffffffff:
+      position = consumed
+      size += member_size
+  return position, size
+
+
+def resume_offset(path, compress=False):
+  """Get the size of the logs in the partial file to resume downloading.
+
+  The partial gzip member at the end of the compressed file is truncated.
+
+  Args:
+    path: The path of the file.
+    compress: Whether the file is compressed with gzip.
+
+  Returns:
+    The number of bytes of the logs in the file, before compression.
+  """
+  if not os.path.exists(path):
+    return 0
+  if not compress:
+    return os.path.getsize(path)
+  with open(path, "r+b") as f:
+    position, size = _gzip_resume_point(f)
+    f.truncate(position)
+  return size
+
+
+def write_logs(pieces, path, compress=False, offset=0, is_sliced=None):
+  """Write the logs to the file while they are downloaded.
+
+  Args:
+    pieces: The iterable of the text of the logs.
+    path: The path of the file to write.
+    compress: Whether to compress the file with gzip.
+    offset: The number of bytes of the logs in the file to keep, which is
+            `resume_offset` of the file. The rest of the logs is appended,
+            as a new gzip member of the compressed file. 0 means to
+            overwrite the file.
+    is_sliced: The function called after the pieces are written, which
+               returns whether they are after the offset. Otherwise they are
+               the whole logs, which replace the file. None means they are
+               after the offset.
+
+  Returns:
+    The number of bytes of the logs in the file, before compression.
+  """
+  start = os.path.getsize(path) if offset else 0
+  mode = "ab" if offset else "wb"
+  size = 0
+  with open(path, mode) as f:
+    output = gzip.GzipFile(fileobj=f, mode=mode) if compress else f
+    try:
+      for piece in pieces:
+        data = piece.encode("utf-8")
+        if data:
+          output.write(data)
+          size += len(data)
+    finally:
+      if compress:
+        output.close()
+  if offset and is_sliced is not None and not is_sliced():
+    # The server ignored the offset and sent the whole logs
+    _remove_head(path, start)
+    return size
+  return offset + size
+
+
+def _remove_head(path, position):
+  """Remove the bytes of the file before the position, in place."""
+  with open(path, "r+b") as f:
+    size = 0
+    while True:
+      f.seek(position + size)
+      data = f.read(READ_CHUNK_SIZE)
+      if not data:
+        break
+      f.seek(size)
+      f.write(data)
+      size += len(data)
+    f.truncate(size)
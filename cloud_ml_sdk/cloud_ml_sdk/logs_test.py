@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from cloud_ml_sdk import logs
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.logs import (follow_logs, resume_offset, slice_logs,
+                               write_logs)
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+LOGS = u"".join(u"step {} 线\n".format(i) for i in range(5000))
+
+
+class FakeClock(object):
+  """The stand-in of the time module which records the sleeps."""
+
+  def __init__(self):
+    self.sleeps = []
+
+  def sleep(self, seconds):
+    self.sleeps.append(seconds)
+
+  def time(self):
+    return sum(self.sleeps)
+
+
+def use_fake_clock(test):
+  """Replace the time module of the logs module in the test."""
+  clock = FakeClock()
+  test.addCleanup(setattr, logs, "time", time)
+  logs.time = clock
+  return clock
+
+
+class GrowingLogs(object):
+  """The logs which grow by one part on each poll, and are finished after
+  all parts are written."""
+
+  def __init__(self, parts, server_slices=True):
+    self.parts = list(parts)
+    self.written = 0
+    self.server_slices = server_slices
+    self.offsets = []
+
+  @property
+  def text(self):
+    return u"".join(self.parts[:self.written])
+
+  def get_logs(self, offset):
+    self.offsets.append(offset)
+    if self.written < len(self.parts):
+      self.written += 1
+    data = self.text.encode("utf-8")
+    if self.server_slices:
+      return {"logs": data[offset:].decode("utf-8"), "offset": len(data)}
+    return slice_logs({"logs": self.text}, offset)
+
+  def is_finished(self):
+    return self.written == len(self.parts)
+
+
+class SliceLogsTest(unittest.TestCase):
+
+  def test_sliced_by_server(self):
+    response = {"logs": u"b\n", "offset": 4, "line_offset": 2}
+    self.assertIs(response, slice_logs(response, 2))
+
+  def test_offset(self):
+    response = slice_logs({"logs": u"a\n线\nc"}, 2)
+    self.assertEqual({"logs": u"线\nc", "offset": 7, "line_offset": 2},
+                     response)
+
+  def test_line_offset(self):
+    response = slice_logs({"logs": u"a\nb\nc"}, line_offset=1)
+    self.assertEqual(u"b\nc", response["logs"])
+    # The partial last line is not counted, so it's returned again
+    self.assertEqual(2, response["line_offset"])
+    self.assertEqual(u"c d\n", slice_logs({"logs": u"a\nb\nc d\n"},
+                                          line_offset=2)["logs"])
+
+  def test_no_logs(self):
+    self.assertEqual({"logs": None, "offset": 0, "line_offset": 0},
+                     slice_logs({"logs": None}))
+
+
+class FollowLogsTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = use_fake_clock(self)
+
+  def test_lines(self):
+    for server_slices in (True, False):
+      growing = GrowingLogs([u"epoch 1\nepo", u"ch 2", u"\n线", u"",
+                             u"\nlast"], server_slices)
+      pieces = list(follow_logs(growing.get_logs, growing.is_finished))
+      # The partial line is held back until its newline arrives
+      self.assertEqual([u"epoch 1\n", u"epoch 2\n", u"线\n", u"last"],
+                       pieces)
+      self.assertEqual(growing.text, u"".join(pieces))
+      self.assertEqual([0, 11, 15, 19, 19, 24, 24], growing.offsets)
+
+  def test_interval(self):
+    growing = GrowingLogs([u"a\n", u"", u"", u"", u"b\n", u"", u""])
+    pieces = list(follow_logs(growing.get_logs, growing.is_finished,
+                              min_interval=1, max_interval=4))
+    self.assertEqual([u"a\n", u"b\n"], pieces)
+    # Doubled when there are no new logs, and reset when there are
+    self.assertEqual([1, 1, 2, 4, 1, 1, 2], self.clock.sleeps)
+
+  def test_finished(self):
+    finished = []
+
+    def is_finished():
+      finished.append(True)
+      return True
+
+    growing = GrowingLogs([u"a\n", u"b"])
+    pieces = list(follow_logs(growing.get_logs, is_finished, offset=0))
+    # The logs written before the job is finished are polled once more
+    self.assertEqual([u"a\n", u"b"], pieces)
+    self.assertEqual(1, len(finished))
+    self.assertEqual([0, 2, 3, 3], growing.offsets)
+
+  def test_offset(self):
+    growing = GrowingLogs([u"abc\nd\n"])
+    self.assertEqual([u"d\n"], list(follow_logs(
+        growing.get_logs, growing.is_finished, offset=4)))
+
+
+def read_data(path, compress=False):
+  with (gzip.open if compress else open)(path, "rb") as f:
+    return f.read()
+
+
+def read_logs(path, compress=False):
+  return read_data(path, compress).decode("utf-8")
+
+
+class LogsFileTest(unittest.TestCase):
+  """The base of the tests which write the logs to a temporary file."""
+
+  def setUp(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    self.path = os.path.join(directory, "logs")
+
+  def write_partial(self, size, compress=False):
+    """Write the first bytes of `LOGS` like an interrupted download."""
+    data = LOGS.encode("utf-8")[:size]
+    with (gzip.open if compress else open)(self.path, "wb") as f:
+      f.write(data)
+
+
+class WriteLogsTest(LogsFileTest):
+
+  def test_write(self):
+    for compress in (False, True):
+      self.write_partial(100, compress)
+      size = write_logs([LOGS[:10], u"", LOGS[10:]], self.path, compress)
+      self.assertEqual(len(LOGS.encode("utf-8")), size)
+      self.assertEqual(LOGS, read_logs(self.path, compress))
+
+  def test_resume(self):
+    data = LOGS.encode("utf-8")
+    for compress in (False, True):
+      self.write_partial(1000, compress)
+      offset = resume_offset(self.path, compress)
+      self.assertEqual(1000, offset)
+      rest = data[offset:].decode("utf-8")
+      size = write_logs([rest[:7], rest[7:]], self.path, compress, offset,
+                        lambda: True)
+      self.assertEqual(len(data), size)
+      self.assertEqual(LOGS, read_logs(self.path, compress))
+
+  def test_resume_without_file(self):
+    self.assertEqual(0, resume_offset(self.path))
+    self.assertEqual(0, resume_offset(self.path, compress=True))
+
+  def test_resume_twice(self):
+    data = LOGS.encode("utf-8")
+    self.write_partial(100, compress=True)
+    for end in (5000, len(data)):
+      offset = resume_offset(self.path, compress=True)
+      write_logs([data[offset:end].decode("utf-8")], self.path, True, offset)
+    # Each resume appends a gzip member
+    self.assertEqual(len(data), resume_offset(self.path, compress=True))
+    self.assertEqual(LOGS, read_logs(self.path, compress=True))
+
+  def test_resume_truncated_gzip(self):
+    data = LOGS.encode("utf-8")
+    self.write_partial(1000, compress=True)
+    complete_size = os.path.getsize(self.path)
+    # The second member is cut in its compressed data and in its trailer
+    with gzip.open(self.path + ".tmp", "wb") as f:
+      f.write(data[1000:])
+    with open(self.path + ".tmp", "rb") as f:
+      member = f.read()
+    for cut in (len(member) // 2, len(member) - 4, 10):
+      with open(self.path, "r+b") as f:
+        f.seek(complete_size)
+        f.write(member[:cut])
+        f.truncate()
+      # The partial member is truncated
+      self.assertEqual(1000, resume_offset(self.path, compress=True))
+      self.assertEqual(complete_size, os.path.getsize(self.path))
+      self.assertEqual(data[:1000], read_data(self.path, compress=True))
+
+    write_logs([data[1000:].decode("utf-8")], self.path, True, 1000)
+    self.assertEqual(LOGS, read_logs(self.path, compress=True))
+
+  def test_resume_corrupted_gzip(self):
+    with open(self.path, "wb") as f:
+      f.write(b"not gzip")
+    self.assertEqual(0, resume_offset(self.path, compress=True))
+    self.assertEqual(0, os.path.getsize(self.path))
+
+  def test_offset_ignored(self):
+    # The server sends the whole logs, which replace the partial file
+    for compress in (False, True):
+      self.write_partial(1000, compress)
+      offset = resume_offset(self.path, compress)
+      size = write_logs([LOGS[:10], LOGS[10:]], self.path, compress, offset,
+                        lambda: False)
+      self.assertEqual(len(LOGS.encode("utf-8")), size)
+      self.assertEqual(LOGS, read_logs(self.path, compress))
+
+
+class LogsHandler(StandInHandler):
+  """The handler of the logs `LOGS`, which applies the offset if
+  `server.slices` is set."""
+
+  def handle_request(self, body):
+    self.server.requests.append(self.path)
+    data = LOGS.encode("utf-8")
+    if not self.server.slices:
+      self.reply(200, {"logs": LOGS})
+      return
+    offset = 0
+    if "offset=" in self.path:
+      offset = int(self.path.split("offset=")[1].split("&")[0])
+    self.reply(200, {"logs": data[offset:].decode("utf-8"),
+                     "offset": len(data)})
+
+
+class DownloadLogsTest(LogsFileTest):
+
+  def download(self, slices, resume, compress=False):
+    server = start_server(LogsHandler, slices=slices)
+    self.addCleanup(server.stop)
+    client = CloudMlClient("ak", "sk", server.endpoint)
+    self.addCleanup(client.close)
+    size = client.download_train_job_logs("linear", self.path, "1",
+                                          compress=compress, resume=resume)
+    self.assertEqual(len(LOGS.encode("utf-8")), size)
+    self.assertEqual(LOGS, read_logs(self.path, compress))
+    return server.requests
+
+  def test_download(self):
+    self.write_partial(1000)
+    self.assertEqual(["/cloud_ml/v1/train/linear/logs?org_id=1"],
+                     self.download(True, resume=False))
+
+  def test_download_resume(self):
+    for compress in (False, True):
+      for slices in (True, False):
+        self.write_partial(1000, compress)
+        # The offset is sent, and applied by the client if the server ignores
+        # it
+        self.assertEqual(
+            ["/cloud_ml/v1/train/linear/logs?org_id=1&offset=1000"],
+            self.download(slices, True, compress))
+
+
+if __name__ == "__main__":
+  unittest.main()
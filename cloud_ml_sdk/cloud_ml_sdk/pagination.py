@@ -0,0 +1,228 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The paging and filtering parameters of the list requests."""
+
+import datetime
+
+try:
+  from urllib.parse import urlencode
+except ImportError:
+  from urllib import urlencode
+
+# The number of items of each page when paging automatically
+DEFAULT_PAGE_SIZE = 100
+
+# The format of `create_time` in the responses
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ListQuery(object):
+  """The paging and filtering parameters of a list request.
+
+  The parameters are sent to the server. The filters are also applied to the
+  returned items, so that the results are the same if the server doesn't
+  support some of them. The offset of one list request is applied by the
+  client, because the items don't show whether the server applied it.
+  """
+
+  def __init__(self,
+               limit=None,
+               offset=None,
+               page_token=None,
+               state=None,
+               created_after=None,
+               name_prefix=None):
+    """Create a new ListQuery.
+
+    Args:
+      limit: The max number of items to return.
+      offset: The number of matched items to skip.
+      page_token: The `next_page_token` of the previous page.
+      state: Only return the items in this state, such as "running".
+      created_after: Only return the items created at or after this time,
+                     which is a `datetime` or a string like
+                     "2017-01-01 00:00:00".
+      name_prefix: Only return the items whose name starts with it.
+    """
+    self.limit = limit
+    self.offset = offset
+    self.page_token = page_token
+    self.state = state
+    if isinstance(created_after, datetime.datetime):
+      created_after = created_after.strftime(TIME_FORMAT)
+    self.created_after = created_after
+    self.name_prefix = name_prefix
+
+  @property
+  def is_paged(self):
+    return bool(self.offset or self.page_token)
+
+  def url(self, base_url, org_id=None, **overrides):
+    """Construct the url of the list request.
+
+    Args:
+      base_url: The url of the resource type.
+      org_id: The org_id whose resources to list, which is optional.
+      overrides: The parameters to override, such as the limit and offset of
+                 each page.
+
+    Returns:
+      The url with the parameters in its query string.
+    """
+    params = {
+        "limit": self.limit,
+        "offset": self.offset,
+        "page_token": self.page_token,
+        "state": self.state,
+        "created_after": self.created_after,
+        "name_prefix": self.name_prefix
+    }
+    params.update(overrides)
+    params = [(key, params[key]) for key in sorted(params) if params[key]]
+    if org_id:
+      params.insert(0, ("org_id", org_id))
+    if not params:
+      return base_url
+    return base_url + "?" + urlencode(params)
+
+  def list_url(self, base_url, org_id=None):
+    """Construct the url of the list request whose items are passed to
+    `filter`.
+
+    Instead of the offset, the server is asked for the first `offset + limit`
+    items, which `filter` skips the offset of.
+    """
+    limit = self.limit
+    if self.offset and limit is not None:
+      limit += self.offset
+    return self.url(base_url, org_id, limit=limit, offset=None)
+
+  def match(self, item, name_key):
+    """Check whether the item matches the filters of this query."""
+    if self.state and str(item.get("state", "")).lower() != \
+        self.state.lower():
+      return False
+    if self.created_after and item.get("create_time") and \
+        item["create_time"] < self.created_after:
+      return False
+    if self.name_prefix and not item.get(name_key, "").startswith(
+        self.name_prefix):
+      return False
+    return True
+
+  def filter(self, items, name_key):
+    """Apply this query to the list of items returned by the server.
+
+    Args:
+      items: The list of items in the response of `list_url`.
+      name_key: The key of the item name, such as "job_name".
+
+    Returns:
+      The list of matched items.
+    """
+    items = [item for item in items if self.match(item, name_key)]
+    if self.offset:
+      items = items[self.offset:]
+    if self.limit is not None:
+      items = items[:self.limit]
+    return items
+
+  def filter_stream(self, items, name_key):
+    """Apply the filters and limit of this query to the iterable of items.
+
+    Returns:
+      The generator of matched items.
+    """
+    if self.limit is not None and self.limit <= 0:
+      return
+    count = 0
+    for item in items:
+      if self.match(item, name_key):
+        yield item
+        count += 1
+        # The items after the limit are not read
+        if self.limit is not None and count >= self.limit:
+          return
+
+  def iter_pages(self, get_page, base_url, org_id, name_key, page_size=None):
+    """Request the list page by page and iterate the matched items.
+
+    The next page is requested with the `next_page_token` of the response if
+    it exists, otherwise with the offset of the items received. It stops if
+    the page is not full or starts with the same item as the previous page,
+    which the server returns if it doesn't support the offset.
+
+    Args:
+      get_page: The function to request the url and return the decoded json
+                response. The first page is requested before returning.
+      base_url: The url of the resource type.
+      org_id: The org_id whose resources to list, which is optional.
+      name_key: The key of the item name, such as "job_name".
+      page_size: The number of items of each page, `DEFAULT_PAGE_SIZE` by
+                 default.
+
+    Returns:
+      The generator of matched items.
+    """
+    page_size = page_size or DEFAULT_PAGE_SIZE
+
+    def page_limit(count):
+      if self.limit is None:
+        return page_size
+      return min(page_size, self.limit - count)
+
+    offset = self.offset or 0
+    page = get_page(self.url(base_url, org_id, limit=page_limit(0)))
+
+    def generate(page, offset):
+      count = 0
+      previous_first = None
+      by_token = bool(self.page_token)
+      while True:
+        size = page_limit(count)
+        items = page.get("data") or []
+        if len(items) > size:
+          # The server doesn't support paging and returns the whole list
+          items = [item for item in items if self.match(item, name_key)]
+          items = items[offset:]
+          if self.limit is not None:
+            items = items[:self.limit - count]
+          for item in items:
+            yield item
+          return
+        if items and items[0] == previous_first:
+          # The server doesn't support the offset and returns the same page
+          return
+        previous_first = items[0] if items else None
+
+        for item in items:
+          if self.match(item, name_key):
+            count += 1
+            yield item
+            if self.limit is not None and count >= self.limit:
+              return
+
+        page_token = page.get("next_page_token")
+        if page_token:
+          by_token = True
+        elif by_token or len(items) < size:
+          # The last page has no `next_page_token` or is not full
+          return
+        else:
+          offset += len(items)
+        page = get_page(self.url(base_url, org_id, limit=page_limit(count),
+                                 offset=None if page_token else offset,
+                                 page_token=page_token))
+
+    return generate(page, offset)
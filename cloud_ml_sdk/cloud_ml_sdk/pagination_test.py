@@ -0,0 +1,207 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import unittest
+
+try:
+  from urllib.parse import parse_qsl, urlparse
+except ImportError:
+  from urlparse import parse_qsl, urlparse
+
+from cloud_ml_sdk.pagination import ListQuery
+
+BASE_URL = "http://cloud-ml/train"
+
+# The jobs of the list, created in order and alternately running
+JOBS = [{
+    "job_name": "job-{}".format(i),
+    "state": "running" if i % 2 == 0 else "completed",
+    "create_time": "2017-01-{:02d} 00:00:00".format(i + 1)
+} for i in range(20)]
+
+
+def query_params(url):
+  """Get the dictionary of the query parameters of the url."""
+  return dict(parse_qsl(urlparse(url).query))
+
+
+class FakeServer(object):
+  """The list pages of `JOBS` filtered by the state, which ignores the paging
+  parameters that are not supported."""
+
+  def __init__(self, limit=True, offset=True, page_token=False):
+    self.supports_limit = limit
+    self.supports_offset = offset
+    self.supports_page_token = page_token
+    self.urls = []
+
+  def get_page(self, url):
+    self.urls.append(url)
+    params = query_params(url)
+    start = 0
+    if self.supports_offset:
+      start = int(params.get("offset", 0))
+    if self.supports_page_token and "page_token" in params:
+      start = int(params["page_token"])
+    jobs = [job for job in JOBS
+            if params.get("state") in (None, job["state"])]
+    end = len(jobs)
+    if self.supports_limit and "limit" in params:
+      end = min(end, start + int(params["limit"]))
+    page = {"data": jobs[start:end]}
+    if self.supports_page_token and end < len(jobs):
+      page["next_page_token"] = str(end)
+    return page
+
+
+def names(items):
+  return [item["job_name"] for item in items]
+
+
+class ListQueryTest(unittest.TestCase):
+
+  def test_url(self):
+    self.assertEqual(BASE_URL, ListQuery().url(BASE_URL))
+    query = ListQuery(limit=10, offset=20, state="running",
+                      created_after=datetime.datetime(2017, 1, 2, 3, 4, 5),
+                      name_prefix="job")
+    url = query.url(BASE_URL, "org")
+    self.assertTrue(url.startswith(BASE_URL + "?org_id=org&"))
+    self.assertEqual({
+        "org_id": "org",
+        "limit": "10",
+        "offset": "20",
+        "state": "running",
+        "created_after": "2017-01-02 03:04:05",
+        "name_prefix": "job"
+    }, query_params(url))
+    self.assertEqual({"org_id": "org", "limit": "5", "page_token": "t",
+                      "state": "running",
+                      "created_after": "2017-01-02 03:04:05",
+                      "name_prefix": "job"},
+                     query_params(query.url(BASE_URL, "org", limit=5,
+                                            offset=None, page_token="t")))
+
+  def test_list_url(self):
+    # The offset is skipped by the client
+    self.assertEqual({"limit": "30"}, query_params(
+        ListQuery(limit=10, offset=20).list_url(BASE_URL)))
+    self.assertEqual({}, query_params(ListQuery(offset=20).list_url(BASE_URL)))
+    self.assertEqual({"limit": "10"}, query_params(
+        ListQuery(limit=10).list_url(BASE_URL)))
+
+  def test_match(self):
+    job = {"job_name": "linear-1", "state": "Running",
+           "create_time": "2017-01-02 00:00:00"}
+    self.assertTrue(ListQuery().match(job, "job_name"))
+    self.assertTrue(ListQuery(state="running").match(job, "job_name"))
+    self.assertFalse(ListQuery(state="completed").match(job, "job_name"))
+    self.assertTrue(ListQuery(created_after="2017-01-02 00:00:00").match(
+        job, "job_name"))
+    self.assertFalse(ListQuery(
+        created_after=datetime.datetime(2017, 1, 2, 0, 0, 1)).match(
+            job, "job_name"))
+    self.assertTrue(ListQuery(name_prefix="linear").match(job, "job_name"))
+    self.assertFalse(ListQuery(name_prefix="dnn").match(job, "job_name"))
+    self.assertFalse(ListQuery(name_prefix="linear").match(job, "model_name"))
+    # The items without the time are not filtered by it
+    self.assertTrue(ListQuery(created_after="2018-01-01 00:00:00").match(
+        {"job_name": "linear"}, "job_name"))
+
+  def test_filter(self):
+    for server in [FakeServer(), FakeServer(limit=False, offset=False)]:
+      for query, expected in [
+          (ListQuery(), JOBS),
+          (ListQuery(limit=3), JOBS[:3]),
+          (ListQuery(offset=18), JOBS[18:]),
+          (ListQuery(limit=3, offset=4), JOBS[4:7]),
+          (ListQuery(limit=3, offset=4, state="running"),
+           JOBS[8:14:2]),
+      ]:
+        page = server.get_page(query.list_url(BASE_URL))
+        self.assertEqual(
+            names(expected), names(query.filter(page["data"], "job_name")))
+
+  def test_filter_stream(self):
+    fetched = []
+
+    def items():
+      for job in JOBS:
+        fetched.append(job)
+        yield job
+
+    query = ListQuery(limit=3, state="completed")
+    self.assertEqual(["job-1", "job-3", "job-5"],
+                     names(query.filter_stream(items(), "job_name")))
+    # The items after the limit are not read
+    self.assertEqual(JOBS[:6], fetched)
+    self.assertEqual([], list(ListQuery(limit=0).filter_stream(
+        items(), "job_name")))
+
+  def test_iter_pages(self):
+    for server in [FakeServer(), FakeServer(page_token=True)]:
+      query = ListQuery()
+      self.assertEqual(names(JOBS), names(query.iter_pages(
+          server.get_page, BASE_URL, None, "job_name", page_size=6)))
+      self.assertEqual(4, len(server.urls))
+
+    server = FakeServer()
+    query = ListQuery(limit=5, offset=3, state="running")
+    self.assertEqual(["job-6", "job-8", "job-10", "job-12", "job-14"],
+                     names(query.iter_pages(
+                         server.get_page, BASE_URL, None, "job_name",
+                         page_size=4)))
+    self.assertEqual([("4", "3"), ("1", "7")],
+                     [(query_params(url)["limit"], query_params(url)["offset"])
+                      for url in server.urls])
+
+  def test_iter_pages_lazy(self):
+    server = FakeServer()
+    items = ListQuery().iter_pages(
+        server.get_page, BASE_URL, None, "job_name", page_size=5)
+    # The first page is requested before iterating
+    self.assertEqual(1, len(server.urls))
+    self.assertEqual(names(JOBS[:5]), [next(items)["job_name"]
+                                       for _ in range(5)])
+    self.assertEqual(1, len(server.urls))
+
+  def test_iter_pages_without_paging(self):
+    server = FakeServer(limit=False, offset=False)
+    query = ListQuery(limit=3, offset=2, state="running")
+    self.assertEqual(["job-4", "job-6", "job-8"], names(query.iter_pages(
+        server.get_page, BASE_URL, None, "job_name", page_size=5)))
+    self.assertEqual(1, len(server.urls))
+
+  def test_iter_pages_without_offset(self):
+    # The server honours the limit but returns the first page again
+    server = FakeServer(offset=False)
+    self.assertEqual(names(JOBS[:5]), names(ListQuery().iter_pages(
+        server.get_page, BASE_URL, None, "job_name", page_size=5)))
+    self.assertEqual(2, len(server.urls))
+
+    server = FakeServer(offset=False)
+    self.assertEqual(names(JOBS[:5]), names(ListQuery(limit=8).iter_pages(
+        server.get_page, BASE_URL, None, "job_name", page_size=5)))
+    self.assertEqual(2, len(server.urls))
+
+  def test_iter_pages_short_page(self):
+    server = FakeServer()
+    self.assertEqual(names(JOBS[15:]), names(ListQuery(offset=15).iter_pages(
+        server.get_page, BASE_URL, None, "job_name", page_size=10)))
+    self.assertEqual(1, len(server.urls))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,290 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Merge the concurrent predictions of the threads into batches.
+
+The online services predict one example in each thread, and each prediction
+used to be a gRPC request. The batcher queues the examples, concatenates
+those with the same inputs along axis 0, sends one request for the batch,
+and splits the outputs back to the callers.
+
+  batcher = PredictBatcher("127.0.0.1:9000", "cancer", max_batch_size=64)
+  outputs = batcher.predict({"X": np.array([[10.0]], dtype=np.float32)})
+"""
+
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+# The number of the recent queueing latencies to get the percentiles
+LATENCY_WINDOW = 10000
+
+
+def percentile(sorted_values, percent):
+  """Get the nearest-rank percentile of the sorted values, like
+  `cloud_ml_sdk.hooks` without importing the http client."""
+  if not sorted_values:
+    return 0.0
+  index = int(math.ceil(percent / 100.0 * len(sorted_values))) - 1
+  return sorted_values[max(0, min(index, len(sorted_values) - 1))]
+
+
+class _Pending(object):
+  """The queued prediction of a caller, which waits for its outputs."""
+
+  def __init__(self, inputs, key, rows):
+    self.inputs = inputs
+    self.key = key
+    self.rows = rows
+    self.enqueued = time.time()
+    self.outputs = None
+    self.error = None
+    self.done = threading.Event()
+
+
+class PredictBatcher(object):
+  """The batcher of the predictions of the threads for one model."""
+
+  def __init__(self,
+               server,
+               model,
+               max_batch_size=32,
+               max_wait_ms=5,
+               output_filter=None,
+               timeout=10.0,
+               num_threads=2,
+               pool=None,
+               predict_arrays=None):
+    """Create a new PredictBatcher and start its threads.
+
+    Args:
+      server: The address of server. Example: "localhost:9000".
+      model: The name of the model.
+      max_batch_size: The max number of rows of a batch. The prediction
+                      with more rows is sent alone.
+      max_wait_ms: The max milliseconds for the first prediction of a batch
+                   to wait for the others.
+      output_filter: The list of the output names to return, which is
+                     optional.
+      timeout: The timeout of the gRPC request of each batch.
+      num_threads: The number of threads to send the batches, so the next
+                   batch is queued while the others are sent.
+      pool: The `channel_pool.ChannelPool` to reuse the channel of the
+            server, which is the pool of this process by default.
+      predict_arrays: The function to predict the batch like
+                      `generic_predict_client.predict_arrays`, which is
+                      optional.
+    """
+    if predict_arrays is None:
+      try:
+        from . import generic_predict_client
+      except (ImportError, ValueError):
+        import generic_predict_client
+      predict_arrays = generic_predict_client.predict_arrays
+    self._server = server
+    self._model = model
+    self._max_batch_size = max_batch_size
+    self._max_wait = max_wait_ms / 1000.0
+    self._output_filter = output_filter
+    self._timeout = timeout
+    self._pool = pool
+    self._predict_arrays = predict_arrays
+
+    self._condition = threading.Condition()
+    self._queue = collections.deque()
+    self._closed = False
+    self._requests = 0
+    self._batches = 0
+    self._errors = 0
+    self._batch_sizes = collections.Counter()
+    self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    self._threads = []
+    for _ in range(num_threads):
+      thread = threading.Thread(target=self._run)
+      thread.daemon = True
+      thread.start()
+      self._threads.append(thread)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def predict(self, inputs, timeout=None):
+    """Predict the examples in the next batch.
+
+    Args:
+      inputs: The dictionary of the input names and `numpy.ndarray`s, whose
+              axis 0 is the examples, usually one.
+      timeout: The seconds to wait for the outputs, which is the queueing
+               and request timeout by default.
+
+    Returns:
+      The dictionary of the output names and `numpy.ndarray`s of the
+      examples.
+
+    Raises:
+      ValueError: If the inputs have different numbers of examples.
+      RuntimeError: If the batcher is closed or the outputs time out.
+      Exception: The error of predicting the batch.
+    """
+    inputs = dict((name, np.asarray(array)) for name, array in inputs.items())
+    rows = set(array.shape[0] if array.ndim else None
+               for array in inputs.values())
+    if len(rows) != 1 or None in rows:
+      raise ValueError("The inputs should have the same examples in axis 0")
+    # The batch has the inputs of the same names, dtypes and example shapes
+    key = tuple(sorted((name, array.dtype.str, array.shape[1:])
+                       for name, array in inputs.items()))
+    pending = _Pending(inputs, key, rows.pop())
+    with self._condition:
+      if self._closed:
+        raise RuntimeError("The batcher is closed")
+      self._queue.append(pending)
+      self._requests += 1
+      self._condition.notify_all()
+
+    if timeout is None:
+      timeout = self._max_wait + self._timeout
+    if not pending.done.wait(timeout):
+      with self._condition:
+        # The queued prediction is not sent for nobody to wait for it
+        if pending in self._queue:
+          self._queue.remove(pending)
+          self._condition.notify_all()
+      raise RuntimeError("The prediction timed out in {}s".format(timeout))
+    if pending.error is not None:
+      raise pending.error
+    return pending.outputs
+
+  def close(self):
+    """Send the queued predictions and stop the threads."""
+    with self._condition:
+      self._closed = True
+      self._condition.notify_all()
+    for thread in self._threads:
+      thread.join()
+
+  def stats(self):
+    """Get the metrics of the batches.
+
+    Returns:
+      The dictionary of the number of predictions, batches and failed
+      batches, the number of batches of each size, and the percentiles of
+      the recent queueing milliseconds.
+    """
+    with self._condition:
+      latencies = sorted(self._latencies)
+      return {
+          "requests": self._requests,
+          "batches": self._batches,
+          "errors": self._errors,
+          "batch_sizes": dict(self._batch_sizes),
+          "queue_ms": {
+              "p50": percentile(latencies, 50),
+              "p95": percentile(latencies, 95),
+              "p99": percentile(latencies, 99),
+              "max": latencies[-1] if latencies else 0.0
+          }
+      }
+
+  def _run(self):
+    while True:
+      batch = self._next_batch()
+      if batch is None:
+        return
+      self._send(batch)
+
+  def _queued_rows(self, key):
+    return sum(pending.rows for pending in self._queue if pending.key == key)
+
+  def _next_batch(self):
+    """Wait for the batch of the oldest prediction to fill or time out.
+
+    Returns:
+      The list of the predictions of the batch, or None if the batcher is
+      closed.
+    """
+    with self._condition:
+      while not self._queue:
+        if self._closed:
+          return None
+        self._condition.wait()
+      first = self._queue[0]
+      deadline = first.enqueued + self._max_wait
+      while not self._closed and \
+          self._queued_rows(first.key) < self._max_batch_size:
+        remaining = deadline - time.time()
+        if remaining <= 0 or first not in self._queue:
+          break
+        self._condition.wait(remaining)
+      if first not in self._queue:
+        # Another thread sent the batch while waiting
+        return []
+
+      batch = []
+      rows = 0
+      for pending in list(self._queue):
+        if pending.key != first.key:
+          continue
+        if batch and rows + pending.rows > self._max_batch_size:
+          break
+        self._queue.remove(pending)
+        batch.append(pending)
+        rows += pending.rows
+
+      now = time.time()
+      self._batches += 1
+      self._batch_sizes[rows] += 1
+      self._latencies.extend((now - pending.enqueued) * 1000
+                             for pending in batch)
+      return batch
+
+  def _send(self, batch):
+    """Send the batch and split the outputs to its predictions."""
+    if not batch:
+      return
+    try:
+      if len(batch) == 1:
+        inputs = batch[0].inputs
+      else:
+        inputs = dict((name, np.concatenate(
+            [pending.inputs[name] for pending in batch]))
+                      for name in batch[0].inputs)
+      outputs = self._predict_arrays(self._server, self._model, inputs,
+                                     output_filter=self._output_filter,
+                                     timeout=self._timeout, pool=self._pool)
+      rows = sum(pending.rows for pending in batch)
+      for name, array in outputs.items():
+        if array.ndim == 0 or array.shape[0] != rows:
+          raise ValueError(
+              "The output {} has no axis of the {} examples".format(name,
+                                                                    rows))
+      start = 0
+      for pending in batch:
+        end = start + pending.rows
+        pending.outputs = dict((name, array[start:end])
+                               for name, array in outputs.items())
+        start = end
+    except Exception as e:
+      with self._condition:
+        self._errors += 1
+      for pending in batch:
+        pending.error = e
+    for pending in batch:
+      pending.done.set()
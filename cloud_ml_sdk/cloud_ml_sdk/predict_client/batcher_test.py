@@ -0,0 +1,181 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+try:
+  import numpy as np
+  from cloud_ml_sdk.predict_client.batcher import PredictBatcher
+except ImportError:
+  np = None
+
+try:
+  from cloud_ml_sdk.predict_client import stand_in_service
+  from cloud_ml_sdk.predict_client.channel_pool import ChannelPool
+except ImportError:
+  stand_in_service = None
+
+
+class StandInModel(object):
+  """The model which doubles the inputs, and records the batch sizes."""
+
+  def __init__(self, delay=0.01):
+    self.delay = delay
+    self.batches = []
+    self.lock = threading.Lock()
+
+  def __call__(self, server, model, inputs, output_filter=None, timeout=None,
+               pool=None):
+    time.sleep(self.delay)
+    with self.lock:
+      self.batches.append(len(inputs["x"]))
+    if (inputs["x"] < 0).any():
+      raise ValueError("negative input")
+    outputs = {"y": inputs["x"] * 2, "ids": inputs["id"]}
+    if output_filter:
+      outputs = dict((name, outputs[name]) for name in output_filter)
+    return outputs
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class PredictBatcherTest(unittest.TestCase):
+
+  def predict_in_threads(self, batcher, count):
+    results = [None] * count
+
+    def predict(i):
+      results[i] = batcher.predict({
+          "x": np.array([[i, i]], dtype=np.float32),
+          "id": np.array([i], dtype=np.int64)
+      })
+
+    threads = [threading.Thread(target=predict, args=(i,))
+               for i in range(count)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    return results
+
+  def test_batch(self):
+    model = StandInModel()
+    with PredictBatcher("127.0.0.1:9000", "fake", max_batch_size=8,
+                        max_wait_ms=50, predict_arrays=model) as batcher:
+      results = self.predict_in_threads(batcher, 32)
+      stats = batcher.stats()
+
+    for i, result in enumerate(results):
+      self.assertEqual([[2 * i, 2 * i]], result["y"].tolist())
+      self.assertEqual([i], result["ids"].tolist())
+    self.assertEqual(32, sum(model.batches))
+    self.assertLessEqual(max(model.batches), 8)
+    self.assertLess(len(model.batches), 32)
+    self.assertEqual(32, stats["requests"])
+    self.assertEqual(len(model.batches), stats["batches"])
+    self.assertEqual(32, sum(size * count
+                             for size, count in stats["batch_sizes"].items()))
+    self.assertLessEqual(stats["queue_ms"]["p50"], stats["queue_ms"]["max"])
+
+  def test_max_wait(self):
+    model = StandInModel(delay=0)
+    with PredictBatcher("127.0.0.1:9000", "fake", max_batch_size=8,
+                        max_wait_ms=20, predict_arrays=model) as batcher:
+      start = time.time()
+      result = batcher.predict({"x": np.ones((1, 2)), "id": np.zeros(1)})
+      self.assertLess(time.time() - start, 1)
+    self.assertEqual([[2, 2]], result["y"].tolist())
+    self.assertEqual([1], model.batches)
+
+  def test_output_filter(self):
+    with PredictBatcher("127.0.0.1:9000", "fake", output_filter=["y"],
+                        predict_arrays=StandInModel()) as batcher:
+      result = batcher.predict({"x": np.ones((2, 2)), "id": np.zeros(2)})
+    self.assertEqual(["y"], list(result))
+    self.assertEqual((2, 2), result["y"].shape)
+
+  def test_error(self):
+    with PredictBatcher("127.0.0.1:9000", "fake",
+                        predict_arrays=StandInModel()) as batcher:
+      self.assertRaises(ValueError, batcher.predict, {
+          "x": -np.ones((1, 2)),
+          "id": np.zeros(1)
+      })
+      self.assertRaises(ValueError, batcher.predict, {
+          "x": np.ones((1, 2)),
+          "id": np.zeros(2)
+      })
+      self.assertEqual(1, batcher.stats()["errors"])
+    self.assertRaises(RuntimeError, batcher.predict,
+                      {"x": np.ones((1, 2)), "id": np.zeros(1)})
+
+  def test_timeout(self):
+    model = StandInModel(delay=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict_arrays(*args, **kwargs):
+      started.set()
+      release.wait(5)
+      return model(*args, **kwargs)
+
+    with PredictBatcher("127.0.0.1:9000", "fake", max_wait_ms=1,
+                        num_threads=1,
+                        predict_arrays=predict_arrays) as batcher:
+      thread = threading.Thread(target=batcher.predict, args=({
+          "x": np.ones((1, 2)),
+          "id": np.zeros(1)
+      },))
+      thread.start()
+      self.assertTrue(started.wait(5))
+      # The only thread is busy, so the prediction times out in the queue
+      self.assertRaises(RuntimeError, batcher.predict, {
+          "x": np.ones((2, 2)),
+          "id": np.zeros(2)
+      }, timeout=0.05)
+      release.set()
+      thread.join()
+    # The timed out prediction is not sent
+    self.assertEqual([1], model.batches)
+    self.assertEqual(1, batcher.stats()["batches"])
+
+  @unittest.skipIf(stand_in_service is None, "grpcio is not installed")
+  def test_prediction_service(self):
+    # The batches are encoded, sent, decoded and split by predict_arrays
+    servicer = stand_in_service.EchoPredictionService()
+    server, address = stand_in_service.start_server(servicer)
+    self.addCleanup(server.stop, None)
+    pool = ChannelPool()
+    self.addCleanup(pool.close)
+    with PredictBatcher(address, "echo", max_batch_size=8, max_wait_ms=50,
+                        output_filter=["x"], pool=pool) as batcher:
+      results = self.predict_in_threads(batcher, 16)
+
+    for i, result in enumerate(results):
+      self.assertEqual(["x"], list(result))
+      self.assertEqual(np.float32, result["x"].dtype)
+      self.assertEqual([[i, i]], result["x"].tolist())
+    batches = [request.inputs["x"].tensor_shape.dim[0].size
+               for request in servicer.requests]
+    self.assertEqual(16, sum(batches))
+    self.assertLessEqual(max(batches), 8)
+    for request in servicer.requests:
+      self.assertEqual("echo", request.model_spec.name)
+      self.assertEqual(["x"], list(request.output_filter))
+      self.assertEqual(["id", "x"], sorted(request.inputs))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,174 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Keep the gRPC channels and PredictionService stubs of the servers.
+
+Each prediction used to create a new channel and connect to the server. The
+pool keeps one channel for each "host:port", which is shared by the threads
+and keeps its HTTP/2 connection, and drops the channels which are not used
+for a while.
+"""
+
+import threading
+import time
+
+import grpc
+
+# The seconds to keep the unused channel
+DEFAULT_IDLE_TIMEOUT = 300
+
+_lock = threading.Lock()
+_pool = None
+
+
+def create_prediction_stub(channel):
+  """Create the PredictionService stub of the channel."""
+  try:
+    from . import prediction_service_pb2
+  except (ImportError, ValueError):
+    import prediction_service_pb2
+  return prediction_service_pb2.PredictionServiceStub(channel)
+
+
+class _PooledChannel(object):
+
+  def __init__(self, channel, stub, last_used):
+    self.channel = channel
+    self.stub = stub
+    self.last_used = last_used
+
+
+class ChannelPool(object):
+  """The pool of the gRPC channels and stubs, keyed by "host:port"."""
+
+  def __init__(self,
+               idle_timeout=DEFAULT_IDLE_TIMEOUT,
+               create_stub=create_prediction_stub,
+               options=None):
+    """Create a new ChannelPool.
+
+    Args:
+      idle_timeout: The seconds to keep the channel which is not used, after
+                    which it's dropped from the pool. None means to keep the
+                    channels until the pool is closed.
+      create_stub: The function to create the stub of the channel, which is
+                   the PredictionService stub by default.
+      options: The list of gRPC channel options, which is optional.
+    """
+    self._idle_timeout = idle_timeout
+    self._create_stub = create_stub
+    self._options = options
+    self._lock = threading.Lock()
+    self._channels = {}
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+
+  def get_stub(self, server):
+    """Get the stub of the server, which reuses the pooled channel.
+
+    Args:
+      server: The address of server. Example: "localhost:9000".
+
+    Returns:
+      The stub of the channel to the server.
+    """
+    return self._get(server).stub
+
+  def get_channel(self, server):
+    """Get the pooled `grpc.Channel` of the server."""
+    return self._get(server).channel
+
+  def warm_up(self, servers, timeout=10.0):
+    """Create the channels of the servers and wait for them to connect.
+
+    Args:
+      servers: The list of the server addresses.
+      timeout: The seconds to wait for each channel.
+
+    Raises:
+      grpc.FutureTimeoutError: If the channel doesn't connect in time.
+    """
+    for server in servers:
+      grpc.channel_ready_future(self.get_channel(server)).result(
+          timeout=timeout)
+
+  def evict_idle(self):
+    """Drop the channels which are not used in the idle timeout.
+
+    The evicted channels are not closed, because the callers may still hold
+    their stubs. Each one is closed by gRPC when it's garbage collected.
+    """
+    with self._lock:
+      self._evict_idle(time.time())
+
+  def close(self):
+    """Close all the channels of the pool, and their stubs can't be used."""
+    with self._lock:
+      for pooled in self._channels.values():
+        self._close_channel(pooled.channel)
+      self._channels.clear()
+
+  def stats(self):
+    """Get the counters of the pool.
+
+    Returns:
+      The dictionary of the number of channels, the reused and created
+      channels, and the evicted channels.
+    """
+    with self._lock:
+      return {
+          "channels": len(self._channels),
+          "hits": self._hits,
+          "misses": self._misses,
+          "evictions": self._evictions
+      }
+
+  def _get(self, server):
+    server = server.strip()
+    now = time.time()
+    with self._lock:
+      self._evict_idle(now)
+      pooled = self._channels.get(server)
+      if pooled is None:
+        self._misses += 1
+        channel = grpc.insecure_channel(server, options=self._options)
+        pooled = _PooledChannel(channel, self._create_stub(channel), now)
+        self._channels[server] = pooled
+      else:
+        self._hits += 1
+        pooled.last_used = now
+      return pooled
+
+  def _evict_idle(self, now):
+    if self._idle_timeout is None:
+      return
+    for server, pooled in list(self._channels.items()):
+      if now - pooled.last_used > self._idle_timeout:
+        del self._channels[server]
+        self._evictions += 1
+
+  @staticmethod
+  def _close_channel(channel):
+    # The channels of the old grpcio can't be closed explicitly
+    if hasattr(channel, "close"):
+      channel.close()
+
+
+def get_pool():
+  """Get the channel pool shared by this process."""
+  global _pool
+  with _lock:
+    if _pool is None:
+      _pool = ChannelPool()
+    return _pool
@@ -0,0 +1,89 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+try:
+  from concurrent import futures
+  import grpc
+  from cloud_ml_sdk.predict_client.channel_pool import ChannelPool
+except ImportError:
+  grpc = None
+
+
+@unittest.skipIf(grpc is None, "grpcio is not installed")
+class ChannelPoolTest(unittest.TestCase):
+
+  def setUp(self):
+    # The stubs are the channels, so the PredictionService isn't needed
+    self.pool = ChannelPool(idle_timeout=0.2, create_stub=lambda c: c)
+
+  def tearDown(self):
+    self.pool.close()
+
+  def test_reuse(self):
+    stub = self.pool.get_stub("127.0.0.1:9000")
+    self.assertIs(stub, self.pool.get_stub("127.0.0.1:9000"))
+    self.assertIsNot(stub, self.pool.get_stub("127.0.0.1:9001"))
+    self.assertEqual({"channels": 2, "hits": 1, "misses": 2, "evictions": 0},
+                     self.pool.stats())
+
+  def test_threads(self):
+    stubs = []
+
+    def get_stub():
+      stubs.append(self.pool.get_stub("127.0.0.1:9000"))
+
+    threads = [threading.Thread(target=get_stub) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(1, len(set(id(stub) for stub in stubs)))
+    self.assertEqual(1, self.pool.stats()["misses"])
+
+  def start_server(self):
+    """Start the server of the "/Test/Echo" method, and get its address."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=1))
+    server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler(
+        "Test", {
+            "Echo": grpc.unary_unary_rpc_method_handler(
+                lambda request, context: request)
+        })])
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    self.addCleanup(server.stop, None)
+    return "127.0.0.1:{}".format(port)
+
+  def test_evict_idle(self):
+    address = self.start_server()
+    stub = self.pool.get_stub(address)
+    time.sleep(0.3)
+    self.pool.evict_idle()
+    self.assertEqual(0, self.pool.stats()["channels"])
+    self.assertEqual(1, self.pool.stats()["evictions"])
+    self.assertIsNot(stub, self.pool.get_stub(address))
+    # The stub held by the caller still works
+    self.assertEqual(b"ping", stub.unary_unary("/Test/Echo")(b"ping",
+                                                             timeout=5))
+
+  def test_warm_up(self):
+    self.pool.warm_up([self.start_server()], timeout=5)
+    self.assertEqual(1, self.pool.stats()["channels"])
+
+
+if __name__ == "__main__":
+  unittest.main()
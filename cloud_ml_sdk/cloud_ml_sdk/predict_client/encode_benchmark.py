@@ -0,0 +1,124 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare the numpy encoder of the requests with `make_tensor_proto` of
+TensorFlow, in the startup time and the encoded tensors per second.
+
+  python encode_benchmark.py -s 1
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import predict_pb2
+import tensor_codec
+
+try:
+  from tensorflow.python.framework import tensor_util
+except ImportError:
+  tensor_util = None
+
+# The code to import each path, and TensorFlow is hidden from the numpy one
+STARTUP_CASES = [
+    ("tensorflow", "from tensorflow.python.framework import tensor_util; "
+     "import predict_pb2"),
+    ("numpy encoder", "import sys; sys.modules['tensorflow'] = None; "
+     "import tensor_codec; import predict_pb2"),
+]
+
+ENCODE_CASES = [
+    ("1x10 float32", np.random.rand(1, 10).astype(np.float32), "float32"),
+    ("100x100 float32", np.random.rand(100, 100).astype(np.float32),
+     "float32"),
+    ("1000x1000 float32", np.random.rand(1000, 1000).astype(np.float32),
+     "float32"),
+    ("100 strings", np.array([b"x" * 16] * 100), "string"),
+]
+
+
+def startup_seconds(code, repeat):
+  """Get the min seconds of the new processes to run the code."""
+  directory = os.path.dirname(os.path.abspath(__file__))
+  seconds = []
+  for _ in range(repeat):
+    start = time.time()
+    subprocess.check_call([sys.executable, "-c", code], cwd=directory)
+    seconds.append(time.time() - start)
+  return min(seconds)
+
+
+def measure(func, seconds):
+  """Call the function repeatedly for the seconds.
+
+  Returns:
+    The number of calls per second.
+  """
+  count = 0
+  start = time.time()
+  deadline = start + seconds
+  while True:
+    func()
+    count += 1
+    now = time.time()
+    if now >= deadline:
+      return count / (now - start)
+
+
+def encode_with_tensorflow(values, dtype):
+  request = predict_pb2.PredictRequest()
+  request.inputs["x"].CopyFrom(
+      tensor_util.make_tensor_proto(values, dtype=dtype))
+  return request
+
+
+def encode_with_numpy(values, dtype):
+  request = predict_pb2.PredictRequest()
+  tensor_codec.encode_tensor(values, request.inputs["x"], dtype)
+  return request
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-s", "--seconds", type=float, default=1.0,
+                      help="The seconds to measure each encode case")
+  parser.add_argument("-r", "--repeat", type=int, default=3,
+                      help="The processes to start for each startup case")
+  args = parser.parse_args()
+
+  print("{:20} {:>12}".format("STARTUP", "SECONDS"))
+  for case, code in STARTUP_CASES:
+    if case == "tensorflow" and tensor_util is None:
+      print("{:20} {:>12}".format(case, "-"))
+      continue
+    print("{:20} {:>12.3f}".format(case, startup_seconds(code, args.repeat)))
+
+  print("{:20} {:>12} {:>12}".format("ENCODE", "TENSORFLOW/S", "NUMPY/S"))
+  for case, values, dtype in ENCODE_CASES:
+    numpy_rate = measure(lambda: encode_with_numpy(values, dtype),
+                         args.seconds)
+    if tensor_util is None:
+      print("{:20} {:>12} {:>12.0f}".format(case, "-", numpy_rate))
+      continue
+    tensorflow_rate = measure(lambda: encode_with_tensorflow(values, dtype),
+                              args.seconds)
+    print("{:20} {:>12.0f} {:>12.0f}".format(case, tensorflow_rate,
+                                              numpy_rate))
+
+
+if __name__ == "__main__":
+  main()
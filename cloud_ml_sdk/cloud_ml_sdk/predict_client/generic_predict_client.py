@@ -14,22 +14,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from grpc.beta import implementations
+import argparse
 import json
-import numpy as np
 import os
-import tensorflow as tf
-from tensorflow.python.framework import tensor_util
 
-import predict_pb2
-import prediction_service_pb2
-
-tf.app.flags.DEFINE_string("server", "localhost:9000",
-                           "PredictionService host:port")
-tf.app.flags.DEFINE_string("model", "", "The model name")
-tf.app.flags.DEFINE_string("data", "", "The json file for inference")
-tf.app.flags.DEFINE_float("timeout", 10.0, "The timeout of gRPC request")
-FLAGS = tf.app.flags.FLAGS
+try:
+  from . import channel_pool
+  from . import predict_pb2
+  from . import tensor_codec
+except (ImportError, ValueError):
+  # Run as the script in this directory
+  import channel_pool
+  import predict_pb2
+  import tensor_codec
 
 
 def get_tensor_values(tensor):
@@ -83,42 +80,93 @@ def get_tensor_values(tensor):
     return None
 
 
-def predict(server, model, data, timeout=10.0):
+def predict(server, model, data, timeout=10.0, pool=None, as_numpy=False):
   """Request generic gRPC server with specified data.
  
   Args:
     server: The address of server. Example: "localhost:9000".
     model: The name of the model. Example: "mnist".
     data: The json data to request. Example: {"keys_dtype": "int32", "keys": [[1], [2]]}.
+    timeout: The timeout of the gRPC request.
+    pool: The `channel_pool.ChannelPool` to reuse the channel of the server,
+          which is the pool of this process by default.
+    as_numpy: Whether to decode the outputs to the `numpy.ndarray`s of their
+              shapes, or the flat lists of values.
 
   Returns:
-    The predict result in dictionary format. Example: {"keys": [1, 2]}.
+    The predict result in dictionary format. Example: {"keys": [1, 2]}, or
+    {"keys": array([[1], [2]], dtype=int32)} with `as_numpy`.
   """
-  host, port = server.split(":")
-  channel = implementations.insecure_channel(host, int(port))
-  stub = prediction_service_pb2.beta_create_PredictionService_stub(channel)
+  pool = pool or channel_pool.get_pool()
+  stub = pool.get_stub(server)
 
   request = predict_pb2.PredictRequest()
   request.model_spec.name = model
   for k, v in data.items():
     if k.endswith("_dtype") == False:
-      numpy_data = np.array(v)
-      dtype = data[k + "_dtype"]
-      request.inputs[k].CopyFrom(tensor_util.make_tensor_proto(numpy_data,
-                                                               dtype=dtype))
+      tensor_codec.encode_tensor(v, request.inputs[k], data[k + "_dtype"])
 
-  result = stub.Predict(request, timeout)
+  result = stub.Predict(request, timeout=timeout)
   result_dict = {}
   for k, v in result.outputs.items():
-    result_dict[k] = get_tensor_values(v)
+    if as_numpy:
+      result_dict[k] = tensor_codec.decode_tensor(v)
+    else:
+      result_dict[k] = get_tensor_values(v)
   return result_dict
 
 
+def predict_arrays(server, model, inputs, output_filter=None, timeout=10.0,
+                   pool=None):
+  """Request generic gRPC server with the numpy arrays.
+
+  The dtypes of the tensors are inferred from the arrays, and the arrays are
+  encoded without converting to the lists.
+
+  Args:
+    server: The address of server. Example: "localhost:9000".
+    model: The name of the model. Example: "mnist".
+    inputs: The dictionary of the input names and `numpy.ndarray`s. Example:
+            {"keys": np.array([[1], [2]], dtype=np.int32)}.
+    output_filter: The list of the output names to return, which are only
+                   computed and sent by the server. All the outputs are
+                   returned by default.
+    timeout: The timeout of the gRPC request.
+    pool: The `channel_pool.ChannelPool` to reuse the channel of the server,
+          which is the pool of this process by default.
+
+  Returns:
+    The dictionary of the output names and `numpy.ndarray`s. Example:
+    {"keys": array([[1], [2]], dtype=int32)}.
+  """
+  pool = pool or channel_pool.get_pool()
+  stub = pool.get_stub(server)
+
+  request = predict_pb2.PredictRequest()
+  request.model_spec.name = model
+  for name, array in inputs.items():
+    tensor_codec.encode_tensor(array, request.inputs[name])
+  if output_filter:
+    request.output_filter.extend(output_filter)
+
+  result = stub.Predict(request, timeout=timeout)
+  return dict((name, tensor_codec.decode_tensor(tensor))
+              for name, tensor in result.outputs.items())
+
+
 def main():
-  server = FLAGS.server
-  model = FLAGS.model
-  timeout = FLAGS.timeout
-  json_file = FLAGS.data
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--server", default="localhost:9000",
+                      help="PredictionService host:port")
+  parser.add_argument("--model", default="", help="The model name")
+  parser.add_argument("--data", default="", help="The json file for inference")
+  parser.add_argument("--timeout", type=float, default=10.0,
+                      help="The timeout of gRPC request")
+  args = parser.parse_args()
+  server = args.server
+  model = args.model
+  timeout = args.timeout
+  json_file = args.data
   if os.path.isfile(json_file):
     with open(json_file) as f:
       data = json.load(f)
@@ -0,0 +1,116 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cloud_ml_sdk.client import CloudMlClient
+
+try:
+  import numpy as np
+  from cloud_ml_sdk.predict_client import channel_pool
+  from cloud_ml_sdk.predict_client import generic_predict_client
+  from cloud_ml_sdk.predict_client import stand_in_service
+  from cloud_ml_sdk.predict_client import tensor_codec
+  from cloud_ml_sdk.predict_client.channel_pool import ChannelPool
+except ImportError:
+  stand_in_service = None
+
+
+@unittest.skipIf(stand_in_service is None,
+                 "numpy or grpcio is not installed")
+class PredictArraysTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servicer = stand_in_service.EchoPredictionService()
+    server, self.address = stand_in_service.start_server(self.servicer)
+    self.addCleanup(server.stop, None)
+    self.pool = ChannelPool()
+    self.addCleanup(self.pool.close)
+    self.inputs = {
+        "x": np.array([[0.5, 1.5], [2.5, 3.5]], dtype=np.float32),
+        "ids": np.array([2**40, -1], dtype=np.int64),
+        "keys": np.array([[b"a"], [b"\xff\x00"]], dtype=object)
+    }
+
+  def test_arrays(self):
+    outputs = generic_predict_client.predict_arrays(
+        self.address, "echo", self.inputs, pool=self.pool)
+    self.assertEqual(sorted(self.inputs), sorted(outputs))
+    for name, expected in self.inputs.items():
+      self.assertEqual(expected.dtype, outputs[name].dtype)
+      self.assertEqual(expected.shape, outputs[name].shape)
+      self.assertEqual(expected.tolist(), outputs[name].tolist())
+
+    request = self.servicer.requests[-1]
+    self.assertEqual("echo", request.model_spec.name)
+    self.assertEqual([], list(request.output_filter))
+    self.assertEqual(1, request.inputs["x"].dtype)
+    self.assertEqual(9, request.inputs["ids"].dtype)
+    self.assertEqual(7, request.inputs["keys"].dtype)
+    self.assertEqual([b"a", b"\xff\x00"],
+                     list(request.inputs["keys"].string_val))
+
+  def test_output_filter(self):
+    outputs = generic_predict_client.predict_arrays(
+        self.address, "echo", self.inputs, output_filter=["ids", "keys"],
+        pool=self.pool)
+    self.assertEqual(["ids", "keys"], sorted(outputs))
+    self.assertEqual([2**40, -1], outputs["ids"].tolist())
+    self.assertEqual(["ids", "keys"],
+                     list(self.servicer.requests[-1].output_filter))
+
+
+@unittest.skipIf(stand_in_service is None,
+                 "numpy or grpcio is not installed")
+class ClientPredictTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servicer = stand_in_service.EchoPredictionService()
+    server, self.address = stand_in_service.start_server(self.servicer)
+    self.addCleanup(server.stop, None)
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    self.data_file = os.path.join(directory, "data.json")
+    with open(self.data_file, "w") as f:
+      json.dump({"x": [[1.0, 2.0]], "x_dtype": "float32"}, f)
+    self.client = CloudMlClient("ak", "sk", "http://localhost")
+    self.addCleanup(self.client.close)
+
+  def test_predict(self):
+    pool = channel_pool.get_pool()
+    misses = pool.stats()["misses"]
+    for _ in range(2):
+      result = self.client.do_predict_server(self.address, "echo",
+                                             self.data_file)
+      self.assertEqual(["x"], list(result))
+    request = self.servicer.requests[-1]
+    self.assertEqual("echo", request.model_spec.name)
+    self.assertEqual([[1.0, 2.0]],
+                     tensor_codec.decode_tensor(request.inputs["x"]).tolist())
+    # The channel of the process pool is reused by the second prediction
+    self.assertEqual(misses + 1, pool.stats()["misses"])
+
+  def test_missing_data_file(self):
+    result = self.client.do_predict_server(self.address, "echo",
+                                           self.data_file + ".missing")
+    self.assertTrue(result["error"])
+    self.assertEqual([], self.servicer.requests)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,75 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure the sequential predictions against a local fake PredictionService,
+with a new channel for each prediction and with the channel pool.
+
+  python predict_benchmark.py -n 500
+"""
+
+import argparse
+import time
+
+from grpc.beta import implementations
+
+import channel_pool
+import generic_predict_client
+import prediction_service_pb2
+from stand_in_service import start_server
+
+DATA = {"keys_dtype": "int32", "keys": [[1], [2]]}
+
+
+class NewChannelPool(object):
+  """The pool which creates a new channel for each prediction, like the
+  previous `predict`."""
+
+  def get_stub(self, server):
+    host, port = server.split(":")
+    channel = implementations.insecure_channel(host, int(port))
+    return prediction_service_pb2.beta_create_PredictionService_stub(channel)
+
+
+def measure(address, pool, count):
+  """Send the predictions one by one.
+
+  Returns:
+    The mean milliseconds of the predictions.
+  """
+  start = time.time()
+  for _ in range(count):
+    generic_predict_client.predict(address, "fake", DATA, pool=pool)
+  return (time.time() - start) * 1000 / count
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", "--count", type=int, default=500,
+                      help="The number of predictions of each case")
+  args = parser.parse_args()
+
+  server, address = start_server()
+  try:
+    pool = channel_pool.ChannelPool()
+    cases = [("new channel", NewChannelPool()), ("channel pool", pool)]
+    print("{:16} {:>14} {:>10}".format("CASE", "PREDICTIONS/S", "MEAN MS"))
+    for case, case_pool in cases:
+      mean = measure(address, case_pool, args.count)
+      print("{:16} {:>14.0f} {:>10.2f}".format(case, 1000 / mean, mean))
+    pool.close()
+  finally:
+    server.stop(None)
+
+
+if __name__ == "__main__":
+  main()
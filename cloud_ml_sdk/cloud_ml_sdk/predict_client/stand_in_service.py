@@ -0,0 +1,69 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The local gRPC PredictionService which stands in for TensorFlow serving
+in the tests and benchmarks.
+
+Example:
+
+  server, address = start_server()
+  outputs = generic_predict_client.predict_arrays(address, "echo", inputs)
+  ...
+  server.stop(None)
+"""
+
+from concurrent import futures
+
+import grpc
+
+try:
+  from . import predict_pb2
+  from . import prediction_service_pb2
+except (ImportError, ValueError):
+  import predict_pb2
+  import prediction_service_pb2
+
+
+class EchoPredictionService(
+    prediction_service_pb2.PredictionServiceServicer):
+  """The PredictionService which returns the inputs as the outputs, only
+  those in the output filter if it's set."""
+
+  def __init__(self):
+    self.requests = []
+
+  def Predict(self, request, context):
+    self.requests.append(request)
+    response = predict_pb2.PredictResponse()
+    for name, tensor in request.inputs.items():
+      if not request.output_filter or name in request.output_filter:
+        response.outputs[name].CopyFrom(tensor)
+    return response
+
+
+def start_server(servicer=None):
+  """Start the PredictionService on a free local port.
+
+  Args:
+    servicer: The `PredictionServiceServicer` to answer the requests, which
+              is a new `EchoPredictionService` by default.
+
+  Returns:
+    The tuple of the `grpc.Server` and its address.
+  """
+  server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+  prediction_service_pb2.add_PredictionServiceServicer_to_server(
+      servicer or EchoPredictionService(), server)
+  port = server.add_insecure_port("127.0.0.1:0")
+  server.start()
+  return server, "127.0.0.1:{}".format(port)
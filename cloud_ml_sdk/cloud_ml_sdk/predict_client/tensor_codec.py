@@ -0,0 +1,230 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Encode the numpy arrays to the TensorProto of the predictions, and decode
+the TensorProto to the shaped numpy arrays.
+
+The arrays are encoded to the packed `tensor_content` bytes without
+TensorFlow. The packed `tensor_content` is decoded with `np.frombuffer`
+without copying, and the typed `*_val` fields are converted in one pass.
+"""
+
+import collections
+
+import numpy as np
+
+try:
+  text_type = unicode
+except NameError:
+  text_type = str
+
+# The name of the data type, the numpy dtype of the arrays, the numpy dtype
+# and the field of the values, and the function to convert the values of the
+# field or tensor_content to the numpy array
+DataType = collections.namedtuple(
+    "DataType", ["name", "array_dtype", "dtype", "field", "convert"])
+
+
+def _half(values):
+  """Get the float16 array of the bit patterns."""
+  return values.astype(np.uint16, copy=False).view(np.float16)
+
+
+def _bfloat16(values):
+  """Get the float32 array of the bfloat16 bit patterns, which are the high
+  16 bits of float32."""
+  return np.left_shift(values.astype(np.uint32), 16).view(np.float32)
+
+
+def _complex64(values):
+  """Get the complex64 array of the pairs of real and imaginary parts."""
+  return values.astype(np.float32, copy=False).view(np.complex64)
+
+
+def _complex128(values):
+  """Get the complex128 array of the pairs of real and imaginary parts."""
+  return values.astype(np.float64, copy=False).view(np.complex128)
+
+
+# The data types of TensorFlow, which are the enum values in
+# https://github.com/tensorflow/tensorflow/blob/master/tensorflow/core/framework/types.proto
+DATA_TYPES = {
+    1: DataType("float32", np.float32, np.float32, "float_val", None),
+    2: DataType("float64", np.float64, np.float64, "double_val", None),
+    3: DataType("int32", np.int32, np.int32, "int_val", None),
+    4: DataType("uint8", np.uint8, np.uint8, "int_val", None),
+    5: DataType("int16", np.int16, np.int16, "int_val", None),
+    6: DataType("int8", np.int8, np.int8, "int_val", None),
+    7: DataType("string", np.object_, np.object_, "string_val", None),
+    8: DataType("complex64", np.complex64, np.float32, "scomplex_val",
+                _complex64),
+    9: DataType("int64", np.int64, np.int64, "int64_val", None),
+    10: DataType("bool", np.bool_, np.bool_, "bool_val", None),
+    11: DataType("qint8", np.int8, np.int8, "int_val", None),
+    12: DataType("quint8", np.uint8, np.uint8, "int_val", None),
+    13: DataType("qint32", np.int32, np.int32, "int_val", None),
+    14: DataType("bfloat16", np.float32, np.uint16, "half_val", _bfloat16),
+    15: DataType("qint16", np.int16, np.int16, "int_val", None),
+    16: DataType("quint16", np.uint16, np.uint16, "int_val", None),
+    17: DataType("uint16", np.uint16, np.uint16, "int_val", None),
+    18: DataType("complex128", np.complex128, np.float64, "dcomplex_val",
+                 _complex128),
+    19: DataType("float16", np.float16, np.uint16, "half_val", _half),
+    22: DataType("uint32", np.uint32, np.uint32, "uint32_val", None),
+    23: DataType("uint64", np.uint64, np.uint64, "uint64_val", None),
+}
+
+# The data types of the names and their aliases like `tf.as_dtype`
+DATA_TYPE_NAMES = dict((data_type.name, enum)
+                       for enum, data_type in DATA_TYPES.items())
+DATA_TYPE_NAMES.update({"float": 1, "double": 2, "complex": 8, "half": 19})
+
+# The data types of the numpy arrays
+NUMPY_DATA_TYPES = {
+    np.dtype(np.float32): 1,
+    np.dtype(np.float64): 2,
+    np.dtype(np.int32): 3,
+    np.dtype(np.uint8): 4,
+    np.dtype(np.int16): 5,
+    np.dtype(np.int8): 6,
+    np.dtype(np.complex64): 8,
+    np.dtype(np.int64): 9,
+    np.dtype(np.bool_): 10,
+    np.dtype(np.uint16): 17,
+    np.dtype(np.complex128): 18,
+    np.dtype(np.float16): 19,
+    np.dtype(np.uint32): 22,
+    np.dtype(np.uint64): 23,
+}
+
+
+def get_data_type(dtype):
+  """Get the enum value of the data type.
+
+  Args:
+    dtype: The name of the data type like "int32", or the numpy dtype.
+
+  Returns:
+    The enum value of the data type.
+
+  Raises:
+    ValueError: If the dtype is not supported.
+  """
+  if isinstance(dtype, (str, text_type)):
+    enum = DATA_TYPE_NAMES.get(dtype)
+  else:
+    dtype = np.dtype(dtype)
+    if dtype.kind in ("S", "U", "O"):
+      enum = 7
+    else:
+      enum = NUMPY_DATA_TYPES.get(dtype)
+  if enum is None:
+    raise ValueError("Unsupported dtype of tensor: {}".format(dtype))
+  return enum
+
+
+def _encode_string(value):
+  if isinstance(value, bytes):
+    return value
+  if not isinstance(value, text_type):
+    value = text_type(value)
+  return value.encode("utf-8")
+
+
+def encode_tensor(values, tensor, dtype=None):
+  """Encode the array to the TensorProto like `tensor_util.make_tensor_proto`.
+
+  The numeric arrays are written to `tensor_content` in one copy, and the
+  strings to `string_val`.
+
+  Args:
+    values: The numpy array, or the nested lists of values.
+    tensor: The TensorProto to write, such as `request.inputs["keys"]`.
+    dtype: The name of the data type like "int32", or the numpy dtype. The
+           dtype of the array is used by default.
+
+  Returns:
+    The TensorProto object.
+
+  Raises:
+    ValueError: If the dtype is not supported.
+  """
+  array = np.asarray(values)
+  enum = get_data_type(array.dtype if dtype is None else dtype)
+  data_type = DATA_TYPES[enum]
+
+  tensor.dtype = enum
+  for size in array.shape:
+    tensor.tensor_shape.dim.add(size=size)
+  if data_type.name == "string":
+    tensor.string_val.extend([_encode_string(value)
+                              for value in array.ravel().tolist()])
+    return tensor
+  array = np.ascontiguousarray(array, dtype=data_type.array_dtype)
+  if data_type.name == "bfloat16":
+    # Truncate float32 to its high 16 bits
+    array = np.right_shift(array.view(np.uint32), 16).astype(np.uint16)
+  tensor.tensor_content = array.tobytes()
+  return tensor
+
+
+def get_shape(tensor):
+  """Get the shape tuple of the TensorProto, or None if the rank is unknown."""
+  if tensor.tensor_shape.unknown_rank:
+    return None
+  return tuple(dim.size for dim in tensor.tensor_shape.dim)
+
+
+def decode_tensor(tensor):
+  """Decode the TensorProto to the numpy array of its shape.
+
+  Args:
+    tensor: The TensorProto object.
+
+  Returns:
+    The `numpy.ndarray` of the shape and dtype of the tensor. The array of
+    `tensor_content` shares its buffer and is read-only. The string tensor
+    is the array of bytes objects.
+
+  Raises:
+    ValueError: If the dtype is not supported.
+  """
+  data_type = DATA_TYPES.get(tensor.dtype)
+  if data_type is None:
+    raise ValueError("Unsupported dtype of tensor: {}".format(tensor.dtype))
+
+  if tensor.tensor_content:
+    values = np.frombuffer(tensor.tensor_content, dtype=data_type.dtype)
+  else:
+    field = getattr(tensor, data_type.field)
+    if data_type.dtype is np.object_:
+      values = np.empty(len(field), dtype=np.object_)
+      values[:] = list(field)
+    else:
+      values = np.fromiter(field, dtype=data_type.dtype, count=len(field))
+  if data_type.convert is not None:
+    values = data_type.convert(values)
+
+  shape = get_shape(tensor)
+  if shape is None:
+    return values
+  size = int(np.prod(shape, dtype=np.int64))
+  if values.size < size:
+    # The repeated last value is omitted like TensorFlow does
+    if values.size == 0:
+      fill = b"" if values.dtype == np.object_ else 0
+      values = np.full(size, fill, dtype=values.dtype)
+    else:
+      values = np.concatenate(
+          [values, np.repeat(values[-1:], size - values.size)])
+  return values.reshape(shape)
@@ -0,0 +1,201 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+import unittest
+
+try:
+  import numpy as np
+  from cloud_ml_sdk.predict_client import predict_pb2
+  from cloud_ml_sdk.predict_client import tensor_codec
+  # TensorFlow's TensorProto if it's installed, or the bundled one
+  TensorProto = type(predict_pb2.PredictRequest().inputs["x"])
+except ImportError:
+  TensorProto = None
+
+# Import the client with TensorFlow hidden, and send a tensor through the
+# bundled protos
+WITHOUT_TENSORFLOW = """
+import sys
+sys.modules["tensorflow"] = None
+from cloud_ml_sdk.predict_client import predict_pb2, tensor_codec
+request = predict_pb2.PredictRequest()
+tensor_codec.encode_tensor([[1.5], [2.5]], request.inputs["x"], "float32")
+request = predict_pb2.PredictRequest.FromString(request.SerializeToString())
+print(tensor_codec.decode_tensor(request.inputs["x"]).tolist())
+print(predict_pb2.tensorflow_dot_core_dot_framework_dot_tensor__pb2.__name__)
+"""
+
+
+def make_tensor(dtype, shape, **values):
+  tensor = TensorProto(dtype=dtype, **values)
+  for size in shape:
+    tensor.tensor_shape.dim.add(size=size)
+  return tensor
+
+
+@unittest.skipIf(TensorProto is None, "numpy or protobuf is not installed")
+class DecodeTensorTest(unittest.TestCase):
+
+  def assertArrayEqual(self, expected, actual):
+    self.assertEqual(expected.dtype, actual.dtype)
+    self.assertEqual(expected.shape, actual.shape)
+    self.assertTrue(np.array_equal(expected, actual))
+
+  def test_tensor_content(self):
+    expected = np.arange(6, dtype=np.float32).reshape(2, 3)
+    tensor = make_tensor(1, [2, 3], tensor_content=expected.tobytes())
+    actual = tensor_codec.decode_tensor(tensor)
+    self.assertArrayEqual(expected, actual)
+    self.assertFalse(actual.flags.writeable)
+
+  def test_typed_values(self):
+    tensor = make_tensor(3, [2, 1], int_val=[1, 2])
+    self.assertArrayEqual(np.array([[1], [2]], dtype=np.int32),
+                          tensor_codec.decode_tensor(tensor))
+    tensor = make_tensor(9, [3], int64_val=[2**40, -1, 0])
+    self.assertArrayEqual(np.array([2**40, -1, 0], dtype=np.int64),
+                          tensor_codec.decode_tensor(tensor))
+    tensor = make_tensor(10, [2], bool_val=[True, False])
+    self.assertArrayEqual(np.array([True, False]),
+                          tensor_codec.decode_tensor(tensor))
+
+  def test_repeated_last_value(self):
+    tensor = make_tensor(1, [2, 2], float_val=[1.5])
+    self.assertArrayEqual(np.full((2, 2), 1.5, dtype=np.float32),
+                          tensor_codec.decode_tensor(tensor))
+    tensor = make_tensor(2, [3], double_val=[1.0, 2.0])
+    self.assertArrayEqual(np.array([1.0, 2.0, 2.0]),
+                          tensor_codec.decode_tensor(tensor))
+
+  def test_half(self):
+    expected = np.array([[0.5, -2.0, 65504.0]], dtype=np.float16)
+    bits = expected.view(np.uint16).ravel().tolist()
+    tensor = make_tensor(19, [1, 3], half_val=bits)
+    self.assertArrayEqual(expected, tensor_codec.decode_tensor(tensor))
+    tensor = make_tensor(19, [1, 3], tensor_content=expected.tobytes())
+    self.assertArrayEqual(expected, tensor_codec.decode_tensor(tensor))
+
+  def test_bfloat16(self):
+    expected = np.array([1.0, -0.5, 3.0], dtype=np.float32)
+    bits = np.right_shift(expected.view(np.uint32), 16)
+    tensor = make_tensor(14, [3], half_val=bits.tolist())
+    self.assertArrayEqual(expected, tensor_codec.decode_tensor(tensor))
+
+  def test_complex(self):
+    expected = np.array([1 + 2j, 3 - 4j], dtype=np.complex64)
+    tensor = make_tensor(8, [2], scomplex_val=[1, 2, 3, -4])
+    self.assertArrayEqual(expected, tensor_codec.decode_tensor(tensor))
+    tensor = make_tensor(18, [2], dcomplex_val=[1, 2, 3, -4])
+    self.assertArrayEqual(expected.astype(np.complex128),
+                          tensor_codec.decode_tensor(tensor))
+
+  def test_string(self):
+    tensor = make_tensor(7, [2, 1], string_val=[b"a", b"bc"])
+    actual = tensor_codec.decode_tensor(tensor)
+    self.assertEqual((2, 1), actual.shape)
+    self.assertEqual([[b"a"], [b"bc"]], actual.tolist())
+
+  def test_unknown_rank(self):
+    tensor = TensorProto(dtype=3, int_val=[1, 2, 3])
+    tensor.tensor_shape.unknown_rank = True
+    self.assertArrayEqual(np.array([1, 2, 3], dtype=np.int32),
+                          tensor_codec.decode_tensor(tensor))
+
+  def test_unsupported_dtype(self):
+    self.assertRaises(ValueError, tensor_codec.decode_tensor,
+                      make_tensor(20, [1]))
+
+
+@unittest.skipIf(TensorProto is None, "numpy or protobuf is not installed")
+class EncodeTensorTest(unittest.TestCase):
+
+  def encode_decode(self, values, dtype=None):
+    tensor = tensor_codec.encode_tensor(values, TensorProto(), dtype)
+    return tensor, tensor_codec.decode_tensor(
+        TensorProto.FromString(tensor.SerializeToString()))
+
+  def test_numeric(self):
+    for dtype in [np.float32, np.float64, np.int8, np.uint8, np.int16,
+                  np.uint16, np.int32, np.int64, np.uint32, np.uint64,
+                  np.bool_, np.float16, np.complex64, np.complex128]:
+      expected = np.arange(6).reshape(3, 2, 1).astype(dtype)
+      tensor, actual = self.encode_decode(expected)
+      self.assertEqual(expected.tobytes(), tensor.tensor_content)
+      self.assertEqual(expected.dtype, actual.dtype)
+      self.assertTrue(np.array_equal(expected, actual))
+
+  def test_dtype_name(self):
+    tensor, actual = self.encode_decode([[1], [2]], "int32")
+    self.assertEqual(3, tensor.dtype)
+    self.assertEqual([2, 1], [dim.size for dim in tensor.tensor_shape.dim])
+    self.assertTrue(np.array_equal(np.array([[1], [2]], np.int32), actual))
+    tensor, actual = self.encode_decode([0.5, 1.5], u"half")
+    self.assertEqual(19, tensor.dtype)
+    self.assertTrue(np.array_equal(np.array([0.5, 1.5], np.float16), actual))
+    self.assertRaises(ValueError, self.encode_decode, [1], "int4")
+
+  def test_bfloat16(self):
+    tensor, actual = self.encode_decode([1.0, -0.5, 3.0], "bfloat16")
+    self.assertEqual(6, len(tensor.tensor_content))
+    self.assertTrue(np.array_equal(np.array([1.0, -0.5, 3.0]), actual))
+
+  def test_string(self):
+    tensor, actual = self.encode_decode([[u"a", u"\u7ebf"], [u"bc", u""]])
+    self.assertEqual(7, tensor.dtype)
+    self.assertEqual([b"a", u"\u7ebf".encode("utf-8"), b"bc", b""],
+                     list(tensor.string_val))
+    self.assertEqual((2, 2), actual.shape)
+
+  def test_scalar(self):
+    tensor, actual = self.encode_decode(3.0, "float32")
+    self.assertEqual(0, len(tensor.tensor_shape.dim))
+    self.assertEqual(np.float32(3.0), actual)
+
+  def test_make_tensor_proto(self):
+    try:
+      from tensorflow.python.framework import tensor_util
+    except ImportError:
+      self.skipTest("tensorflow is not installed")
+    for values, dtype in [([[1], [2]], "int32"), ([[10.0], [30.0]], "float32"),
+                          ([1.5, 2.5], "float64"), ([b"x", b"yz"], "string"),
+                          ([True, False], "bool")]:
+      tensor = tensor_codec.encode_tensor(values, TensorProto(), dtype)
+      expected = tensor_util.MakeNdarray(
+          tensor_util.make_tensor_proto(np.array(values), dtype=dtype))
+      actual = tensor_util.MakeNdarray(tensor)
+      self.assertEqual(expected.dtype, actual.dtype)
+      self.assertTrue(np.array_equal(expected, actual))
+
+
+@unittest.skipIf(TensorProto is None, "numpy or protobuf is not installed")
+class WithoutTensorFlowTest(unittest.TestCase):
+
+  def test_bundled_protos(self):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [root] + [path for path in [env.get("PYTHONPATH")] if path])
+    output = subprocess.check_output(
+        [sys.executable, "-c", WITHOUT_TENSORFLOW], env=env)
+    self.assertEqual(
+        ["[[1.5], [2.5]]", "cloud_ml_sdk.predict_client.tensor_pb2"],
+        output.decode("utf-8").splitlines())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: tensorflow/core/framework/tensor.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+try:
+  from . import tensor_shape_pb2 as tensorflow_dot_core_dot_framework_dot_tensor__shape__pb2
+except (ImportError, ValueError):
+  import tensor_shape_pb2 as tensorflow_dot_core_dot_framework_dot_tensor__shape__pb2
+try:
+  from . import types_pb2 as tensorflow_dot_core_dot_framework_dot_types__pb2
+except (ImportError, ValueError):
+  import types_pb2 as tensorflow_dot_core_dot_framework_dot_types__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n&tensorflow/core/framework/tensor.proto\x12\ntensorflow\x1a,tensorflow/core/framework/tensor_shape.proto\x1a%tensorflow/core/framework/types.proto\"\x95\x03\n\x0bTensorProto\x12#\n\x05\x64type\x18\x01 \x01(\x0e\x32\x14.tensorflow.DataType\x12\x32\n\x0ctensor_shape\x18\x02 \x01(\x0b\x32\x1c.tensorflow.TensorShapeProto\x12\x16\n\x0eversion_number\x18\x03 \x01(\x05\x12\x16\n\x0etensor_content\x18\x04 \x01(\x0c\x12\x14\n\x08half_val\x18\r \x03(\x05\x42\x02\x10\x01\x12\x15\n\tfloat_val\x18\x05 \x03(\x02\x42\x02\x10\x01\x12\x16\n\ndouble_val\x18\x06 \x03(\x01\x42\x02\x10\x01\x12\x13\n\x07int_val\x18\x07 \x03(\x05\x42\x02\x10\x01\x12\x12\n\nstring_val\x18\x08 \x03(\x0c\x12\x18\n\x0cscomplex_val\x18\t \x03(\x02\x42\x02\x10\x01\x12\x15\n\tint64_val\x18\n \x03(\x03\x42\x02\x10\x01\x12\x14\n\x08\x62ool_val\x18\x0b \x03(\x08\x42\x02\x10\x01\x12\x18\n\x0c\x64\x63omplex_val\x18\x0c \x03(\x01\x42\x02\x10\x01\x12\x16\n\nuint32_val\x18\x10 \x03(\rB\x02\x10\x01\x12\x16\n\nuint64_val\x18\x11 \x03(\x04\x42\x02\x10\x01\x42-\n\x18org.tensorflow.frameworkB\x0cTensorProtosP\x01\xf8\x01\x01\x62\x06proto3')
+
+
+
+_TENSORPROTO = DESCRIPTOR.message_types_by_name['TensorProto']
+TensorProto = _reflection.GeneratedProtocolMessageType('TensorProto', (_message.Message,), {
+  'DESCRIPTOR' : _TENSORPROTO,
+  '__module__' : 'tensorflow.core.framework.tensor_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow.TensorProto)
+  })
+_sym_db.RegisterMessage(TensorProto)
+
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  DESCRIPTOR._serialized_options = b'\n\030org.tensorflow.frameworkB\014TensorProtosP\001\370\001\001'
+  _TENSORPROTO.fields_by_name['half_val']._options = None
+  _TENSORPROTO.fields_by_name['half_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['float_val']._options = None
+  _TENSORPROTO.fields_by_name['float_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['double_val']._options = None
+  _TENSORPROTO.fields_by_name['double_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['int_val']._options = None
+  _TENSORPROTO.fields_by_name['int_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['scomplex_val']._options = None
+  _TENSORPROTO.fields_by_name['scomplex_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['int64_val']._options = None
+  _TENSORPROTO.fields_by_name['int64_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['bool_val']._options = None
+  _TENSORPROTO.fields_by_name['bool_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['dcomplex_val']._options = None
+  _TENSORPROTO.fields_by_name['dcomplex_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['uint32_val']._options = None
+  _TENSORPROTO.fields_by_name['uint32_val']._serialized_options = b'\020\001'
+  _TENSORPROTO.fields_by_name['uint64_val']._options = None
+  _TENSORPROTO.fields_by_name['uint64_val']._serialized_options = b'\020\001'
+  _TENSORPROTO._serialized_start=140
+  _TENSORPROTO._serialized_end=545
+# @@protoc_insertion_point(module_scope)
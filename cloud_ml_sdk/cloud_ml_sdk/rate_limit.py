@@ -0,0 +1,236 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Limit the rate of the requests of CloudMlClient.
+
+Example:
+
+  # 5 train requests per second with bursts of 10, shared by the processes
+  limiter = RateLimiter({"train": (5, 10), "model": 20}, shared=True)
+  client = CloudMlClient(rate_limiter=limiter)
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+try:
+  from urllib.parse import urlparse
+except ImportError:
+  from urlparse import urlparse
+
+from .cache import DEFAULT_CACHE_DIR
+
+# The endpoint groups of the path prefixes
+ENDPOINT_GROUPS = [
+    ("/cloud_ml/v1/train", "train"),
+    ("/cloud_ml/v1/model", "model"),
+    ("/cloud_ml/v1/dev", "dev"),
+    ("/dev_server/v1", "dev"),
+    ("/cloud_ml/v1/tensorboard", "tensorboard"),
+    ("/cloud_ml/v1/quota", "quota")
+]
+
+DEFAULT_SHARED_DIR = os.path.join(DEFAULT_CACHE_DIR, "rate_limit")
+
+
+def endpoint_group(url):
+  """Get the endpoint group of the url, or None if it's not in any group."""
+  path = urlparse(url).path
+  for prefix, group in ENDPOINT_GROUPS:
+    if path == prefix or path.startswith(prefix + "/"):
+      return group
+  return None
+
+
+class TokenBucket(object):
+  """The token bucket shared by the threads of this process.
+
+  The tokens are refilled at `rate` per second up to `burst`. Each request
+  takes a token, and the request without a token reserves the next one and
+  waits for it, so the waiting requests are served in order.
+  """
+
+  def __init__(self, rate, burst=None):
+    """Create a new TokenBucket.
+
+    Args:
+      rate: The number of requests per second.
+      burst: The max number of requests at once, which is `rate` by default
+             and at least 1.
+    """
+    self._rate = float(rate)
+    self._burst = max(float(burst or rate), 1.0)
+    self._state = {"tokens": self._burst, "updated": time.time()}
+    self._lock = threading.Lock()
+
+  def _take(self, state, now, blocking=True):
+    """Take a token from the state.
+
+    Returns:
+      The seconds to wait for the token, or None if `blocking` is False and
+      there is no token now.
+    """
+    elapsed = max(now - state["updated"], 0.0)
+    tokens = min(self._burst, state["tokens"] + elapsed * self._rate)
+    state["updated"] = now
+    if not blocking and tokens < 1:
+      state["tokens"] = tokens
+      return None
+    state["tokens"] = tokens - 1
+    return max(-state["tokens"] / self._rate, 0.0)
+
+  def reserve(self, blocking=True):
+    """Take a token, and get the seconds to wait before using it.
+
+    Args:
+      blocking: Whether to reserve the next token if there is no token now.
+
+    Returns:
+      The seconds to wait, or None if `blocking` is False and there is no
+      token now.
+    """
+    with self._lock:
+      return self._take(self._state, time.time(), blocking)
+
+
+class FileTokenBucket(TokenBucket):
+  """The token bucket shared by the processes on this host.
+
+  The state is kept in a json file, which is locked while it's updated.
+  """
+
+  def __init__(self, rate, burst=None, path=None):
+    """Create a new FileTokenBucket.
+
+    Args:
+      rate: The number of requests per second.
+      burst: The max number of requests at once, which is `rate` by default.
+      path: The path of the file to keep the state.
+    """
+    if fcntl is None:
+      raise ValueError("The shared rate limiter requires fcntl")
+    super(FileTokenBucket, self).__init__(rate, burst)
+    self._path = path
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+      try:
+        os.makedirs(directory, 0o700)
+      except OSError:
+        # Created by another process
+        pass
+
+  def reserve(self, blocking=True):
+    with self._lock:
+      with open(self._path, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+          f.seek(0)
+          try:
+            state = json.loads(f.read())
+          except ValueError:
+            # The new file
+            state = dict(self._state)
+          wait = self._take(state, time.time(), blocking)
+          f.seek(0)
+          f.truncate()
+          f.write(json.dumps(state))
+          f.flush()
+        finally:
+          fcntl.flock(f, fcntl.LOCK_UN)
+    return wait
+
+
+class RateLimiter(object):
+  """The rate limits of the endpoint groups of the requests.
+
+  The groups are "train", "model", "dev", "tensorboard" and "quota". The
+  requests of the groups without limits are not limited.
+  """
+
+  def __init__(self, rates, shared=False, shared_dir=DEFAULT_SHARED_DIR):
+    """Create a new RateLimiter.
+
+    Args:
+      rates: The dictionary of endpoint group and its limit, which is the
+             number of requests per second, or the tuple of it and the max
+             number of requests at once.
+      shared: Whether the limits are shared by the processes on this host,
+              which requires fcntl.
+      shared_dir: The directory of the files of the shared limits.
+    """
+    self._buckets = {}
+    for group, rate in rates.items():
+      rate, burst = rate if isinstance(rate, tuple) else (rate, None)
+      if shared:
+        self._buckets[group] = FileTokenBucket(
+            rate, burst, os.path.join(shared_dir, group + ".json"))
+      else:
+        self._buckets[group] = TokenBucket(rate, burst)
+    self._stats = {}
+    self._lock = threading.Lock()
+
+  def acquire(self, url, blocking=True):
+    """Wait until the request of the url is allowed.
+
+    Args:
+      url: The url of the request.
+      blocking: Whether to wait. Otherwise the request is only allowed if it
+                doesn't need to wait.
+
+    Returns:
+      The seconds waited, or None if `blocking` is False and the request is
+      not allowed now.
+    """
+    group = endpoint_group(url)
+    bucket = self._buckets.get(group)
+    if bucket is None:
+      return 0.0
+    wait = bucket.reserve(blocking)
+    with self._lock:
+      stats = self._stats.setdefault(group, {
+          "requests": 0,
+          "waits": 0,
+          "wait_time": 0.0,
+          "max_wait": 0.0,
+          "rejected": 0
+      })
+      if wait is None:
+        stats["rejected"] += 1
+        return None
+      stats["requests"] += 1
+      if wait > 0:
+        stats["waits"] += 1
+        stats["wait_time"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+    if wait > 0:
+      time.sleep(wait)
+    return wait
+
+  def stats(self):
+    """Get the counters of each endpoint group.
+
+    Returns:
+      The dictionary of endpoint group and the dictionary with the number of
+      requests, the number of requests which waited, the total and max
+      seconds waited, and the number of non-blocking requests which were not
+      allowed.
+    """
+    with self._lock:
+      return dict((group, dict(stats)) for group, stats in self._stats.items())
@@ -0,0 +1,213 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from cloud_ml_sdk import rate_limit
+from cloud_ml_sdk.rate_limit import (FileTokenBucket, RateLimiter, TokenBucket,
+                                     endpoint_group)
+
+SDK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+TRAIN_URL = "http://host/cloud_ml/v1/train/linear"
+
+# The code of the process which takes the tokens of the shared bucket, and
+# prints the seconds to wait for each one, or null if it's not allowed
+RESERVE_CODE = """
+import json, sys
+from cloud_ml_sdk.rate_limit import FileTokenBucket
+bucket = FileTokenBucket(0.001, 10, sys.argv[1])
+sys.stdin.read()
+print(json.dumps([bucket.reserve(sys.argv[2] == "blocking")
+                  for _ in range(10)]))
+"""
+
+
+class FakeClock(object):
+  """The stand-in of the time module whose time only moves by sleeping."""
+
+  def __init__(self):
+    self.now = 1000.0
+    self.sleeps = []
+
+  def time(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = FakeClock()
+    self.addCleanup(setattr, rate_limit, "time", time)
+    rate_limit.time = self.clock
+
+  def test_endpoint_group(self):
+    self.assertEqual("train", endpoint_group(TRAIN_URL + "/logs?offset=1"))
+    self.assertEqual("train", endpoint_group("http://host/cloud_ml/v1/train"))
+    self.assertEqual("dev", endpoint_group(
+        "http://host/dev_server/v1/dev_servers/gpu"))
+    self.assertEqual("quota", endpoint_group(
+        "http://host/cloud_ml/v1/quota?org_id=1"))
+    self.assertIsNone(endpoint_group("http://host/cloud_ml/v1/trainer"))
+    self.assertIsNone(endpoint_group("http://host/cloud_ml/v1/framework"))
+
+  def test_burst(self):
+    bucket = TokenBucket(10, 5)
+    self.assertEqual([0.0] * 5, [bucket.reserve() for _ in range(5)])
+    # The next requests reserve the next tokens in order
+    for expected in (0.1, 0.2, 0.3):
+      self.assertAlmostEqual(expected, bucket.reserve())
+
+  def test_refill(self):
+    bucket = TokenBucket(10, 5)
+    for _ in range(5):
+      bucket.reserve()
+    self.clock.sleep(0.25)
+    self.assertEqual([0.0, 0.0], [bucket.reserve() for _ in range(2)])
+    self.assertAlmostEqual(0.05, bucket.reserve())
+    # The tokens are refilled up to the burst
+    self.clock.sleep(60)
+    self.assertEqual([0.0] * 5, [bucket.reserve() for _ in range(5)])
+    self.assertAlmostEqual(0.1, bucket.reserve())
+
+  def test_default_burst(self):
+    self.assertEqual([0.0] * 3, [TokenBucket(3).reserve() for _ in range(3)])
+    bucket = TokenBucket(0.5)
+    self.assertEqual(0.0, bucket.reserve())
+    self.assertAlmostEqual(2.0, bucket.reserve())
+
+  def test_non_blocking(self):
+    bucket = TokenBucket(10, 2)
+    self.assertEqual([0.0, 0.0, None, None],
+                     [bucket.reserve(blocking=False) for _ in range(4)])
+    # The rejected requests don't take the tokens
+    self.clock.sleep(0.1)
+    self.assertEqual(0.0, bucket.reserve(blocking=False))
+    self.assertIsNone(bucket.reserve(blocking=False))
+    self.assertAlmostEqual(0.1, bucket.reserve())
+    self.assertIsNone(bucket.reserve(blocking=False))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = FakeClock()
+    self.addCleanup(setattr, rate_limit, "time", time)
+    rate_limit.time = self.clock
+
+  def test_acquire(self):
+    limiter = RateLimiter({"train": (10, 2), "model": 1})
+    self.assertEqual([0.0, 0.0], [limiter.acquire(TRAIN_URL)
+                                  for _ in range(2)])
+    self.assertEqual([], self.clock.sleeps)
+    # The blocking request sleeps until its token
+    self.assertAlmostEqual(0.1, limiter.acquire(TRAIN_URL))
+    self.assertEqual(1, len(self.clock.sleeps))
+    self.assertAlmostEqual(0.1, self.clock.sleeps[0])
+    # The other groups have their own limits or none
+    self.assertEqual(0.0, limiter.acquire("http://host/cloud_ml/v1/model"))
+    for _ in range(100):
+      self.assertEqual(0.0, limiter.acquire("http://host/cloud_ml/v1/quota"))
+
+  def test_non_blocking(self):
+    limiter = RateLimiter({"train": (10, 1)})
+    self.assertEqual(0.0, limiter.acquire(TRAIN_URL, blocking=False))
+    self.assertIsNone(limiter.acquire(TRAIN_URL, blocking=False))
+    self.assertEqual([], self.clock.sleeps)
+    self.assertEqual(0.0, limiter.acquire("http://host/cloud_ml/v1/model",
+                                          blocking=False))
+
+  def test_stats(self):
+    limiter = RateLimiter({"train": (10, 2), "model": 100})
+    for _ in range(4):
+      limiter.acquire(TRAIN_URL)
+    limiter.acquire(TRAIN_URL, blocking=False)
+    limiter.acquire("http://host/cloud_ml/v1/model/mnist/1")
+    limiter.acquire("http://host/cloud_ml/v1/quota")
+    stats = limiter.stats()
+    self.assertEqual(["model", "train"], sorted(stats))
+    train = stats["train"]
+    self.assertEqual((4, 2, 1), (train["requests"], train["waits"],
+                                 train["rejected"]))
+    self.assertAlmostEqual(0.2, train["wait_time"])
+    self.assertAlmostEqual(0.1, train["max_wait"])
+    self.assertEqual({"requests": 1, "waits": 0, "wait_time": 0.0,
+                      "max_wait": 0.0, "rejected": 0}, stats["model"])
+
+
+@unittest.skipIf(rate_limit.fcntl is None, "fcntl is not available")
+class FileTokenBucketTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.directory)
+
+  def test_state_file(self):
+    path = os.path.join(self.directory, "limits", "train.json")
+    limiter = RateLimiter({"train": (0.001, 3)}, shared=True,
+                          shared_dir=os.path.dirname(path))
+    limiter.acquire(TRAIN_URL)
+    with open(path) as f:
+      self.assertAlmostEqual(2, json.load(f)["tokens"], places=2)
+    # Another limiter of the same file takes the remaining tokens
+    bucket = FileTokenBucket(0.001, 3, path)
+    self.assertEqual([0.0, 0.0, None],
+                     [bucket.reserve(blocking=False) for _ in range(3)])
+
+  def reserve_in_processes(self, path, mode, count=2):
+    """Take 10 tokens in each of the processes at the same time."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [SDK_PATH] + [item for item in [env.get("PYTHONPATH")] if item])
+    processes = [
+        subprocess.Popen([sys.executable, "-c", RESERVE_CODE, path, mode],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         env=env) for _ in range(count)
+    ]
+    # The processes reserve after they all start
+    outputs = [process.communicate(b"")[0] for process in processes]
+    for process in processes:
+      self.assertEqual(0, process.returncode)
+    return [json.loads(output.decode("utf-8")) for output in outputs]
+
+  def test_processes(self):
+    path = os.path.join(self.directory, "train.json")
+    waits = self.reserve_in_processes(path, "non-blocking")
+    # The burst of 10 tokens is shared by the processes
+    self.assertEqual(10, sum(wait is not None for each in waits
+                             for wait in each))
+
+  def test_processes_blocking(self):
+    path = os.path.join(self.directory, "train.json")
+    waits = sorted(wait for each in self.reserve_in_processes(path, "blocking")
+                   for wait in each)
+    self.assertEqual([0.0] * 10, waits[:10])
+    # The other requests reserve the next tokens, 1000 seconds apart
+    for i, wait in enumerate(waits[10:]):
+      self.assertAlmostEqual(1000 * (i + 1), wait, delta=1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,236 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The retry policy and timeouts of the requests of CloudMlClient."""
+
+import collections
+import random
+import threading
+import time
+
+import requests
+from requests.packages.urllib3.exceptions import (ConnectTimeoutError,
+                                                  NewConnectionError)
+
+from .errors import DeadlineExceededError
+
+# The seconds to wait for establishing the connection and for each read
+DEFAULT_TIMEOUT = (10, 60)
+
+# The header of the client-generated key to deduplicate the retried POST
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+def is_connect_error(error):
+  """Check whether the request failed to establish the connection, so nothing
+  was sent.
+
+  Args:
+    error: The `requests.ConnectionError` or `requests.Timeout` raised by the
+           request.
+  """
+  if isinstance(error, requests.ConnectTimeout):
+    return True
+  if isinstance(error, requests.exceptions.SSLError) or not error.args:
+    return False
+  # The urllib3 error is wrapped in MaxRetryError by the connection pool
+  reason = getattr(error.args[0], "reason", error.args[0])
+  return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class RetryBudget(object):
+  """Limit the retries to a ratio of the recent requests.
+
+  When the service is down, retrying every request multiplies the load. The
+  budget allows `ratio` retries per request in the last `window` seconds,
+  with at least `min_retries` retries.
+  """
+
+  def __init__(self, ratio=0.2, min_retries=10, window=10.0):
+    self._ratio = ratio
+    self._min_retries = min_retries
+    self._window = window
+    self._requests = collections.deque()
+    self._retries = collections.deque()
+    self._lock = threading.Lock()
+
+  def _expire(self, now):
+    for timestamps in (self._requests, self._retries):
+      while timestamps and timestamps[0] < now - self._window:
+        timestamps.popleft()
+
+  def record_request(self):
+    """Record a new request, not including its retries."""
+    now = time.time()
+    with self._lock:
+      self._expire(now)
+      self._requests.append(now)
+
+  def try_retry(self):
+    """Withdraw a retry from the budget.
+
+    Returns:
+      False if the budget is exhausted.
+    """
+    now = time.time()
+    with self._lock:
+      self._expire(now)
+      allowed = max(self._min_retries, self._ratio * len(self._requests))
+      if len(self._retries) >= allowed:
+        return False
+      self._retries.append(now)
+      return True
+
+
+class RetryPolicy(object):
+  """The policy to retry the failed requests with capped exponential backoff.
+
+  The requests of the idempotent methods are retried on connection errors,
+  timeouts and the transient status codes. The POST requests are retried only
+  if `retry_post` is set, with a client-generated idempotency key for the
+  server to deduplicate them. All requests are retried if the connection
+  can't be established, since nothing was sent.
+  """
+
+  def __init__(self,
+               max_retries=3,
+               backoff_base=0.1,
+               backoff_max=5.0,
+               retry_statuses=(429, 502, 503, 504),
+               methods=("GET", "DELETE"),
+               retry_post=False,
+               budget=None):
+    """Create a new RetryPolicy.
+
+    Args:
+      max_retries: The max number of retries of each request.
+      backoff_base: The seconds to wait before the first retry, which is
+                    doubled for each retry.
+      backoff_max: The max seconds to wait before a retry.
+      retry_statuses: The status codes to retry.
+      methods: The idempotent http methods to retry.
+      retry_post: Whether to retry the POST requests with idempotency keys.
+      budget: The `RetryBudget` shared by the requests, a new one by default.
+    """
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.retry_statuses = frozenset(retry_statuses)
+    self.methods = frozenset(methods)
+    self.retry_post = retry_post
+    self.budget = budget or RetryBudget()
+
+  def is_retryable_method(self, method):
+    return method in self.methods or (method == "POST" and self.retry_post)
+
+  def backoff(self, retries, retry_after=None):
+    """Get the seconds to wait before the next retry.
+
+    It's the full jitter of the capped exponential backoff, or the
+    `Retry-After` of the server if it's longer.
+    """
+    delay = random.uniform(
+        0, min(self.backoff_max, self.backoff_base * (2**retries)))
+    if retry_after is not None:
+      delay = max(delay, min(retry_after, self.backoff_max))
+    return delay
+
+  def retry_delay(self, method, retries, response=None, error=None,
+                  deadline=None):
+    """Decide whether to retry the failed request.
+
+    Args:
+      method: The http method of the request.
+      retries: The number of retries so far.
+      response: The `requests.Response` of the request, if any.
+      error: The `requests.ConnectionError` or `requests.Timeout` raised by
+             the request, if any.
+      deadline: The timestamp before which the request must finish.
+
+    Returns:
+      The seconds to wait before retrying, or None to not retry.
+    """
+    if retries >= self.max_retries:
+      return None
+    retry_after = None
+    if error is not None:
+      # Nothing was sent if the connection failed, so any request is safe to
+      # retry
+      if not is_connect_error(error) and \
+          not self.is_retryable_method(method):
+        return None
+    elif response is not None:
+      if response.status_code not in self.retry_statuses or \
+          not self.is_retryable_method(method):
+        return None
+      retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+    else:
+      return None
+
+    delay = self.backoff(retries, retry_after)
+    if deadline is not None and time.time() + delay >= deadline:
+      return None
+    if not self.budget.try_retry():
+      return None
+    return delay
+
+
+def _parse_retry_after(value):
+  try:
+    return max(float(value), 0.0)
+  except (TypeError, ValueError):
+    # The http date format is not supported
+    return None
+
+
+class RequestOptions(object):
+  """The timeouts and retry policy of the requests."""
+
+  def __init__(self, timeout=None, deadline=None, retry_policy=None):
+    """Create a new RequestOptions.
+
+    Args:
+      timeout: The seconds to wait for the server, a float or a tuple of
+               connect and read timeouts.
+      deadline: The seconds to finish each call, including its retries.
+      retry_policy: The `RetryPolicy` of the requests.
+    """
+    self.timeout = timeout
+    self.deadline = deadline
+    self.retry_policy = retry_policy
+
+  def merge(self, other):
+    """Override the options with the non-empty ones of other options."""
+    return RequestOptions(
+        other.timeout if other.timeout is not None else self.timeout,
+        other.deadline if other.deadline is not None else self.deadline,
+        other.retry_policy if other.retry_policy is not None else
+        self.retry_policy)
+
+  def attempt_timeout(self, deadline):
+    """Get the timeout of the next attempt which ends before the deadline.
+
+    Raises:
+      DeadlineExceededError: If the deadline is exceeded.
+    """
+    timeout = self.timeout
+    if deadline is None:
+      return timeout
+    remaining = deadline - time.time()
+    if remaining <= 0:
+      raise DeadlineExceededError("The deadline of the request is exceeded")
+    if timeout is None:
+      return remaining
+    if isinstance(timeout, tuple):
+      return (min(timeout[0], remaining), min(timeout[1], remaining))
+    return min(timeout, remaining)
@@ -0,0 +1,227 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import time
+import unittest
+
+import requests
+
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.errors import DeadlineExceededError
+from cloud_ml_sdk.retry import (IDEMPOTENCY_KEY_HEADER, RequestOptions,
+                                RetryBudget, RetryPolicy, is_connect_error)
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+
+class FlakyHandler(StandInHandler):
+  """The handler which fails the first `server.failures` requests with the
+  `server.status`, and sleeps `server.delay` seconds before each reply."""
+
+  def handle_request(self, body):
+    self.server.requests.append((self.command, self.path, dict(self.headers)))
+    time.sleep(self.server.delay)
+    if len(self.server.requests) <= self.server.failures:
+      self.reply(self.server.status, {"message": "unavailable"},
+                 self.server.headers)
+    else:
+      self.reply(200, {"job_name": "linear"})
+
+
+def closed_endpoint():
+  """Get the endpoint of the local port which refuses the connections."""
+  server = start_server(FlakyHandler)
+  server.stop()
+  return server.endpoint
+
+
+def start_flaky_server(failures=0, status=503, delay=0, headers=None):
+  return start_server(FlakyHandler, failures=failures, status=status,
+                      delay=delay, headers=headers or {})
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+  def test_backoff(self):
+    random.seed(0)
+    policy = RetryPolicy(backoff_base=0.1, backoff_max=1.0)
+    for retries, cap in [(0, 0.1), (1, 0.2), (2, 0.4), (3, 0.8), (4, 1.0),
+                         (10, 1.0)]:
+      delays = [policy.backoff(retries) for _ in range(1000)]
+      # The full jitter is spread over [0, cap]
+      self.assertTrue(all(0 <= delay <= cap for delay in delays))
+      self.assertLess(min(delays), cap * 0.1)
+      self.assertGreater(max(delays), cap * 0.9)
+      self.assertGreater(len(set(delays)), 900)
+
+  def test_backoff_retry_after(self):
+    policy = RetryPolicy(backoff_base=0.1, backoff_max=1.0)
+    self.assertGreaterEqual(policy.backoff(0, retry_after=0.5), 0.5)
+    # The Retry-After is also capped
+    self.assertEqual(1.0, policy.backoff(0, retry_after=30))
+
+  def test_is_connect_error(self):
+    try:
+      requests.post(closed_endpoint(), data="x", timeout=5)
+      self.fail("The connection is refused")
+    except requests.ConnectionError as e:
+      refused = e
+    self.assertTrue(is_connect_error(refused))
+    self.assertTrue(is_connect_error(requests.ConnectTimeout()))
+    self.assertFalse(is_connect_error(requests.ReadTimeout()))
+    self.assertFalse(is_connect_error(
+        requests.ConnectionError("Connection reset by peer")))
+
+    policy = RetryPolicy()
+    self.assertIsNotNone(policy.retry_delay("POST", 0, error=refused))
+    self.assertIsNone(policy.retry_delay("POST", 0,
+                                         error=requests.ReadTimeout()))
+    self.assertIsNotNone(policy.retry_delay("GET", 0,
+                                            error=requests.ReadTimeout()))
+
+  def test_budget(self):
+    budget = RetryBudget(ratio=0.5, min_retries=2, window=0.2)
+    self.assertEqual([True, True, False],
+                     [budget.try_retry() for _ in range(3)])
+    # The ratio of the recent requests allows more retries
+    for _ in range(6):
+      budget.record_request()
+    self.assertEqual([True, False], [budget.try_retry() for _ in range(2)])
+    # The retries and requests expire after the window
+    time.sleep(0.3)
+    self.assertEqual([True, True, False],
+                     [budget.try_retry() for _ in range(3)])
+
+
+class RequestOptionsTest(unittest.TestCase):
+
+  def test_merge(self):
+    policy = RetryPolicy()
+    other_policy = RetryPolicy(max_retries=0)
+    options = RequestOptions((10, 60), None, policy)
+    merged = options.merge(RequestOptions(deadline=30))
+    self.assertEqual(((10, 60), 30, policy),
+                     (merged.timeout, merged.deadline, merged.retry_policy))
+    merged = merged.merge(RequestOptions(5, None, other_policy))
+    self.assertEqual((5, 30, other_policy),
+                     (merged.timeout, merged.deadline, merged.retry_policy))
+    # The options are not changed
+    self.assertEqual(((10, 60), None), (options.timeout, options.deadline))
+
+  def test_attempt_timeout(self):
+    self.assertEqual((10, 60), RequestOptions((10, 60)).attempt_timeout(None))
+    timeout = RequestOptions((10, 60)).attempt_timeout(time.time() + 30)
+    self.assertEqual(10, timeout[0])
+    self.assertTrue(29 < timeout[1] <= 30)
+    self.assertTrue(4 < RequestOptions().attempt_timeout(time.time() + 5) <= 5)
+    self.assertRaises(DeadlineExceededError,
+                      RequestOptions(5).attempt_timeout, time.time() - 1)
+
+
+class ClientRetryTest(unittest.TestCase):
+
+  def create_client(self, server, **kwargs):
+    client = CloudMlClient("ak", "sk", server.endpoint, **kwargs)
+    self.addCleanup(client.close)
+    return client
+
+  def start_server(self, **kwargs):
+    server = start_flaky_server(**kwargs)
+    self.addCleanup(server.stop)
+    return server
+
+  def test_retry(self):
+    server = self.start_server(failures=2)
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01))
+    self.assertEqual({"job_name": "linear"},
+                     client.describe_train_job("linear"))
+    self.assertEqual(3, len(server.requests))
+
+  def test_post_not_retried(self):
+    server = self.start_server(failures=1)
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01))
+    self.assertEqual(503, client.submit_train_job("{}").status_code)
+    self.assertEqual(1, len(server.requests))
+
+  def test_idempotency_key(self):
+    server = self.start_server(failures=2)
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01, retry_post=True))
+    self.assertEqual({"job_name": "linear"}, client.submit_train_job("{}"))
+    client.submit_train_job("{}")
+    keys = [headers.get(IDEMPOTENCY_KEY_HEADER)
+            for _, _, headers in server.requests]
+    self.assertEqual(4, len(keys))
+    # The retries of a request share its key
+    self.assertTrue(keys[0])
+    self.assertEqual([keys[0]] * 3, keys[:3])
+    self.assertNotEqual(keys[0], keys[3])
+    # The key is not sent without retry_post
+    client = self.create_client(server)
+    client.submit_train_job("{}")
+    self.assertNotIn(IDEMPOTENCY_KEY_HEADER, server.requests[-1][2])
+
+  def test_budget_exhausted(self):
+    server = self.start_server(failures=100)
+    budget = RetryBudget(ratio=0, min_retries=2)
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01, budget=budget))
+    for _ in range(3):
+      self.assertEqual(503, client.describe_train_job("linear").status_code)
+    # The first request takes 2 retries and the others none
+    self.assertEqual(5, len(server.requests))
+
+  def test_retry_after(self):
+    server = self.start_server(failures=1, headers={"Retry-After": "0.3"})
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01))
+    start = time.time()
+    client.describe_train_job("linear")
+    self.assertGreaterEqual(time.time() - start, 0.3)
+    self.assertEqual(2, len(server.requests))
+
+  def test_deadline(self):
+    server = self.start_server(delay=2)
+    client = self.create_client(server, deadline=0.3)
+    start = time.time()
+    self.assertRaises(DeadlineExceededError, client.describe_train_job,
+                      "linear")
+    self.assertLess(time.time() - start, 1.5)
+    self.assertEqual(1, len(server.requests))
+
+  def test_deadline_stops_retries(self):
+    server = self.start_server(failures=100, headers={"Retry-After": "1"})
+    client = self.create_client(
+        server, deadline=0.5, retry_policy=RetryPolicy(backoff_base=0.01))
+    start = time.time()
+    # The retry is not waited for if it ends after the deadline
+    self.assertEqual(503, client.describe_train_job("linear").status_code)
+    self.assertLess(time.time() - start, 0.5)
+    self.assertEqual(1, len(server.requests))
+
+  def test_request_options(self):
+    server = self.start_server(failures=1)
+    client = self.create_client(
+        server, retry_policy=RetryPolicy(backoff_base=0.01))
+    with client.request_options(retry_policy=RetryPolicy(max_retries=0)):
+      self.assertEqual(503, client.describe_train_job("linear").status_code)
+    self.assertEqual({"job_name": "linear"},
+                     client.describe_train_job("linear"))
+    self.assertEqual(2, len(server.requests))
+
+
+if __name__ == "__main__":
+  unittest.main()
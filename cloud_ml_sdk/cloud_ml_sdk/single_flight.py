@@ -0,0 +1,95 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Share the result of the concurrent identical calls."""
+
+import threading
+
+
+class _Call(object):
+  """The in-flight call whose result is waited by the other threads."""
+
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+    self.shares = 0
+
+
+class SingleFlight(object):
+  """Run only one of the concurrent calls with the same key.
+
+  The first thread runs the call, and the other threads calling with the
+  same key wait for it and get its result or exception. The call is run
+  again after it finishes, so the results are never stale.
+  """
+
+  def __init__(self):
+    self._calls = {}
+    self._stats = {"calls": 0, "shared": 0}
+    self._lock = threading.Lock()
+
+  def stats(self):
+    """Get the counters of the calls.
+
+    Returns:
+      The dictionary with the number of calls which are run, and the number
+      of calls which share the result of another one, which are the saved
+      requests.
+    """
+    with self._lock:
+      return dict(self._stats)
+
+  def do(self, key, func):
+    """Run the function, or wait for the in-flight call with the same key.
+
+    Args:
+      key: The hashable key of the call.
+      func: The function to run without arguments.
+
+    Returns:
+      The tuple of the result of the function and whether it's shared by
+      multiple threads, in which case it should be copied before modifying.
+
+    Raises:
+      The exception raised by the function, which is also raised in the
+      threads sharing the call.
+    """
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = _Call()
+        self._calls[key] = call
+        self._stats["calls"] += 1
+      else:
+        call.shares += 1
+        self._stats["shared"] += 1
+
+    if not leader:
+      call.done.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result, True
+
+    try:
+      call.result = func()
+    except Exception as e:
+      call.error = e
+      raise
+    finally:
+      # No more threads can share the call after it's removed
+      with self._lock:
+        del self._calls[key]
+      call.done.set()
+    return call.result, call.shares > 0
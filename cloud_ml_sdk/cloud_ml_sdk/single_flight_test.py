@@ -0,0 +1,182 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import unittest
+
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.single_flight import SingleFlight
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+# The number of threads calling at the same time
+THREADS = 8
+
+
+def wait_until(condition, timeout=5):
+  deadline = time.time() + timeout
+  while not condition():
+    if time.time() > deadline:
+      raise AssertionError("Timed out waiting for the condition")
+    time.sleep(0.001)
+
+
+def run_threads(target, count=THREADS):
+  """Run the function in the threads and get the results or exceptions."""
+  results = [None] * count
+
+  def run(index):
+    try:
+      results[index] = target()
+    except Exception as e:
+      results[index] = e
+
+  threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+  for thread in threads:
+    thread.start()
+  return threads, results
+
+
+class SingleFlightTest(unittest.TestCase):
+
+  def setUp(self):
+    self.single_flight = SingleFlight()
+    self.release = threading.Event()
+    self.calls = []
+
+  def blocked_call(self, result):
+    """Get the function which returns the result after it's released."""
+
+    def call():
+      self.calls.append(result)
+      self.release.wait(5)
+      if isinstance(result, Exception):
+        raise result
+      return result
+
+    return call
+
+  def run_together(self, key, func):
+    """Call with the key in the threads until they all share the call, then
+    release it."""
+    threads, results = run_threads(lambda: self.single_flight.do(key, func))
+    wait_until(
+        lambda: self.single_flight.stats()["shared"] >= THREADS - 1)
+    self.release.set()
+    for thread in threads:
+      thread.join()
+    return results
+
+  def test_coalesce(self):
+    result = {"job_name": "linear"}
+    results = self.run_together("key", self.blocked_call(result))
+    self.assertEqual([result], self.calls)
+    # All threads get the same object, which is marked as shared
+    for value, shared in results:
+      self.assertIs(result, value)
+      self.assertTrue(shared)
+    self.assertEqual({"calls": 1, "shared": THREADS - 1},
+                     self.single_flight.stats())
+
+  def test_error(self):
+    error = ValueError("failed")
+    results = self.run_together("key", self.blocked_call(error))
+    self.assertEqual(1, len(self.calls))
+    for value in results:
+      self.assertIs(error, value)
+
+  def test_sequential(self):
+    self.release.set()
+    for i in range(3):
+      self.assertEqual((i, False),
+                       self.single_flight.do("key", self.blocked_call(i)))
+    # The finished call is not shared, so the results are never stale
+    self.assertEqual([0, 1, 2], self.calls)
+    self.assertEqual({"calls": 3, "shared": 0}, self.single_flight.stats())
+
+  def test_error_not_cached(self):
+    self.release.set()
+    self.assertRaises(ValueError, self.single_flight.do, "key",
+                      self.blocked_call(ValueError()))
+    self.assertEqual((1, False),
+                     self.single_flight.do("key", self.blocked_call(1)))
+
+  def test_keys(self):
+    threads, results = run_threads(lambda: self.single_flight.do(
+        threading.current_thread().name, self.blocked_call(1)), count=3)
+    wait_until(lambda: len(self.calls) == 3)
+    self.release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual([(1, False)] * 3, results)
+
+
+class JobsHandler(StandInHandler):
+  """The handler which replies after `server.release` is set."""
+
+  def handle_request(self, body):
+    self.server.requests.append(self.path)
+    self.server.release.wait(5)
+    if "broken" in self.path:
+      self.reply(500, {"message": "broken"})
+    elif self.path.endswith("/train"):
+      self.reply(200, {"data": [{"job_name": "linear", "args": [1]}]})
+    else:
+      self.reply(200, {"job_name": "linear", "args": [1]})
+
+
+class ClientSingleFlightTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = start_server(JobsHandler, release=threading.Event())
+    self.addCleanup(self.server.stop)
+    self.addCleanup(self.server.release.set)
+    self.client = CloudMlClient("ak", "sk", self.server.endpoint,
+                                single_flight=True)
+    self.addCleanup(self.client.close)
+
+  def run_together(self, func):
+    threads, results = run_threads(func)
+    wait_until(lambda: self.client.single_flight.stats()["shared"] >=
+               THREADS - 1)
+    self.server.release.set()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(1, len(self.server.requests))
+    return results
+
+  def test_copies(self):
+    results = self.run_together(
+        lambda: self.client.describe_train_job("linear"))
+    # Each thread gets its own copy of the shared result
+    self.assertEqual([{"job_name": "linear", "args": [1]}] * THREADS, results)
+    self.assertEqual(THREADS, len(set(id(result) for result in results)))
+    self.assertEqual(THREADS, len(set(id(result["args"])
+                                      for result in results)))
+    results[0]["args"].append(2)
+    self.assertEqual([1], results[1]["args"])
+
+  def test_list_copies(self):
+    results = self.run_together(lambda: self.client.list_train_jobs())
+    self.assertEqual(THREADS, len(set(id(result[0]) for result in results)))
+
+  def test_error_response(self):
+    results = self.run_together(
+        lambda: self.client.describe_train_job("broken"))
+    self.assertEqual([500] * THREADS,
+                     [result.status_code for result in results])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,143 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The local http server which stands in for the cloud-ml service in the
+tests and benchmarks.
+
+Example:
+
+  class JobHandler(StandInHandler):
+
+    def handle_request(self, body):
+      self.reply(200, {"job_name": "linear"})
+
+  server = start_server(JobHandler)
+  client = CloudMlClient("ak", "sk", server.endpoint)
+  ...
+  server.stop()
+"""
+
+import json
+import threading
+
+try:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from socketserver import ThreadingMixIn
+except ImportError:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+  from SocketServer import ThreadingMixIn
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+  """The threading http server on a free local port, which counts the
+  accepted connections."""
+  daemon_threads = True
+
+  def __init__(self, handler_class):
+    HTTPServer.__init__(self, ("127.0.0.1", 0), handler_class)
+    self.requests = []
+    self.connections = 0
+
+  @property
+  def endpoint(self):
+    return "http://127.0.0.1:{}".format(self.server_address[1])
+
+  def process_request(self, request, client_address):
+    # Called by the serving thread for each new connection
+    self.connections += 1
+    ThreadingMixIn.process_request(self, request, client_address)
+
+  def start(self):
+    """Serve the requests in a daemon thread."""
+    thread = threading.Thread(target=self.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+  def stop(self):
+    """Stop serving and close the socket."""
+    self.shutdown()
+    self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+  """The keep-alive handler which reads the request body, including the
+  chunked one, and passes it to `handle_request`."""
+  protocol_version = "HTTP/1.1"
+
+  def log_message(self, format, *args):
+    pass
+
+  def read_body(self):
+    """Read the request body.
+
+    Returns:
+      The bytes of the body.
+    """
+    if self.headers.get("Transfer-Encoding") == "chunked":
+      chunks = []
+      while True:
+        size = int(self.rfile.readline().strip(), 16)
+        chunks.append(self.rfile.read(size))
+        self.rfile.readline()
+        if size == 0:
+          return b"".join(chunks)
+    return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+  def reply(self, status, data, headers=None):
+    """Send the response.
+
+    Args:
+      status: The status code.
+      data: The bytes of the body, or the data to encode as json.
+      headers: The dictionary of the extra headers, which is optional.
+    """
+    if not isinstance(data, bytes):
+      data = json.dumps(data).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def handle_request(self, body):
+    """Answer the request, which is implemented by the subclasses.
+
+    Args:
+      body: The bytes of the request body.
+    """
+    raise NotImplementedError
+
+  def _handle(self):
+    self.handle_request(self.read_body())
+
+  do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+def start_server(handler_class, **attributes):
+  """Start the server on a free local port.
+
+  Args:
+    handler_class: The subclass of `StandInHandler` to answer the requests.
+    attributes: The attributes of the server, which the handler reads as
+                `self.server.<name>`.
+
+  Returns:
+    The started `StandInServer`.
+  """
+  server = StandInServer(handler_class)
+  for name, value in attributes.items():
+    setattr(server, name, value)
+  server.start()
+  return server
@@ -0,0 +1,136 @@
+# Copyright 2017 Xiaomi, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure the startup time of `cloudml jobs list` against a local server.
+
+The local server answers the list request with fake train jobs, and the
+configuration file is written to a temporary home directory, so it measures
+the cost of the command itself.
+
+  python -m cloud_ml_sdk.startup_benchmark -n 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from cloud_ml_sdk import config
+from cloud_ml_sdk.client import CloudMlClient
+from cloud_ml_sdk.stand_in_server import StandInHandler, start_server
+
+FAKE_TRAIN_JOBS = json.dumps({
+    "data": [{
+        "job_name": "benchmark-{}".format(i),
+        "state": "running",
+        "create_time": "2017-01-01 00:00:00",
+        "update_time": "2017-01-01 00:00:00"
+    } for i in range(20)]
+}).encode("utf-8")
+
+# The command to run `cloudml` with the arguments
+CLOUDML_COMMAND = [
+    sys.executable, "-c",
+    "import sys; from cloud_ml_sdk.command.command import main; main()"
+]
+
+
+class ListHandler(StandInHandler):
+
+  def handle_request(self, body):
+    self.reply(200, FAKE_TRAIN_JOBS)
+
+
+def write_config(home, endpoint):
+  """Write the configuration file with a "benchmark" profile."""
+  credentials = {
+      "xiaomi_access_key_id": "ak",
+      "xiaomi_secret_access_key": "sk",
+      "xiaomi_cloudml_endpoint": endpoint
+  }
+  config_dir = os.path.join(home, ".config/xiaomi")
+  os.makedirs(config_dir)
+  with open(os.path.join(config_dir, "config"), "w") as f:
+    json.dump(dict(credentials, profiles={"benchmark": credentials}), f)
+
+
+def benchmark_command(home, runs, arguments):
+  """Run the command and get the sorted seconds of each run."""
+  env = dict(os.environ, HOME=home)
+  for name in ("XIAOMI_ACCESS_KEY_ID", "XIAOMI_SECRET_ACCESS_KEY",
+               "XIAOMI_CLOUDML_ENDPOINT", config.PROFILE_ENV):
+    env.pop(name, None)
+  seconds = []
+  with open(os.devnull, "w") as devnull:
+    for i in range(runs):
+      start = time.time()
+      subprocess.check_call(CLOUDML_COMMAND + arguments, env=env,
+                            stdout=devnull, stderr=devnull)
+      seconds.append(time.time() - start)
+  return sorted(seconds)
+
+
+def benchmark_clients(path, runs, share_transport):
+  """Create four clients like `cloudml all` and get the seconds of each run."""
+  seconds = []
+  for i in range(runs):
+    config.clear_cache()
+    start = time.time()
+    for j in range(4):
+      credentials = config.resolve_credentials(path=path)
+      CloudMlClient(*credentials, share_transport=share_transport)
+    seconds.append(time.time() - start)
+  return sorted(seconds)
+
+
+def print_result(name, seconds):
+  print("{:46} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+      name, seconds[len(seconds) // 2] * 1000, seconds[0] * 1000,
+      seconds[-1] * 1000))
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("-n", "--runs", type=int, default=10,
+                      help="The number of runs of each benchmark")
+  args = parser.parse_args()
+
+  server = start_server(ListHandler)
+  endpoint = server.endpoint
+  home = tempfile.mkdtemp()
+  try:
+    write_config(home, endpoint)
+    print("{:46} {:>10} {:>10} {:>10}".format("BENCHMARK", "P50(MS)",
+                                              "MIN(MS)", "MAX(MS)"))
+    print_result("cloudml jobs list",
+                 benchmark_command(home, args.runs, ["jobs", "list"]))
+    print_result("cloudml --config_profile benchmark jobs list",
+                 benchmark_command(home, args.runs, [
+                     "--config_profile", "benchmark", "jobs", "list"
+                 ]))
+    path = os.path.join(home, ".config/xiaomi/config")
+    print_result("4 clients with shared transport",
+                 benchmark_clients(path, args.runs * 10, True))
+    print_result("4 clients with own transport",
+                 benchmark_clients(path, args.runs * 10, False))
+  finally:
+    shutil.rmtree(home, ignore_errors=True)
+    server.stop()
+
+
+if __name__ == "__main__":
+  main()
@@ -22,7 +22,11 @@ setup(name="cloud_ml_sdk",
       version="0.2.11",
       author="Xiaomi",
       install_requires=["requests>=2.6.0", "pyOpenSSL>=16.1.0",
-                        "argcomplete>=1.4.1", "cloud-ml-common>=0.2.2"],
+                        "argcomplete>=1.4.1", "cloud-ml-common>=0.2.3"],
+      extras_require={
+          "async": ["aiohttp>=3.0.0"],
+          "predict": ["grpcio>=1.0.0", "numpy", "protobuf>=3.19.0"]
+      },
       description="Xiaomi Cloud-ml SDK",
       packages=["cloud_ml_sdk", "cloud_ml_sdk.models",
                 "cloud_ml_sdk.predict_client", "cloud_ml_sdk.command"],
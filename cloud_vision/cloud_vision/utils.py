@@ -14,13 +14,15 @@
 # ==============================================================================
 
 import base64
-import hmac
 import json
 import random
 import uuid
-from urlparse import urlparse
-from hashlib import sha1
-from configs import XIAOMI_HEADER_PREFIX, CONTENT_MD5, CONTENT_TYPE, DATE, AUTHORIZATION
+
+from cloud_ml_common.auth.signature import GalaxyV2Signer
+
+# The signers of the credentials, which keep the keyed HMAC and the canonical
+# resources of the urls
+_signers = {}
 
 
 def obj2json(obj):
@@ -39,65 +41,10 @@ def base64_encode(data):
     raise TypeError("The argument of base64encode can't be None!")
 
 
-def __canonicalize_xiaomi_headers(http_headers):
-  if http_headers is None or len(http_headers) == 0:
-    return ''
-  canonicalized_headers = dict()
-  for key in http_headers:
-    lower_key = key.lower()
-    try:
-      lower_key = lower_key.decode('utf-8')
-    except:
-      pass
-    if http_headers[key] and lower_key.startswith(XIAOMI_HEADER_PREFIX):
-      if type(http_headers[key]) != str:
-        canonicalized_headers[lower_key] = str()
-        i = 0
-        for k in http_headers[key]:
-          canonicalized_headers[lower_key] += '%s' % (k.strip())
-          i += 1
-          if i < len(http_headers[key]):
-            canonicalized_headers[lower_key] += ','
-      else:
-        canonicalized_headers[lower_key] = http_headers[key].strip()
-  result = ""
-  for key in sorted(canonicalized_headers.keys()):
-    values = canonicalized_headers[key]
-    result += '%s:%s\n' % (key, values)
-  return result
-
-def __canonicalize_resource(uri):
-  result = ""
-  parsed_url = urlparse(uri)
-  result += '%s' % parsed_url.path
-  query_args = parsed_url.query.split('&')
-  subresource = []
-
-  i = 0
-  for query in sorted(query_args):
-    key = query.split('=')
-    if key[0] in subresource:
-      if i == 0:
-        result += '?'
-      else:
-        result += '&'
-      if len(key) == 1:
-        result += '%s' % key[0]
-      else:
-        result += '%s=%s' % (key[0], key[1])
-      i += 1
-  return result
-
 def auth_headers(method, uri, headers, credential):
-  string_to_assign = str()
-  string_to_assign += '%s\n' % method
-  string_to_assign += '%s\n' % headers[CONTENT_MD5]
-  string_to_assign += '%s\n' % headers[CONTENT_TYPE]
-  string_to_assign += '%s\n' % headers[DATE]
-  string_to_assign += '%s' % __canonicalize_xiaomi_headers(headers)
-  string_to_assign += '%s' % __canonicalize_resource(uri)
-  signature = base64.encodestring(hmac.new(credential.galaxy_key_secret, string_to_assign, digestmod=sha1).digest()).strip()
-  auth_string = "Galaxy-V2 %s:%s" % (credential.galaxy_access_key, signature)
-  new_header = dict.copy(headers)
-  new_header[AUTHORIZATION] = auth_string
-  return new_header
+  key = (credential.galaxy_access_key, credential.galaxy_key_secret)
+  signer = _signers.get(key)
+  if signer is None:
+    signer = GalaxyV2Signer(*key)
+    _signers[key] = signer
+  return signer.auth_headers(method, uri, headers)
@@ -21,7 +21,7 @@ except ImportError:
 setup(name="cloud_vision_sdk",
       version="0.1.0",
       author="Xiaomi",
-      install_requires=["requests>=2.6.0"],
+      install_requires=["requests>=2.6.0", "cloud-ml-common>=0.2.3"],
       description="Xiaomi Cloud-Vision SDK",
       packages=["cloud_vision", "cloud_vision.example"],
       )